@@ -9,9 +9,16 @@ from dotenv import load_dotenv
 import os
 import random
 import asyncio
+import functools
+import io
 from datetime import datetime, timedelta, timezone
 
-import db
+from events import ECONOMY_SOURCES, catch_log, economy
+from cache import TTLCache, cache_stats
+from optimize_assets import ASSET_DIR, load_manifest
+from breaker import GuardedStorage, StorageUnavailable
+from catalog import MAX_TRAP_COOLDOWN, SHOP_PAGE_SIZE, CatalogError, load_catalog, xp_for_level
+from storage import ReferralOutcome, open_storage
 
 # ─── CONFIG ───────────────────────────────────────────────────────────────────
 
@@ -19,6 +26,13 @@ load_dotenv()
 BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
 PREFIX = os.getenv("PREFIX", "!sq ")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 180))
+
+# Postgres by default; sqlite:///file.db or memory:// select an in-process backend.
+# Calls go through a circuit breaker: reads fall back to cached results while
+# the database is down and writes raise StorageUnavailable right away.
+db = GuardedStorage(open_storage(DATABASE_URL))
+DB_UNAVAILABLE_MSG = "🌧️ The squirrel records are out of reach for a moment — please try again in a few seconds!"
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -40,47 +54,37 @@ EXCHANGE_RATES = {
     "golden_acorns": 10_000,
 }
 
-# ─── SQUIRREL DATA ───────────────────────────────────────────────────────────
-
-SQUIRRELS = [
-    # (name, emoji, rarity, min_acorns, max_acorns, weight_chance, image)
-    # ── Common (~78%) ──
-    ("Grey Squirrel", "🐿️", "Common", 1, 5, 40, "common_grey.jpg"),
-    ("Red Squirrel", "🐿️", "Common", 2, 8, 35, "red_squirrel.jpg"),
-    ("Chipmunk", "🐿️", "Common", 1, 4, 38, "chipmunk.jpg"),
-    ("Eastern Squirrel", "🌳🐿️", "Common", 2, 6, 32, "eastern_squirrel.jpg"),
-    ("Park Squirrel", "🏞️🐿️", "Common", 1, 5, 30, "park_squirrel.jpg"),
-    ("Acorn Hoarder", "🌰🐿️", "Common", 3, 7, 28, "acorn_hoarder.jpg"),
-    ("Bushy Tail", "🍂🐿️", "Common", 2, 6, 25, "bushy_tail.jpg"),
-    ("Tiny Squirrel", "🐾🐿️", "Common", 1, 3, 35, "baby_squirrel.jpg"),
-    # ── Uncommon (~20%) ──
-    ("Black Squirrel", "🖤🐿️", "Uncommon", 5, 15, 12, "black_squirrel.jpg"),
-    ("White Squirrel", "🤍🐿️", "Uncommon", 8, 20, 8, "white_squirrel.jpg"),
-    ("Fox Squirrel", "🦊🐿️", "Uncommon", 6, 18, 10, "fox_squirrel.jpg"),
-    ("Striped Squirrel", "🦝🐿️", "Uncommon", 7, 16, 9, "striped_squirrel.jpg"),
-    ("Pine Squirrel", "🌲🐿️", "Uncommon", 5, 14, 11, "pine_squirrel.jpg"),
-    ("Marsh Squirrel", "🌿🐿️", "Uncommon", 6, 15, 8, "marsh_squirrel.jpg"),
-    ("Cinnamon Squirrel", "🟤🐿️", "Uncommon", 7, 17, 9, "cinnimon_Squirrel.jpg"),
-    # ── Rare (~2%) ──
-    ("Flying Squirrel", "🪂🐿️", "Rare", 15, 40, 1.5, "flying_squirrel.jpg"),
-    ("Albino Squirrel", "👻🐿️", "Rare", 20, 50, 1.2, "albino_squirrel.jpg"),
-    ("Giant Squirrel", "💪🐿️", "Rare", 25, 60, 1.0, "giant_squirrel.jpg"),
-    ("Arctic Squirrel", "❄️🐿️", "Rare", 18, 45, 1.3, "artctic_squirrel.jpg"),
-    ("Clockwork Squirrel", "⚙️🐿️", "Rare", 22, 55, 0.8, "clockwork_squirrel.jpg"),
-    ("Jungle Squirrel", "🌴🐿️", "Rare", 20, 48, 1.0, "jungle_squirrel.jpg"),
-    # ── Epic (~0.25%) ──
-    ("Crystal Squirrel", "💎🐿️", "Epic", 50, 120, 0.25, "crystal_squirrel.jpg"),
-    ("Shadow Squirrel", "🌑🐿️", "Epic", 60, 150, 0.20, "shadow_squirrel.jpg"),
-    ("Phoenix Squirrel", "🔥🐿️", "Epic", 55, 130, 0.22, "pheonix_squirrel.jpg"),
-    ("Storm Squirrel", "⛈️🐿️", "Epic", 65, 140, 0.18, "storm_squirrel.jpg"),
-    # ── Legendary (~0.03%) ──
-    ("Golden Squirrel", "👑🐿️", "Legendary", 150, 400, 0.04, "golden_squirrel.jpg"),
-    ("Cosmic Squirrel", "🌌🐿️", "Legendary", 200, 500, 0.03, "cosmic_squirrel.jpg"),
-    ("Void Squirrel", "🕳️🐿️", "Legendary", 180, 450, 0.035, "void_squirrel.jpg"),
-    # ── Mythic (~0.004%) ──
-    ("Mythic Nutcracker", "⚡🐿️", "Mythic", 500, 1200, 0.008, "mythic_nutcracker.jpg"),
-    ("Celestial Squirrel", "✨🐿️", "Mythic", 600, 1500, 0.005, "celestial_squirrel.jpg"),
-]
+# ─── GAME CATALOG ─────────────────────────────────────────────────────────────
+
+# Species, junk, shop items and upgrades live in catalog.json (see catalog.py).
+# _publish_catalog() rebinds every name below in one synchronous step, so
+# code that awaits midway through (a catch) should hold on to one CATALOG.
+CATALOG = None
+SQUIRRELS = JUNK_CATCHES = SHOP_ITEMS = UPGRADE_TIERS = SELL_VALUES = None
+
+# functools caches over catalog data, cleared whenever a new catalog is published
+_catalog_caches = []
+
+
+def _clears_on_reload(cached):
+    _catalog_caches.append(cached)
+    return cached
+
+
+def _publish_catalog(catalog):
+    """Make catalog the live version and drop everything cached from the old one."""
+    global CATALOG, SQUIRRELS, JUNK_CATCHES, SHOP_ITEMS, UPGRADE_TIERS, SELL_VALUES
+    CATALOG = catalog
+    SQUIRRELS = catalog.squirrels
+    JUNK_CATCHES = catalog.junk
+    SHOP_ITEMS = catalog.shop_items
+    UPGRADE_TIERS = catalog.upgrade_tiers
+    SELL_VALUES = catalog.sell_values
+    for cached in _catalog_caches:
+        cached.cache_clear()
+
+
+_publish_catalog(load_catalog())
 
 RARITY_COLORS = {
     "Common": 0x808080,
@@ -91,93 +95,88 @@ RARITY_COLORS = {
     "Mythic": 0xE74C3C,
 }
 
-# ─── JUNK / NOTHING CATCHES ──────────────────────────────────────────────────
-
-JUNK_CATCHES = [
-    ("an empty acorn shell", "🥜", 0),
-    ("a pinecone", "🌲", 1),
-    ("a leaf", "🍂", 0),
-    ("a stick", "🪵", 1),
-    ("a muddy walnut", "💩", 2),
-    ("a tiny mushroom", "🍄", 1),
-    ("an old bird feather", "🪶", 1),
-    ("a shiny pebble", "🪨", 2),
-    ("nothing! The trap was empty", "💨", 0),
-    ("a confused frog", "🐸", 3),
-]
+TREASURE_MAP_SELL_MULTIPLIER = 1.5
 
-# ─── SHOP DATA ────────────────────────────────────────────────────────────────
-
-SHOP_ITEMS = {
-    "better_trap": {"name": "Better Trap", "emoji": "🪤", "cost": 500, "currency": "acorns",
-                     "description": "-2s catch cooldown", "type": "upgrade", "upgrade_key": "trap_tier"},
-    # ── Bait — Junk Reduction ──
-    "peanut_butter_trap": {"name": "Peanut Butter Trap", "emoji": "🥜", "cost": 150, "currency": "acorns",
-                            "description": "-3% junk chance (5 catches)", "type": "consumable", "charges": 5},
-    "squirrel_bait": {"name": "Squirrel Bait", "emoji": "🥜", "cost": 500, "currency": "acorns",
-                       "description": "-5% junk chance (8 catches)", "type": "consumable", "charges": 8},
-    "premium_nuts": {"name": "Premium Nuts", "emoji": "🌰", "cost": 1500, "currency": "acorns",
-                      "description": "-8% junk chance (10 catches)", "type": "consumable", "charges": 10},
-    "golden_bait": {"name": "Golden Bait", "emoji": "🥇", "cost": 3, "currency": "silver_acorns",
-                     "description": "-10% junk chance (12 catches)", "type": "consumable", "charges": 12},
-    "honey_trap": {"name": "Honey Trap", "emoji": "🍯", "cost": 8, "currency": "silver_acorns",
-                    "description": "-15% junk chance (8 catches)", "type": "consumable", "charges": 8},
-    "perfect_bait": {"name": "Perfect Bait", "emoji": "💎", "cost": 3, "currency": "emerald_acorns",
-                      "description": "No junk catches (3 charges)", "type": "consumable", "charges": 3},
-    # ── Bait — Rarity Attraction ──
-    "shiny_acorn_bait": {"name": "Shiny Acorn Bait", "emoji": "✨", "cost": 1200, "currency": "acorns",
-                          "description": "+25% Rare+ drop rate (8 catches)", "type": "consumable", "charges": 8},
-    "rainbow_bait": {"name": "Rainbow Bait", "emoji": "🌈", "cost": 10000, "currency": "acorns",
-                      "description": "+30% Rare+ & -5% junk (8 catches)", "type": "consumable", "charges": 8},
-    "rare_scent": {"name": "Rare Scent", "emoji": "✨", "cost": 6000, "currency": "acorns",
-                    "description": "+50% Rare+ drop rate (12 catches)", "type": "consumable", "charges": 12},
-    "exotic_nectar": {"name": "Exotic Nectar", "emoji": "🌺", "cost": 8000, "currency": "acorns",
-                       "description": "+50% Epic+ drop rate (6 catches)", "type": "consumable", "charges": 6},
-    "mythic_truffle": {"name": "Mythic Truffle", "emoji": "🍄", "cost": 15, "currency": "silver_acorns",
-                        "description": "+200% Mythic drop rate (3 catches)", "type": "consumable", "charges": 3},
-    # ── Buffs ──
-    "lucky_acorn": {"name": "Lucky Acorn", "emoji": "🍀", "cost": 3000, "currency": "acorns",
-                     "description": "2x acorn rewards (20 min)", "type": "timed", "duration_minutes": 20},
-    "scholars_cap": {"name": "Scholar's Cap", "emoji": "🎓", "cost": 800, "currency": "acorns",
-                      "description": "2x XP (15 catches)", "type": "consumable", "charges": 15},
-    "xp_potion": {"name": "XP Potion", "emoji": "🧪", "cost": 4000, "currency": "acorns",
-                   "description": "3x XP (20 min)", "type": "timed", "duration_minutes": 20},
-    "acorn_storm": {"name": "Acorn Storm", "emoji": "⛈️", "cost": 5, "currency": "silver_acorns",
-                     "description": "3x acorn rewards (10 min)", "type": "timed", "duration_minutes": 10},
-    "silver_shimmer": {"name": "Silver Shimmer", "emoji": "🪙", "cost": 4000, "currency": "acorns",
-                        "description": "10% chance bonus 🥈🌰 (12 catches)", "type": "consumable", "charges": 12},
-    "treasure_map": {"name": "Treasure Map", "emoji": "🗺️", "cost": 8000, "currency": "acorns",
-                      "description": "+50% sell value (20 min)", "type": "timed", "duration_minutes": 20},
-    # ── Helpers ──
-    "squirrel_hunter": {"name": "Squirrel Hunter", "emoji": "🏹", "cost": 15000, "currency": "acorns",
-                         "description": "Auto-catch every 30 min (24h)", "type": "auto_catch",
-                         "interval_minutes": 30, "duration_hours": 24},
-    "scout_squirrel": {"name": "Scout Squirrel", "emoji": "🐿️", "cost": 6000, "currency": "acorns",
-                        "description": "Auto-catch every 60 min (48h)", "type": "auto_catch",
-                        "interval_minutes": 60, "duration_hours": 48},
-    "elite_hunter": {"name": "Elite Hunter", "emoji": "⚔️", "cost": 15, "currency": "silver_acorns",
-                      "description": "Auto-catch every 15 min (24h)", "type": "auto_catch",
-                      "interval_minutes": 15, "duration_hours": 24},
-    "master_hunter": {"name": "Master Hunter", "emoji": "🦅", "cost": 25, "currency": "silver_acorns",
-                       "description": "Auto-catch every 10 min (12h)", "type": "auto_catch",
-                       "interval_minutes": 10, "duration_hours": 12},
-}
+# ─── ASSET CACHE ──────────────────────────────────────────────────────────────
+
+# Optional channel where species images are uploaded once and reused via CDN URL
+ASSET_CHANNEL_ID = os.getenv("ASSET_CHANNEL_ID")
+
+
+def _load_assets(squirrels=None) -> dict[str, bytes]:
+    """Read every species image into memory once so catches never touch the disk.
+
+    Uses the thumbnail variant from the optimized-asset manifest when one was built.
+    """
+    optimized = load_manifest()["files"]
+    assets = {}
+    for sq in squirrels or SQUIRRELS:
+        image = sq[6]
+        src = f"{ASSET_DIR}/{image}"
+        path = optimized.get(src, {}).get("jpeg", src)
+        try:
+            with open(path, "rb") as f:
+                assets[image] = f.read()
+        except OSError:
+            print(f"⚠️ Missing asset: {image}")
+    return assets
+
+
+_asset_bytes: dict[str, bytes] = _load_assets()
+# CDN URLs of images already uploaded to ASSET_CHANNEL_ID, keyed by filename
+_asset_urls: dict[str, str] = {}
 
-UPGRADE_TIERS = {
-    "trap_tier": {"name": "Trap Speed", "max": 3,
-                   "tiers": [{"cost": 2000, "label": "3s cooldown"}, {"cost": 10000, "label": "2.5s cooldown"}, {"cost": 40000, "label": "2s cooldown"}]},
-    "junk_resist_tier": {"name": "Junk Resistance", "max": 3,
-                          "tiers": [{"cost": 3000, "label": "-3% junk"}, {"cost": 15000, "label": "-5% junk"}, {"cost": 60000, "label": "-8% junk"}]},
-    "acorn_magnet_tier": {"name": "Acorn Magnet", "max": 3,
-                           "tiers": [{"cost": 5000, "label": "+5% acorns"}, {"cost": 25000, "label": "+10% acorns"}, {"cost": 80000, "label": "+15% acorns"}]},
-}
 
-TRAP_COOLDOWNS = [3.5, 3, 2.5, 2]  # index = trap_tier
-JUNK_RESIST_BONUSES = [0, 3, 5, 8]  # index = junk_resist_tier
-ACORN_MAGNET_BONUSES = [0, 5, 10, 15]  # index = acorn_magnet_tier
+def _attach_thumbnail(embed: discord.Embed, image: str) -> discord.File | None:
+    """Set a species thumbnail on the embed. Returns a File to attach, or None if a CDN URL was used."""
+    url = _asset_urls.get(image)
+    if url:
+        embed.set_thumbnail(url=url)
+        return None
+    data = _asset_bytes.get(image)
+    if data is None:
+        return None
+    embed.set_thumbnail(url=f"attachment://{image}")
+    return discord.File(io.BytesIO(data), filename=image)
+
+
+async def _publish_assets():
+    """Upload each species image to the asset channel once and remember its CDN URL.
+
+    Images the bot already posted there are reused; only missing ones are uploaded.
+    Re-scanning also picks up fresh signed URLs, since Discord CDN links expire.
+    """
+    channel = bot.get_channel(int(ASSET_CHANNEL_ID))
+    if channel is None:
+        print(f"⚠️ Asset channel {ASSET_CHANNEL_ID} not found; sending images as attachments")
+        return
+
+    urls = {}
+    async for message in channel.history(limit=200):
+        if message.author != bot.user:
+            continue
+        for attachment in message.attachments:
+            if attachment.filename in _asset_bytes and attachment.filename not in urls:
+                urls[attachment.filename] = attachment.url
+
+    for image, data in _asset_bytes.items():
+        if image in urls:
+            continue
+        message = await channel.send(file=discord.File(io.BytesIO(data), filename=image))
+        urls[image] = message.attachments[0].url
+
+    _asset_urls.clear()
+    _asset_urls.update(urls)
+
 
 # ─── COOLDOWNS ────────────────────────────────────────────────────────────────
 
+# ─── DAILY BONUS ──────────────────────────────────────────────────────────────
+
+DAILY_BASE_REWARD = 50            # acorns per claim
+DAILY_LEVEL_BONUS = 10            # extra acorns per player level
+DAILY_COOLDOWN = timedelta(days=1)
+
 # ─── REFERRAL SYSTEM ─────────────────────────────────────────────────────────
 
 REFERRAL_REWARD_REFERRER = 500    # acorns for the person who referred
@@ -206,61 +205,64 @@ HINTS = [
 
 # ─── COOLDOWNS ────────────────────────────────────────────────────────────────
 
-CATCH_COOLDOWN = 3.5  # base seconds between catches
-cooldowns: dict[int, datetime] = {}
+# user_id -> time the trap is ready again. Trap cooldowns come from the catalog
+# and can change on reload, so entries live for the longest one it accepts.
+# Sized well above the players catching in any one minute: evicting a live
+# entry would let that player skip their cooldown.
+cooldowns = TTLCache("cooldowns", ttl=MAX_TRAP_COOLDOWN, maxsize=100_000)
 
-# Track which menu page an interaction came from (Interaction uses __slots__)
-_interaction_pages: dict[int, str] = {}
+# Track which menu page an interaction came from (Interaction uses __slots__).
+# Handlers that edit in place never pop their entry, so entries expire instead.
+_interaction_pages = TTLCache("interaction_pages", ttl=60)
 
-# ─── LEVELING ─────────────────────────────────────────────────────────────────
+# ─── CATCH LOGIC ──────────────────────────────────────────────────────────────
 
-def xp_for_level(level: int) -> int:
-    return int(50 * (level ** 1.5))
+def new_catch_rng() -> tuple[int, random.Random]:
+    """A fresh seed and the generator it seeds, so each catch can be logged and replayed."""
+    seed = random.getrandbits(63)
+    return seed, random.Random(seed)
 
-def check_level_up(player: dict) -> bool:
-    needed = xp_for_level(player["level"])
-    if player["xp"] >= needed:
-        player["xp"] -= needed
-        player["level"] += 1
-        return True
-    return False
 
-# ─── CATCH LOGIC ──────────────────────────────────────────────────────────────
+def log_catch(user_id: str, source: str, rng_seed: int, buffs: list[str], event: dict):
+    """Append a catch to the event log and count it in the economy rollups."""
+    catch_log.record(user_id, buffs=buffs, source=source, rng_seed=rng_seed, **event)
+    minted = event["acorns"] + event.get("silver_acorns", 0) * EXCHANGE_RATES["silver_acorns"]
+    economy.mint("catch", minted)
+    economy.add("catches", event["rarity"] or "Junk")
+
 
 def roll_catch(player_level: int, junk_resist_tier: int = 0,
                bait_junk_reduction: int = 0,
-               rare_bonus: int = 0, epic_bonus: int = 0, mythic_bonus: int = 0) -> tuple:
+               rare_bonus: int = 0, epic_bonus: int = 0, mythic_bonus: int = 0,
+               rng: random.Random = random, catalog=None) -> tuple:
     """Returns either a squirrel tuple or a junk tuple.
-    junk_resist_tier: permanent junk reduction tier (0-3)
+    junk_resist_tier: permanent junk reduction tier (effects per tier come from the catalog)
     bait_junk_reduction: temporary junk % reduction from bait buffs
     rare_bonus: % boost to Rare+ squirrels
     epic_bonus: % boost to Epic+ squirrels
     mythic_bonus: % boost to Mythic squirrels
+    rng: source of randomness; pass a seeded random.Random to make the roll replayable
+    catalog: catalog version to roll against (defaults to the live one)
     """
+    catalog = catalog or CATALOG
     # 30% chance of junk, decreasing slightly with level
-    junk_chance = max(5, 30 - player_level - JUNK_RESIST_BONUSES[junk_resist_tier] - bait_junk_reduction)
-    if random.randint(1, 100) <= junk_chance:
-        return ("junk", random.choice(JUNK_CATCHES))
+    junk_resist = catalog.upgrade_effect("junk_resist_tier", junk_resist_tier)
+    junk_chance = max(5, 30 - player_level - junk_resist - bait_junk_reduction)
+    if rng.randint(1, 100) <= junk_chance:
+        return ("junk", rng.choice(catalog.junk))
 
     # Weighted random squirrel selection
     # Higher level = slightly better luck
     level_bonus = min(player_level * 0.5, 10)  # up to +10% at high levels
-    weights = []
-    for sq in SQUIRRELS:
-        w = sq[5]
-        rarity = sq[2]
-        if rarity == "Rare":
-            w *= (1 + (level_bonus + rare_bonus) / 100)
-        elif rarity == "Epic":
-            w *= (1 + (level_bonus + rare_bonus + epic_bonus) / 100)
-        elif rarity == "Legendary":
-            w *= (1 + (level_bonus + rare_bonus + epic_bonus) / 100)
-        elif rarity == "Mythic":
-            w *= (1 + (level_bonus + rare_bonus + epic_bonus + mythic_bonus) / 100)
-        weights.append(w)
-
-    chosen = random.choices(SQUIRRELS, weights=weights, k=1)[0]
-    acorns = random.randint(chosen[3], chosen[4])
+    # Scale each boost group's total weight, pick a group, then a species within it
+    bonuses = {"rare": rare_bonus, "epic": epic_bonus, "mythic": mythic_bonus}
+    weights = [
+        total * (1 + (level_bonus + sum(bonuses[b] for b in boosts)) / 100) if boosts else total
+        for (boosts, _, _), total in zip(catalog.sampling, catalog.sampling_totals)
+    ]
+    _, members, cum_weights = rng.choices(catalog.sampling, weights=weights, k=1)[0]
+    chosen = rng.choices(members, cum_weights=cum_weights, k=1)[0]
+    acorns = rng.randint(chosen[3], chosen[4])
 
     # Level bonus to acorns
     acorns = int(acorns * (1 + player_level * 0.02))
@@ -276,8 +278,15 @@ MENU_PAGES = {
 }
 
 
-async def get_page_embed(page, user):
-    """Get the navigation embed shown when switching to a menu page."""
+# ─── TEMPLATE CACHE ──────────────────────────────────────────────────────────
+# Embeds and views that only depend on static game data are built once and
+# shared. Cached embeds and views must never be mutated by callers; per-user
+# variants are keyed by their dynamic inputs (balances, affordability flags).
+
+
+@functools.cache
+def _static_page_embed(page):
+    """Navigation embed for pages without per-user content."""
     if page == "play":
         return discord.Embed(
             title="🐿️ Squirrel Catcher",
@@ -287,7 +296,29 @@ async def get_page_embed(page, user):
             ),
             color=0x8B4513,
         )
-    elif page == "shop":
+    elif page == "info":
+        return discord.Embed(
+            title="📋 Information",
+            description="Check your daily bonus, explore the bestiary, view leaderboards, and more!",
+            color=0x3498DB,
+        )
+    return discord.Embed(title="🐿️ Squirrel Catcher", color=0x8B4513)
+
+
+_menu_views: dict[str, "MenuView"] = {}
+
+
+def _menu_view(page="play"):
+    """Shared MenuView for a page (views need a running loop, so built lazily)."""
+    view = _menu_views.get(page)
+    if view is None:
+        view = _menu_views[page] = MenuView(page=page)
+    return view
+
+
+async def get_page_embed(page, user):
+    """Get the navigation embed shown when switching to a menu page."""
+    if page == "shop":
         player = await db.get_player(str(user.id))
         embed = discord.Embed(
             title="🛒 Shop & Buffs",
@@ -300,17 +331,24 @@ async def get_page_embed(page, user):
             inline=False,
         )
         return embed
-    elif page == "info":
-        return discord.Embed(
-            title="📋 Information",
-            description="Check your daily bonus, explore the bestiary, view leaderboards, and more!",
-            color=0x3498DB,
-        )
-    return discord.Embed(title="🐿️ Squirrel Catcher", color=0x8B4513)
+    return _static_page_embed(page)
 
 
 # ─── MENU COMPONENTS ────────────────────────────────────────────────────────
 
+class GameView(discord.ui.View):
+    """Base for the bot's views: answers with a friendly retry message while the database is down."""
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item):
+        if not isinstance(error, StorageUnavailable):
+            await super().on_error(interaction, error, item)
+            return
+        if interaction.response.is_done():
+            await interaction.followup.send(DB_UNAVAILABLE_MSG, ephemeral=True)
+        else:
+            await interaction.response.send_message(DB_UNAVAILABLE_MSG, ephemeral=True)
+
+
 class MenuButton(discord.ui.Button):
     """A button that triggers a game action and sends a new message."""
     def __init__(self, *, action, **kwargs):
@@ -319,13 +357,14 @@ class MenuButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         # Carry the current page context so response messages keep the same menu
-        _interaction_pages[interaction.id] = self.view.current_page
+        _interaction_pages.set(interaction.id, self.view.current_page)
         handlers = {
             "catch": do_catch, "bag": do_bag, "balance": do_balance,
             "profile": do_profile, "shop": do_shop, "buffs": do_buffs,
             "shop_items": do_shop_items, "shop_upgrades": do_shop_upgrades,
             "daily": do_daily, "bestiary": do_bestiary,
-            "leaderboard": do_leaderboard, "exchange": do_exchange_view,
+            "leaderboard": do_leaderboard, "server_leaderboard": do_server_leaderboard,
+            "exchange": do_exchange_view,
             "help": do_help, "referrals": do_referrals,
         }
         handler = handlers.get(self.action)
@@ -356,11 +395,11 @@ class PageSelect(discord.ui.Select):
             await interaction.response.defer()
             return
         embed = await get_page_embed(selected, interaction.user)
-        view = MenuView(page=selected)
+        view = _menu_view(selected)
         await interaction.response.edit_message(embed=embed, view=view)
 
 
-class MenuView(discord.ui.View):
+class MenuView(GameView):
     """Dynamic menu view that shows different buttons based on the current page."""
     def __init__(self, page="play"):
         super().__init__(timeout=None)
@@ -401,49 +440,25 @@ class MenuView(discord.ui.View):
                                      action="help", custom_id="info:help", row=1))
             self.add_item(MenuButton(label="Referrals", emoji="🤝", style=discord.ButtonStyle.primary,
                                      action="referrals", custom_id="info:referrals", row=2))
+            self.add_item(MenuButton(label="Server Top", emoji="🏘️", style=discord.ButtonStyle.primary,
+                                     action="server_leaderboard", custom_id="info:server_leaderboard", row=2))
 
 
 
 # ─── SHOP VIEWS ──────────────────────────────────────────────────────────────
 
-# Shop item categories
-_SHOP_CATEGORIES = {
-    "bait":    {"label": "Bait",    "emoji": "🥜", "keys": [
-        "peanut_butter_trap", "squirrel_bait", "premium_nuts", "golden_bait", "honey_trap", "perfect_bait",
-        "shiny_acorn_bait", "rainbow_bait", "rare_scent", "exotic_nectar", "mythic_truffle",
-    ]},
-    "buffs":   {"label": "Buffs",   "emoji": "🍀", "keys": [
-        "lucky_acorn", "scholars_cap", "xp_potion", "acorn_storm", "silver_shimmer", "treasure_map",
-    ]},
-    "helpers": {"label": "Helpers", "emoji": "🏹", "keys": [
-        "scout_squirrel", "squirrel_hunter", "elite_hunter", "master_hunter",
-    ]},
-}
-_SHOP_CONSUMABLE_KEYS = [k for k, v in SHOP_ITEMS.items() if v["type"] != "upgrade"]
-
-
 def _item_category(item_key):
     """Return the shop category for a given item key, or 'bait' as default."""
-    for cat_key, cat in _SHOP_CATEGORIES.items():
-        if item_key in cat["keys"]:
-            return cat_key
-    return "bait"
+    return CATALOG.item_categories.get(item_key, "bait")
 
 
 class BuyButton(discord.ui.Button):
     """A button that purchases a shop item when clicked."""
-    def __init__(self, item_key, *, player=None, row=0):
+    def __init__(self, item_key, *, can_afford=True, row=0):
         item = SHOP_ITEMS.get(item_key) or {}
-        label = item.get("name", item_key)
-        emoji = item.get("emoji")
-        currency = item.get("currency", "acorns")
-        cost = item.get("cost", 0)
-        currency_emoji = CURRENCIES.get(currency, "🌰")
-        cost_str = f" ({cost:,}{currency_emoji})"
-        can_afford = (player or {}).get(currency, 0) >= cost if player else True
         super().__init__(
-            label=f"{label}{cost_str}",
-            emoji=emoji,
+            label=_buy_button_label(item_key),
+            emoji=item.get("emoji"),
             style=discord.ButtonStyle.green,
             disabled=not can_afford,
             custom_id=f"buy:{item_key}",
@@ -455,33 +470,58 @@ class BuyButton(discord.ui.Button):
         await do_buy(interaction, self.item_key)
 
 
-_SHOP_PAGE_SIZE = 5  # items per page in shop
+@_clears_on_reload
+@functools.cache
+def _buy_button_label(item_key):
+    """Pre-rendered buy button label, e.g. 'Golden Bait (3🥈🌰)'."""
+    item = SHOP_ITEMS.get(item_key) or {}
+    currency_emoji = CURRENCIES.get(item.get("currency", "acorns"), "🌰")
+    return f"{item.get('name', item_key)} ({item.get('cost', 0):,}{currency_emoji})"
+
+
+def _shop_page(category, page):
+    """Clamp a shop page and return (page, total_pages, item keys on that page)."""
+    pages = CATALOG.shop_pages[category]
+    page = min(page, len(pages) - 1)
+    return page, len(pages), pages[page]
+
 
+def _shop_items_view(player, category="bait", page=0):
+    """Shared ShopItemsView variant matching what the player can afford on this page."""
+    page, _, keys = _shop_page(category, page)
+    affordable = tuple(
+        player.get(SHOP_ITEMS[k]["currency"], 0) >= SHOP_ITEMS[k]["cost"] for k in keys
+    )
+    return _shop_items_view_variant(category, page, affordable)
+
+
+@_clears_on_reload
+@functools.lru_cache(maxsize=256)
+def _shop_items_view_variant(category, page, affordable):
+    return ShopItemsView(category=category, page=page, affordable=affordable)
 
-class ShopItemsView(discord.ui.View):
+
+class ShopItemsView(GameView):
     """Category-tabbed view of purchasable shop items with pagination."""
-    def __init__(self, player=None, category="bait", page=0):
+    def __init__(self, category="bait", page=0, affordable=None):
         super().__init__(timeout=None)
         self.category = category
-        self.page = page
 
         # Row 0: Category tabs (current one disabled)
-        for cat_key, cat in _SHOP_CATEGORIES.items():
+        for cat_key, cat in CATALOG.shop_categories.items():
             self.add_item(ShopCategoryButton(
                 cat_key=cat_key, label=cat["label"], emoji=cat["emoji"],
                 is_current=(cat_key == category), row=0,
             ))
 
         # Paginate items
-        all_keys = _SHOP_CATEGORIES[category]["keys"]
-        total_pages = max(1, (len(all_keys) + _SHOP_PAGE_SIZE - 1) // _SHOP_PAGE_SIZE)
-        page = min(page, total_pages - 1)
-        start = page * _SHOP_PAGE_SIZE
-        page_keys = all_keys[start:start + _SHOP_PAGE_SIZE]
+        page, total_pages, page_keys = _shop_page(category, page)
+        self.page = page
 
         # Rows 1-2: Buy buttons for current page (max 5 items)
         for i, key in enumerate(page_keys):
-            self.add_item(BuyButton(key, player=player, row=1 + i // 3))
+            can_afford = affordable[i] if affordable is not None else True
+            self.add_item(BuyButton(key, can_afford=can_afford, row=1 + i // 3))
 
         # Row 3: Pagination arrows (if needed)
         if total_pages > 1:
@@ -517,7 +557,7 @@ class ShopCategoryButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction):
         player = await db.get_player(str(interaction.user.id))
         embed = _build_shop_embed(player, category=self.cat_key, page=0)
-        await interaction.response.edit_message(embed=embed, view=ShopItemsView(player=player, category=self.cat_key, page=0))
+        await interaction.response.edit_message(embed=embed, view=_shop_items_view(player, category=self.cat_key, page=0))
 
 
 class ShopPageButton(discord.ui.Button):
@@ -539,7 +579,7 @@ class ShopPageButton(discord.ui.Button):
         embed = _build_shop_embed(player, category=self.category, page=self.target_page)
         await interaction.response.edit_message(
             embed=embed,
-            view=ShopItemsView(player=player, category=self.category, page=self.target_page),
+            view=_shop_items_view(player, category=self.category, page=self.target_page),
         )
 
 
@@ -552,29 +592,45 @@ class BackToShopMenuButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         embed = await get_page_embed("shop", interaction.user)
-        await interaction.response.edit_message(embed=embed, view=MenuView(page="shop"))
+        await interaction.response.edit_message(embed=embed, view=_menu_view("shop"))
+
+
+def _shop_upgrade_view(player):
+    """Shared ShopUpgradeView variant for the player's upgrade tiers and balance."""
+    acorns = player.get("acorns", 0)
+    state = []
+    for key, upgrade in UPGRADE_TIERS.items():
+        current_tier = player.get(key, 0)
+        can_afford = current_tier < upgrade["max"] and acorns >= upgrade["tiers"][current_tier]["cost"]
+        state.append((current_tier, can_afford))
+    return _shop_upgrade_view_variant(tuple(state))
+
 
+@_clears_on_reload
+@functools.lru_cache(maxsize=128)
+def _shop_upgrade_view_variant(state):
+    return ShopUpgradeView(state)
 
-class ShopUpgradeView(discord.ui.View):
-    """View for purchasing permanent upgrades."""
-    def __init__(self, player=None):
+
+class ShopUpgradeView(GameView):
+    """View for purchasing permanent upgrades.
+
+    state holds one (current_tier, can_afford) pair per entry in UPGRADE_TIERS.
+    """
+    def __init__(self, state):
         super().__init__(timeout=None)
         # Row 0: Upgrade buy buttons
-        for key, upgrade in UPGRADE_TIERS.items():
-            current_tier = (player or {}).get(key, 0)
-            acorns = (player or {}).get("acorns", 0)
+        for (key, upgrade), (current_tier, can_afford) in zip(UPGRADE_TIERS.items(), state):
             if current_tier >= upgrade["max"]:
                 label = f"{upgrade['name']} (MAX)"
-                disabled = True
                 cost_str = ""
             else:
                 tier = upgrade["tiers"][current_tier]
                 label = f"{upgrade['name']}"
                 cost_str = f" ({tier['cost']:,}🌰)"
-                disabled = acorns < tier["cost"]
             self.add_item(UpgradeBuyButton(
                 upgrade_key=key, label=f"{label}{cost_str}",
-                disabled=disabled, row=0,
+                disabled=not can_afford, row=0,
             ))
 
         # Row 4: Back to shop menu
@@ -606,29 +662,33 @@ class BackToShopMenuButton2(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         embed = await get_page_embed("shop", interaction.user)
-        await interaction.response.edit_message(embed=embed, view=MenuView(page="shop"))
+        await interaction.response.edit_message(embed=embed, view=_menu_view("shop"))
 
 
-def _build_shop_embed(player, category=None, page=0):
-    """Build the shop embed showing items and balance (paginated)."""
-    if category and category in _SHOP_CATEGORIES:
-        cat = _SHOP_CATEGORIES[category]
-        all_keys = cat["keys"]
-        total_pages = max(1, (len(all_keys) + _SHOP_PAGE_SIZE - 1) // _SHOP_PAGE_SIZE)
-        page = min(page, total_pages - 1)
-        start = page * _SHOP_PAGE_SIZE
-        keys = all_keys[start:start + _SHOP_PAGE_SIZE]
+@_clears_on_reload
+@functools.cache
+def _shop_embed_template(category=None, page=0):
+    """Static part of the shop embed: (title, items field value)."""
+    if category and category in CATALOG.shop_categories:
+        cat = CATALOG.shop_categories[category]
+        _, _, keys = _shop_page(category, page)
         title = f"🛒 Squirrel Shop — {cat['emoji']} {cat['label']}"
-        embed = discord.Embed(title=title, color=0xE67E22)
     else:
-        embed = discord.Embed(title="🛒 Squirrel Shop", color=0xE67E22)
-        keys = _SHOP_CONSUMABLE_KEYS
+        title = "🛒 Squirrel Shop"
+        keys = CATALOG.consumable_keys
     item_lines = []
     for key in keys:
         item = SHOP_ITEMS[key]
         currency_emoji = CURRENCIES.get(item["currency"], "🌰")
         item_lines.append(f"{item['emoji']} **{item['name']}** — {item['cost']:,} {currency_emoji}\n  _{item['description']}_")
-    embed.add_field(name="Items", value="\n".join(item_lines), inline=False)
+    return title, "\n".join(item_lines)
+
+
+def _build_shop_embed(player, category=None, page=0):
+    """Build the shop embed showing items and balance (paginated)."""
+    title, items = _shop_embed_template(category, page)
+    embed = discord.Embed(title=title, color=0xE67E22)
+    embed.add_field(name="Items", value=items, inline=False)
     embed.add_field(
         name="Your Balance",
         value=f"🌰 {player.get('acorns', 0):,} | 🥈🌰 {player.get('silver_acorns', 0):,} | 💚🌰 {player.get('emerald_acorns', 0):,}",
@@ -637,24 +697,29 @@ def _build_shop_embed(player, category=None, page=0):
     return embed
 
 
+@_clears_on_reload
+@functools.cache
+def _upgrade_status(key, current_tier):
+    """Pre-rendered tier list for one upgrade at the given tier."""
+    upgrade = UPGRADE_TIERS[key]
+    if current_tier >= upgrade["max"]:
+        return f"**{upgrade['name']}** — MAX ✅"
+    tier_display = []
+    for i, tier in enumerate(upgrade["tiers"]):
+        if i < current_tier:
+            tier_display.append(f"~~Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)~~ ✅")
+        elif i == current_tier:
+            tier_display.append(f"**Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)** ← Next")
+        else:
+            tier_display.append(f"Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)")
+    return f"**{upgrade['name']}**\n" + "\n".join(tier_display)
+
+
 def _build_upgrades_embed(player):
     """Build the embed for the permanent upgrades sub-menu."""
     embed = discord.Embed(title="🪤 Permanent Upgrades", color=0xE67E22)
-    for key, upgrade in UPGRADE_TIERS.items():
-        current_tier = player.get(key, 0)
-        tier_display = []
-        for i, tier in enumerate(upgrade["tiers"]):
-            if i < current_tier:
-                tier_display.append(f"~~Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)~~ ✅")
-            elif i == current_tier:
-                tier_display.append(f"**Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)** ← Next")
-            else:
-                tier_display.append(f"Tier {i+1}: {tier['label']} ({tier['cost']:,} 🌰)")
-        if current_tier >= upgrade["max"]:
-            status = f"**{upgrade['name']}** — MAX ✅"
-        else:
-            status = f"**{upgrade['name']}**\n" + "\n".join(tier_display)
-        embed.add_field(name="\u200b", value=status, inline=False)
+    for key in UPGRADE_TIERS:
+        embed.add_field(name="\u200b", value=_upgrade_status(key, player.get(key, 0)), inline=False)
     embed.add_field(
         name="Your Balance",
         value=f"🌰 {player.get('acorns', 0):,}",
@@ -671,9 +736,11 @@ _EXCHANGE_TIERS = [
     ("silver_acorns", "emerald_acorns", 10, 1, "🥈🌰", "💚🌰"),
     ("emerald_acorns", "golden_acorns", 10, 1, "💚🌰", "✨🌰"),
 ]
+# (from_currency, to_currency, rate) chain used for "exchange all"
+_EXCHANGE_CHAIN = [(from_cur, to_cur, cost) for from_cur, to_cur, cost, *_ in _EXCHANGE_TIERS]
 
 
-class ExchangeView(discord.ui.View):
+class ExchangeView(GameView):
     """View with buttons to exchange currencies (1, 5, 10, All per tier)."""
     def __init__(self, player):
         super().__init__(timeout=None)
@@ -682,7 +749,7 @@ class ExchangeView(discord.ui.View):
             max_units = available // cost
             for amount in [1, 5, 10, "Max"]:
                 if amount == "Max":
-                    units = max_units
+                    units = None
                     label = f"Max {emoji_from}→{emoji_to}"
                     cid = f"exchange:{from_cur}_to_{to_cur}_max"
                 else:
@@ -690,20 +757,24 @@ class ExchangeView(discord.ui.View):
                     label = f"{amount} {emoji_to}"
                     cid = f"exchange:{from_cur}_to_{to_cur}_{amount}"
                 self.add_item(ExchangeButton(
-                    from_currency=from_cur, to_currency=to_cur,
-                    cost_per_unit=cost, gain_per_unit=gain,
+                    from_currency=from_cur, to_currency=to_cur, cost_per_unit=cost,
                     emoji_from=emoji_from, emoji_to=emoji_to,
                     units=units, label=label, custom_id=cid,
-                    disabled=(max_units < (units if amount != "Max" else 1)),
+                    disabled=(max_units < (units or 1)),
                     row=i,
                 ))
+        # Row 3: Cascade everything up the chain
+        can_cascade = any(
+            player.get(from_cur, 0) >= cost for from_cur, _, cost in _EXCHANGE_CHAIN
+        )
+        self.add_item(ExchangeAllButton(disabled=not can_cascade, row=3))
         # Row 4: Back
         self.add_item(BackToPlayMenuButton(row=4))
 
 
 class ExchangeButton(discord.ui.Button):
-    """Button that exchanges a specific number of currency units."""
-    def __init__(self, *, from_currency, to_currency, cost_per_unit, gain_per_unit,
+    """Button that exchanges a specific number of currency units (None = as many as possible)."""
+    def __init__(self, *, from_currency, to_currency, cost_per_unit,
                  emoji_from, emoji_to, units, label, custom_id, disabled, row):
         super().__init__(
             label=label,
@@ -715,45 +786,67 @@ class ExchangeButton(discord.ui.Button):
         self.from_currency = from_currency
         self.to_currency = to_currency
         self.cost_per_unit = cost_per_unit
-        self.gain_per_unit = gain_per_unit
         self.units = units
         self.emoji_from = emoji_from
         self.emoji_to = emoji_to
 
     async def callback(self, interaction: discord.Interaction):
         user_id = str(interaction.user.id)
-        player = await db.get_player(user_id)
-
-        available = player.get(self.from_currency, 0)
-        max_units = available // self.cost_per_unit
-        # For "All", self.units was set at view creation; recalculate from live data
-        units = min(self.units, max_units) if self.units > 0 else max_units
-
-        if units < 1:
+        result = await db.exchange_currency(
+            user_id, self.from_currency, self.to_currency, self.cost_per_unit, self.units,
+        )
+        if result is None and self.units is not None:
+            # Fixed amounts clamp to what the player can afford, like Max
+            result = await db.exchange_currency(user_id, self.from_currency, self.to_currency, self.cost_per_unit)
+        if result is None:
             await interaction.response.send_message(
-                f"❌ You need at least **{self.cost_per_unit}** {self.emoji_from} to exchange!",
+                f"❌ You need at least **{self.cost_per_unit:,}** {self.emoji_from} to exchange!",
                 ephemeral=True,
             )
             return
 
-        spent = units * self.cost_per_unit
-        gained = units * self.gain_per_unit
-
-        player[self.from_currency] -= spent
-        player[self.to_currency] = player.get(self.to_currency, 0) + gained
-        await db.update_player(user_id, player)
-
+        spent = result["units"] * self.cost_per_unit
         embed = discord.Embed(
             title="🔄 Exchange Complete!",
-            description=f"**{spent:,}** {self.emoji_from} → **{gained:,}** {self.emoji_to}",
+            description=f"**{spent:,}** {self.emoji_from} → **{result['units']:,}** {self.emoji_to}",
             color=0x2ECC71,
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        # Refresh the exchange view with updated balances
-        refreshed_player = await db.get_player(user_id)
-        exchange_embed = _build_exchange_embed(refreshed_player)
-        await interaction.message.edit(embed=exchange_embed, view=ExchangeView(refreshed_player))
+        # Refresh the exchange view with the balances returned by the exchange
+        balances = result["after"]
+        await interaction.message.edit(embed=_build_exchange_embed(balances), view=ExchangeView(balances))
+
+
+class ExchangeAllButton(discord.ui.Button):
+    """Button that exchanges everything up the currency chain at once."""
+    def __init__(self, *, disabled, row):
+        super().__init__(
+            label="Exchange All", emoji="⏫",
+            style=discord.ButtonStyle.primary,
+            disabled=disabled,
+            custom_id="exchange:all",
+            row=row,
+        )
+
+    async def callback(self, interaction: discord.Interaction):
+        result = await db.exchange_all(str(interaction.user.id), _EXCHANGE_CHAIN)
+        if result is None:
+            await interaction.response.send_message("❌ You don't have enough to exchange anything!", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=_exchange_all_embed(result), ephemeral=True)
+        balances = result["after"]
+        await interaction.message.edit(embed=_build_exchange_embed(balances), view=ExchangeView(balances))
+
+
+def _exchange_all_embed(result):
+    """Summarize an exchange-all result as before → after per currency."""
+    lines = []
+    for currency, emoji in CURRENCIES.items():
+        before, after = result["before"][currency], result["after"][currency]
+        if before != after:
+            lines.append(f"{emoji} {before:,} → **{after:,}**")
+    return discord.Embed(title="⏫ Exchanged Up the Chain!", description="\n".join(lines), color=0x2ECC71)
 
 
 class BackToPlayMenuButton(discord.ui.Button):
@@ -764,7 +857,7 @@ class BackToPlayMenuButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         embed = await get_page_embed("play", interaction.user)
-        await interaction.response.edit_message(embed=embed, view=MenuView(page="play"))
+        await interaction.response.edit_message(embed=embed, view=_menu_view("play"))
 
 
 def _build_exchange_embed(player):
@@ -809,7 +902,7 @@ async def _send(ctx_or_interaction, embed, view=None, ephemeral=False):
     if view is None:
         iid = getattr(ctx_or_interaction, 'id', None)
         page = _interaction_pages.pop(iid, 'play') if iid else 'play'
-        view = MenuView(page=page)
+        view = _menu_view(page)
     if isinstance(ctx_or_interaction, discord.Interaction):
         await ctx_or_interaction.response.send_message(embed=embed, view=view, ephemeral=ephemeral)
     else:
@@ -820,14 +913,17 @@ async def do_catch(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
     user_id = str(user.id)
+    # The whole catch uses the catalog that was live when it started, even across a reload
+    catalog = CATALOG
 
     player = await db.get_player(user_id)
 
     # Cooldown check (reduced by trap_tier)
-    cd_seconds = TRAP_COOLDOWNS[player.get("trap_tier", 0)]
+    cd_seconds = catalog.upgrade_effect("trap_tier", player.get("trap_tier", 0))
     now = datetime.now()
-    if user_id in cooldowns:
-        diff = (cooldowns[user_id] - now).total_seconds()
+    ready_at = cooldowns.get(user_id)
+    if ready_at is not None:
+        diff = (ready_at - now).total_seconds()
         if diff > 0:
             msg = f"⏳ Your trap is recharging! Try again in **{diff:.0f}s**."
             if is_interaction:
@@ -836,7 +932,7 @@ async def do_catch(ctx_or_interaction):
                 await ctx_or_interaction.send(msg)
             return
 
-    cooldowns[user_id] = now + timedelta(seconds=cd_seconds)
+    cooldowns.set(user_id, now + timedelta(seconds=cd_seconds))
 
     # Gather active buffs
     active_buffs = await db.get_active_buffs(user_id)
@@ -849,32 +945,36 @@ async def do_catch(ctx_or_interaction):
     has_silver_shimmer = False
     has_treasure_map = False
     charge_buff_ids = []  # buff IDs for charge-based buffs to consume
+    applied_buffs = []  # buff types that affected this catch, for the event log
 
-    # Bait effect lookup: buff_type -> (cost_value, effect_applicator)
-    # cost_value is used to rank baits; we convert all costs to base acorns
-    _bait_keys = set(_SHOP_CATEGORIES["bait"]["keys"])
+    # Baits are ranked by cost converted to base acorns; only the best one applies
     bait_buffs = []  # (cost_in_acorns, buff) for ranking
 
     for buff in active_buffs:
         bt = buff["buff_type"]
         bid = buff["id"]
-        if bt in _bait_keys:
+        if bt in catalog.bait_effects:
             # Rank by cost converted to base acorns for comparison
-            item = SHOP_ITEMS[bt]
+            item = catalog.shop_items[bt]
             cost_acorns = item["cost"] * EXCHANGE_RATES.get(item["currency"], 1)
             bait_buffs.append((cost_acorns, buff))
         elif bt == "lucky_acorn":
             acorn_multiplier = max(acorn_multiplier, 2)
+            applied_buffs.append(bt)
         elif bt == "scholars_cap":
             xp_multiplier = max(xp_multiplier, 2)
             charge_buff_ids.append(bid)
+            applied_buffs.append(bt)
         elif bt == "xp_potion":
             xp_multiplier = max(xp_multiplier, 3)
+            applied_buffs.append(bt)
         elif bt == "acorn_storm":
             acorn_multiplier = max(acorn_multiplier, 3)
+            applied_buffs.append(bt)
         elif bt == "silver_shimmer":
             has_silver_shimmer = True
             charge_buff_ids.append(bid)
+            applied_buffs.append(bt)
         elif bt == "treasure_map":
             has_treasure_map = True
 
@@ -884,21 +984,9 @@ async def do_catch(ctx_or_interaction):
         _, best_bait = bait_buffs[0]
         best_bt = best_bait["buff_type"]
         charge_buff_ids.append(best_bait["id"])
+        applied_buffs.append(best_bt)
 
-        _BAIT_EFFECTS = {
-            "peanut_butter_trap": {"junk": 3},
-            "squirrel_bait":     {"junk": 5},
-            "premium_nuts":      {"junk": 8},
-            "golden_bait":       {"junk": 10},
-            "honey_trap":        {"junk": 15},
-            "perfect_bait":      {"junk": 100},
-            "shiny_acorn_bait":  {"rare": 25},
-            "rainbow_bait":      {"rare": 30, "junk": 5},
-            "rare_scent":        {"rare": 50},
-            "exotic_nectar":     {"epic": 50},
-            "mythic_truffle":    {"mythic": 200},
-        }
-        effects = _BAIT_EFFECTS.get(best_bt, {})
+        effects = catalog.bait_effects[best_bt]
         bait_junk_reduction = effects.get("junk", 0)
         rare_bonus = effects.get("rare", 0)
         epic_bonus = effects.get("epic", 0)
@@ -912,8 +1000,10 @@ async def do_catch(ctx_or_interaction):
         msg = await ctx_or_interaction.send("🪤 Setting your trap in the forest...")
     await asyncio.sleep(1.5)
 
+    seed, rng = new_catch_rng()
     result = roll_catch(player["level"], player.get("junk_resist_tier", 0),
-                        bait_junk_reduction, rare_bonus, epic_bonus, mythic_bonus)
+                        bait_junk_reduction, rare_bonus, epic_bonus, mythic_bonus, rng, catalog)
+    silver_gain = 0
 
     # Consume charge-based buffs that were used
     for bid in charge_buff_ids:
@@ -921,9 +1011,9 @@ async def do_catch(ctx_or_interaction):
 
     if result[0] == "junk":
         _, (junk_name, junk_emoji, junk_acorns) = result
-        player["junk_catches"] += 1
-        player["acorns"] += junk_acorns
-        player["xp"] += 1 * xp_multiplier
+        species = None
+        event = dict(outcome="junk", catch_name=junk_name, rarity=None, acorns=junk_acorns,
+                     xp=1 * xp_multiplier)
 
         embed = discord.Embed(
             title=f"{junk_emoji} You caught... {junk_name}!",
@@ -935,16 +1025,12 @@ async def do_catch(ctx_or_interaction):
         sq_name, sq_emoji, sq_rarity, _, _, _, sq_image = squirrel
 
         # Apply acorn bonuses
-        magnet_bonus = ACORN_MAGNET_BONUSES[player.get("acorn_magnet_tier", 0)]
+        magnet_bonus = catalog.upgrade_effect("acorn_magnet_tier", player.get("acorn_magnet_tier", 0))
         acorns = int(acorns * (1 + magnet_bonus / 100))
         acorns *= acorn_multiplier
-
-        player["acorns"] += acorns
-        player["total_catches"] += 1
-        player["catches"][sq_name] = player["catches"].get(sq_name, 0) + 1
+        species = sq_name
 
         xp_gain = {"Common": 5, "Uncommon": 10, "Rare": 20, "Epic": 40, "Legendary": 80, "Mythic": 200}
-        player["xp"] += xp_gain.get(sq_rarity, 5) * xp_multiplier
 
         embed = discord.Embed(
             title=f"{sq_emoji} {user.display_name} caught a {sq_name}!",
@@ -952,9 +1038,7 @@ async def do_catch(ctx_or_interaction):
             color=RARITY_COLORS.get(sq_rarity, 0x808080),
         )
 
-        image_path = f"assets/{sq_image}"
-        file = discord.File(image_path, filename=sq_image)
-        embed.set_thumbnail(url=f"attachment://{sq_image}")
+        file = _attach_thumbnail(embed, sq_image)
 
         bonus_notes = []
         if acorn_multiplier > 1:
@@ -965,9 +1049,11 @@ async def do_catch(ctx_or_interaction):
             embed.description += f" ({' | '.join(bonus_notes)})"
 
         # Silver shimmer: 10% chance for bonus silver acorn
-        if has_silver_shimmer and random.random() < 0.10:
-            player["silver_acorns"] = player.get("silver_acorns", 0) + 1
+        if has_silver_shimmer and rng.random() < 0.10:
+            silver_gain = 1
             embed.description += "\n🪙 **Silver Shimmer!** +1 🥈🌰"
+        event = dict(outcome="squirrel", catch_name=sq_name, rarity=sq_rarity, acorns=acorns,
+                     xp=xp_gain.get(sq_rarity, 5) * xp_multiplier, silver_acorns=silver_gain)
 
         if sq_rarity in ("Epic", "Legendary", "Mythic"):
             embed.set_footer(text=f"🎉 Wow! A {sq_rarity} catch!")
@@ -978,24 +1064,30 @@ async def do_catch(ctx_or_interaction):
     if result[0] == "junk" and random.random() < 0.2:
         embed.set_footer(text=random.choice(HINTS))
 
-    leveled = check_level_up(player)
-    if leveled:
-        embed.add_field(name="🎉 LEVEL UP!", value=f"You are now **Level {player['level']}**!", inline=False)
+    # Only the rewards are written, as increments: the player row may have changed during the sleep
+    caught = await db.record_catch(user_id, event["acorns"], event["xp"], player["level"],
+                                   xp_for_level(player["level"]), species=species, silver_acorns=silver_gain)
+    if caught["leveled"]:
+        embed.add_field(name="🎉 LEVEL UP!", value=f"You are now **Level {caught['player']['level']}**!", inline=False)
 
-    await db.update_player(user_id, player)
+    log_catch(user_id, "manual", seed, applied_buffs, event)
+    if result[0] == "squirrel":
+        if await db.record_species_catch(sq_name, user_id, caught["new_species"]):
+            embed.add_field(name="🌍 World First!", value=f"Nobody had ever caught a {sq_name} before!", inline=False)
     iid = getattr(ctx_or_interaction, 'id', None)
     page = _interaction_pages.pop(iid, 'play') if iid else 'play'
-    if result[0] == "squirrel":
-        await msg.edit(content=None, embed=embed, view=MenuView(page=page), attachments=[file])
+    if result[0] == "squirrel" and file is not None:
+        await msg.edit(content=None, embed=embed, view=_menu_view(page), attachments=[file])
     else:
-        await msg.edit(content=None, embed=embed, view=MenuView(page=page))
+        await msg.edit(content=None, embed=embed, view=_menu_view(page))
 
 
 async def do_bag(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
     user_id = str(user.id)
-    player = await db.get_player(user_id)
+    snapshot = await db.get_profile_snapshot(user_id)
+    player = snapshot["player"]
     catches = player.get("catches", {})
 
     if not catches:
@@ -1008,7 +1100,7 @@ async def do_bag(ctx_or_interaction):
         sorted_catches = sorted(catches.items(), key=lambda x: x[1], reverse=True)
         lines = []
         for name, count in sorted_catches:
-            sq_data = next((s for s in SQUIRRELS if s[0] == name), None)
+            sq_data = CATALOG.squirrels_by_name.get(name.lower())
             if sq_data:
                 lines.append(f"{sq_data[1]} **{name}** ({sq_data[2]}) x{count}")
         embed = discord.Embed(
@@ -1019,7 +1111,7 @@ async def do_bag(ctx_or_interaction):
         embed.set_footer(text=f"Total unique species: {len(catches)} / {len(SQUIRRELS)}")
 
     # Show active buffs in bag
-    active_buffs = await db.get_active_buffs(user_id)
+    active_buffs = snapshot["buffs"]
     if active_buffs:
         buff_lines = []
         for buff in active_buffs:
@@ -1069,7 +1161,8 @@ async def do_profile(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
     user_id = str(user.id)
-    player = await db.get_player(user_id)
+    snapshot = await db.get_profile_snapshot(user_id)
+    player = snapshot["player"]
     xp_needed = xp_for_level(player["level"])
 
     embed = discord.Embed(title=f"🐿️ {user.display_name}'s Profile", color=0x8B4513)
@@ -1081,8 +1174,8 @@ async def do_profile(ctx_or_interaction):
     embed.add_field(name="Acorn Stash", value=" | ".join(bal_lines), inline=False)
 
     # Active bait
-    active_buffs = await db.get_active_buffs(user_id)
-    bait_keys = set(_SHOP_CATEGORIES["bait"]["keys"])
+    active_buffs = snapshot["buffs"]
+    bait_keys = CATALOG.bait_effects
     bait_buffs = []
     for buff in active_buffs:
         if buff["buff_type"] in bait_keys:
@@ -1136,9 +1229,13 @@ async def do_profile(ctx_or_interaction):
     unique = len(player.get("catches", {}))
     embed.add_field(name="Bestiary", value=f"📖 {unique}/{len(SQUIRRELS)} species discovered", inline=False)
 
-    ref_count = await db.get_referral_count(user_id)
+    ref_count = snapshot["referral_count"]
     embed.add_field(name="Referrals", value=f"🤝 {ref_count} friend{'s' if ref_count != 1 else ''} invited", inline=True)
 
+    rank_text = await _rank_text(user_id)
+    if rank_text:
+        embed.add_field(name="Rank", value=f"🏆 {rank_text}", inline=True)
+
     await _send(ctx_or_interaction, embed)
 
 
@@ -1146,35 +1243,25 @@ async def do_daily(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
     user_id = str(user.id)
-    player = await db.get_player(user_id)
-
-    last_daily = player.get("last_daily", None)
-    now = datetime.now(timezone.utc)
+    result = await db.claim_daily(user_id, DAILY_BASE_REWARD, DAILY_LEVEL_BONUS, DAILY_COOLDOWN)
 
-    if last_daily:
-        last = datetime.fromisoformat(last_daily)
-        if last.tzinfo is None:
-            last = last.replace(tzinfo=timezone.utc)
-        if (now - last).total_seconds() < 86400:
-            remaining = 86400 - (now - last).total_seconds()
-            hours = int(remaining // 3600)
-            mins = int((remaining % 3600) // 60)
-            embed = discord.Embed(
-                title="⏳ Daily Already Claimed",
-                description=f"Come back in **{hours}h {mins}m**.",
-                color=0x95A5A6,
-            )
-            await _send(ctx_or_interaction, embed)
-            return
+    if result["reward"] is None:
+        remaining = result["remaining"].total_seconds()
+        hours = int(remaining // 3600)
+        mins = int((remaining % 3600) // 60)
+        embed = discord.Embed(
+            title="⏳ Daily Already Claimed",
+            description=f"Come back in **{hours}h {mins}m**.",
+            color=0x95A5A6,
+        )
+        await _send(ctx_or_interaction, embed)
+        return
 
-    reward = 50 + (player["level"] * 10)
-    player["acorns"] += reward
-    player["last_daily"] = now.isoformat()
-    await db.update_player(user_id, player)
+    economy.mint("daily", result["reward"])
 
     embed = discord.Embed(
         title="🎁 Daily Bonus Claimed!",
-        description=f"You received **{reward}** 🌰 acorns!\n(Level {player['level']} bonus)",
+        description=f"You received **{result['reward']}** 🌰 acorns!\n(Level {result['level']} bonus)",
         color=0x2ECC71,
     )
     await _send(ctx_or_interaction, embed)
@@ -1183,52 +1270,89 @@ async def do_daily(ctx_or_interaction):
 async def do_bestiary(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
-    player = await db.get_player(str(user.id))
+    user_id = str(user.id)
+    player = await db.get_player(user_id)
     catches = player.get("catches", {})
+    world = await db.get_species_stats()
 
     lines = []
     for sq in SQUIRRELS:
         name, emoji, rarity, _, _, _, _ = sq
+        stats = world.get(name)
+        owners = f" · 👥 {stats['owners']:,} owners worldwide" if stats and stats["owners"] > 0 else ""
         if name in catches:
-            lines.append(f"{emoji} **{name}** — {rarity} ✅ (x{catches[name]})")
+            first = " 🏅" if stats and stats["discoverer"] == user_id else ""
+            lines.append(f"{emoji} **{name}** — {rarity} ✅ (x{catches[name]}){first}{owners}")
         else:
-            lines.append(f"❓ **???** — {rarity}")
+            lines.append(f"❓ **???** — {rarity}{owners}")
 
     embed = discord.Embed(title="📖 Squirrel Bestiary", description="\n".join(lines), color=0x8B4513)
-    embed.set_footer(text=f"Discovered: {len(catches)}/{len(SQUIRRELS)}")
+    embed.set_footer(text=f"Discovered: {len(catches)}/{len(SQUIRRELS)} | 🏅 = first discoverer worldwide")
     await _send(ctx_or_interaction, embed)
 
 
-async def do_leaderboard(ctx_or_interaction):
-    data = await db.load_all_players()
-    if not data:
-        embed = discord.Embed(title="🏆 Leaderboard", description="No squirrel catchers yet!", color=0xF1C40F)
+async def _display_name(user_id: str) -> str:
+    """Resolve a Discord display name, falling back to a short id."""
+    try:
+        user = bot.get_user(int(user_id)) or await bot.fetch_user(int(user_id))
+        return user.display_name
+    except Exception:
+        return f"User {user_id[:6]}"
+
+
+async def _rank_text(user_id: str) -> str | None:
+    """One-line summary of a player's rank and the gap to the player above."""
+    rank = await db.get_rank(user_id)
+    if rank is None:
+        return None
+    text = f"#{rank['rank']:,} of {rank['total']:,} — {rank['net_worth']:,} 🌰"
+    if rank["above"]:
+        gap = rank["above"]["net_worth"] - rank["net_worth"]
+        text += f" | {gap:,} 🌰 behind #{rank['rank'] - 1:,}"
+    return text
+
+
+async def do_leaderboard(ctx_or_interaction, server=False):
+    is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
+    user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
+    guild = ctx_or_interaction.guild
+    if server and guild is None:
+        embed = discord.Embed(title="🏆 Leaderboard", description="Server leaderboards only work inside a server!", color=0xF1C40F)
         await _send(ctx_or_interaction, embed)
         return
 
-    rankings = []
-    for uid, player in data.items():
-        total = sum(player.get(c, 0) * r for c, r in EXCHANGE_RATES.items())
-        rankings.append((uid, total, player.get("total_catches", 0), player.get("level", 1)))
-    rankings.sort(key=lambda x: x[1], reverse=True)
+    if server:
+        top = await db.get_guild_top_players(str(guild.id), 10)
+        title = f"🏆 {guild.name} Leaderboard"
+    else:
+        top = await db.get_top_players(10)
+        title = "🏆 Squirrel Catcher Leaderboard"
+    if not top:
+        embed = discord.Embed(title="🏆 Leaderboard", description="No squirrel catchers yet!", color=0xF1C40F)
+        await _send(ctx_or_interaction, embed)
+        return
 
     lines = []
     medals = ["🥇", "🥈", "🥉"]
-    for i, (uid, total, catches, level) in enumerate(rankings[:10]):
+    for i, entry in enumerate(top):
         medal = medals[i] if i < 3 else f"**{i+1}.**"
-        try:
-            user = await bot.fetch_user(int(uid))
-            name = user.display_name
-        except Exception:
-            name = f"User {uid[:6]}"
-        lines.append(f"{medal} **{name}** — Lvl {level} | {total:,} 🌰 | {catches} catches")
+        name = await _display_name(entry["user_id"])
+        lines.append(f"{medal} **{name}** — Lvl {entry['level']} | {entry['net_worth']:,} 🌰 | {entry['total_catches']} catches")
 
-    embed = discord.Embed(title="🏆 Squirrel Catcher Leaderboard", description="\n".join(lines), color=0xF1C40F)
+    embed = discord.Embed(title=title, description="\n".join(lines), color=0xF1C40F)
+    rank_text = await _rank_text(str(user.id))
+    if rank_text:
+        embed.set_footer(text=f"Your global rank: {rank_text}" if server else f"Your rank: {rank_text}")
     await _send(ctx_or_interaction, embed)
 
 
-async def do_exchange_info(ctx_or_interaction):
-    embed = discord.Embed(
+async def do_server_leaderboard(ctx_or_interaction):
+    await do_leaderboard(ctx_or_interaction, server=True)
+
+
+@functools.cache
+def _exchange_info_embed():
+    return discord.Embed(
         title="🔄 Exchange Rates",
         description=(
             "• 100 🌰 Acorns → 1 🥈🌰 Silver Acorn\n"
@@ -1238,7 +1362,10 @@ async def do_exchange_info(ctx_or_interaction):
         ),
         color=0x3498DB,
     )
-    await _send(ctx_or_interaction, embed)
+
+
+async def do_exchange_info(ctx_or_interaction):
+    await _send(ctx_or_interaction, _exchange_info_embed())
 
 
 async def do_refer(ctx_or_interaction, target_user=None):
@@ -1260,45 +1387,24 @@ async def do_refer(ctx_or_interaction, target_user=None):
         await _send(ctx_or_interaction, embed)
         return
 
-    referrer_id = str(target_user.id)
-
-    # Validate: can't refer yourself
-    if referrer_id == user_id:
-        embed = discord.Embed(title="❌ Referral Failed", description="You can't refer yourself!", color=0xE74C3C)
-        await _send(ctx_or_interaction, embed)
-        return
-
-    # Validate: caller must be a new player
-    player = await db.get_player(user_id)
-    if player["total_catches"] > REFERRAL_MAX_CATCHES:
-        embed = discord.Embed(
-            title="❌ Referral Failed",
-            description=f"You must have **{REFERRAL_MAX_CATCHES} or fewer** catches to use a referral. You have {player['total_catches']}.",
-            color=0xE74C3C,
-        )
-        await _send(ctx_or_interaction, embed)
-        return
-
-    # Validate: caller hasn't already been referred
-    existing = await db.get_referred_by(user_id)
-    if existing:
-        embed = discord.Embed(title="❌ Referral Failed", description="You've already used a referral!", color=0xE74C3C)
-        await _send(ctx_or_interaction, embed)
-        return
-
-    # Validate: referrer exists as a player
-    referrer = await db.get_player(referrer_id)
-    if referrer["total_catches"] == 0 and referrer["acorns"] == 0:
-        embed = discord.Embed(title="❌ Referral Failed", description="That user hasn't started playing yet!", color=0xE74C3C)
+    result = await db.refer_player(
+        str(target_user.id), user_id, REFERRAL_MAX_CATCHES, REFERRAL_REWARD_REFERRED, REFERRAL_REWARD_REFERRER,
+    )
+    outcome = result["outcome"]
+    if outcome is not ReferralOutcome.OK:
+        if outcome is ReferralOutcome.SELF_REFERRAL:
+            reason = "You can't refer yourself!"
+        elif outcome is ReferralOutcome.TOO_MANY_CATCHES:
+            reason = (f"You must have **{REFERRAL_MAX_CATCHES} or fewer** catches to use a referral. "
+                      f"You have {result['total_catches']}.")
+        elif outcome is ReferralOutcome.ALREADY_REFERRED:
+            reason = "You've already used a referral!"
+        else:
+            reason = "That user hasn't started playing yet!"
+        embed = discord.Embed(title="❌ Referral Failed", description=reason, color=0xE74C3C)
         await _send(ctx_or_interaction, embed)
         return
-
-    # Add referral and award both
-    await db.add_referral(referrer_id, user_id)
-    player["acorns"] += REFERRAL_REWARD_REFERRED
-    await db.update_player(user_id, player)
-    referrer["acorns"] += REFERRAL_REWARD_REFERRER
-    await db.update_player(referrer_id, referrer)
+    economy.mint("referral", REFERRAL_REWARD_REFERRED + REFERRAL_REWARD_REFERRER)
 
     embed = discord.Embed(
         title="🤝 Referral Successful!",
@@ -1327,6 +1433,13 @@ async def do_referrals(ctx_or_interaction):
     )
     embed.add_field(name="Friends Invited", value=f"🤝 {ref_count}", inline=True)
     embed.add_field(name="Acorns Earned", value=f"🌰 {total_earned:,}", inline=True)
+    top = await db.get_top_referrers(5)
+    if top:
+        lines = []
+        for i, entry in enumerate(top):
+            name = await _display_name(entry["user_id"])
+            lines.append(f"**{i+1}.** {name} — 🤝 {entry['referral_count']:,}")
+        embed.add_field(name="Top Recruiters", value="\n".join(lines), inline=False)
     embed.add_field(
         name="Invite More!",
         value=f"Tell friends to use `{PREFIX}refer @{user.display_name}` when they start playing!",
@@ -1335,7 +1448,8 @@ async def do_referrals(ctx_or_interaction):
     await _send(ctx_or_interaction, embed)
 
 
-async def do_help(ctx_or_interaction):
+@functools.cache
+def _help_embed():
     embed = discord.Embed(
         title="🐿️ Squirrel Catcher - Commands",
         description="Catch squirrels, earn acorns, become the ultimate wrangler!",
@@ -1350,9 +1464,11 @@ async def do_help(ctx_or_interaction):
         (f"`{PREFIX}buy <item>`", "Purchase an item or upgrade"),
         (f"`{PREFIX}buffs`", "View your active buffs and upgrades"),
         (f"`{PREFIX}exchange <amount>`", "Convert 100 acorns → 1 silver acorn, etc."),
-        (f"`{PREFIX}leaderboard`", "See the top squirrel catchers"),
+        (f"`{PREFIX}exchange_all`", "Exchange everything up the currency chain"),
+        (f"`{PREFIX}leaderboard`", "See the top squirrel catchers (`server` for this server)"),
         (f"`{PREFIX}bestiary`", "View all discoverable squirrels"),
         (f"`{PREFIX}sell <squirrel name>`", "Sell a squirrel from your bag"),
+        (f"`{PREFIX}sell all duplicates`", "Bulk sell: also `all common`, `all <name>`, `5 <name>`"),
         (f"`{PREFIX}daily`", "Claim your daily acorn bonus"),
         (f"`{PREFIX}refer @user`", "Use a friend's referral — you both earn acorns!"),
         (f"`{PREFIX}referrals`", "See how many friends you've invited"),
@@ -1360,7 +1476,11 @@ async def do_help(ctx_or_interaction):
     for name, desc in cmds:
         embed.add_field(name=name, value=desc, inline=False)
     embed.set_footer(text="Or just use the buttons and menu below! 🌰")
-    await _send(ctx_or_interaction, embed)
+    return embed
+
+
+async def do_help(ctx_or_interaction):
+    await _send(ctx_or_interaction, _help_embed())
 
 
 async def do_shop(ctx_or_interaction):
@@ -1370,7 +1490,7 @@ async def do_shop(ctx_or_interaction):
     player = await db.get_player(str(user.id))
 
     embed = _build_shop_embed(player)
-    await _send(ctx_or_interaction, embed, view=MenuView(page="shop"))
+    await _send(ctx_or_interaction, embed, view=_menu_view("shop"))
 
 
 async def do_shop_items(ctx_or_interaction):
@@ -1380,7 +1500,7 @@ async def do_shop_items(ctx_or_interaction):
     player = await db.get_player(str(user.id))
 
     embed = _build_shop_embed(player, category="bait")
-    view = ShopItemsView(player=player, category="bait")
+    view = _shop_items_view(player, category="bait")
     if is_interaction:
         await ctx_or_interaction.response.edit_message(embed=embed, view=view)
     else:
@@ -1394,7 +1514,7 @@ async def do_shop_upgrades(ctx_or_interaction):
     player = await db.get_player(str(user.id))
 
     embed = _build_upgrades_embed(player)
-    view = ShopUpgradeView(player)
+    view = _shop_upgrade_view(player)
     if is_interaction:
         await ctx_or_interaction.response.edit_message(embed=embed, view=view)
     else:
@@ -1407,12 +1527,13 @@ async def do_buy(ctx_or_interaction, item_key: str):
     from_button = is_interaction and ctx_or_interaction.type == discord.InteractionType.component
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
     user_id = str(user.id)
-    player = await db.get_player(user_id)
 
     # Check if it's an upgrade tier purchase
     if item_key in UPGRADE_TIERS:
         upgrade = UPGRADE_TIERS[item_key]
-        current_tier = player.get(item_key, 0)
+        result = await db.buy_upgrade(user_id, item_key, [tier["cost"] for tier in upgrade["tiers"]])
+        player = result["player"]
+        current_tier = player[item_key] - 1 if result["purchased"] else player[item_key]
         if current_tier >= upgrade["max"]:
             msg = f"❌ **{upgrade['name']}** is already at max tier!"
             if is_interaction:
@@ -1421,16 +1542,14 @@ async def do_buy(ctx_or_interaction, item_key: str):
                 await ctx_or_interaction.send(msg)
             return
         tier_cost = upgrade["tiers"][current_tier]["cost"]
-        if player["acorns"] < tier_cost:
+        if not result["purchased"]:
             msg = f"❌ You need **{tier_cost:,}** 🌰 for {upgrade['name']} Tier {current_tier + 1}! (You have {player['acorns']:,})"
             if is_interaction:
                 await ctx_or_interaction.response.send_message(msg, ephemeral=True)
             else:
                 await ctx_or_interaction.send(msg)
             return
-        player["acorns"] -= tier_cost
-        player[item_key] = current_tier + 1
-        await db.update_player(user_id, player)
+        economy.burn("upgrade", tier_cost)
         tier_label = upgrade["tiers"][current_tier]["label"]
         embed = discord.Embed(
             title=f"🪤 Upgraded {upgrade['name']}!",
@@ -1439,10 +1558,9 @@ async def do_buy(ctx_or_interaction, item_key: str):
         )
         if from_button:
             await ctx_or_interaction.response.send_message(embed=embed, ephemeral=True)
-            # Refresh the upgrades view on the original message
-            refreshed_player = await db.get_player(user_id)
-            upgrade_embed = _build_upgrades_embed(refreshed_player)
-            await ctx_or_interaction.message.edit(embed=upgrade_embed, view=ShopUpgradeView(refreshed_player))
+            # Refresh the upgrades view on the original message from the post-purchase balances
+            upgrade_embed = _build_upgrades_embed(player)
+            await ctx_or_interaction.message.edit(embed=upgrade_embed, view=_shop_upgrade_view(player))
         else:
             await _send(ctx_or_interaction, embed)
         return
@@ -1463,10 +1581,23 @@ async def do_buy(ctx_or_interaction, item_key: str):
         await do_buy(ctx_or_interaction, item["upgrade_key"])
         return
 
-    # Check currency
+    channel_id = str(ctx_or_interaction.channel_id) if hasattr(ctx_or_interaction, "channel_id") else None
+    if not channel_id and hasattr(ctx_or_interaction, "channel"):
+        channel_id = str(ctx_or_interaction.channel.id)
+
+    # Debit and create the buff together; buying a buff you already have
+    # stacks onto it: more charges or a later expiry
     currency = item["currency"]
     cost = item["cost"]
-    if player[currency] < cost:
+    if item["type"] == "consumable":
+        buff = {"charges": item["charges"]}
+    elif item["type"] == "timed":
+        buff = {"duration": timedelta(minutes=item["duration_minutes"])}
+    else:
+        buff = {"duration": timedelta(hours=item["duration_hours"]), "channel_id": channel_id}
+    result = await db.buy_buff(user_id, item_key, currency, cost, **buff)
+    player = result["player"]
+    if not result["purchased"]:
         currency_emoji = CURRENCIES.get(currency, "🌰")
         msg = f"❌ You need **{cost:,}** {currency_emoji}! (You have {player[currency]:,})"
         if is_interaction:
@@ -1474,42 +1605,29 @@ async def do_buy(ctx_or_interaction, item_key: str):
         else:
             await ctx_or_interaction.send(msg)
         return
-
-    # Deduct cost
-    player[currency] -= cost
-    await db.update_player(user_id, player)
-
-    # Create buff
-    channel_id = str(ctx_or_interaction.channel_id) if hasattr(ctx_or_interaction, "channel_id") else None
-    if not channel_id and hasattr(ctx_or_interaction, "channel"):
-        channel_id = str(ctx_or_interaction.channel.id)
-
-    if item["type"] == "consumable":
-        await db.add_buff(user_id, item_key, charges=item["charges"])
-    elif item["type"] == "timed":
-        expires = datetime.now(timezone.utc) + timedelta(minutes=item["duration_minutes"])
-        await db.add_buff(user_id, item_key, expires_at=expires)
-    elif item["type"] == "auto_catch":
-        expires = datetime.now(timezone.utc) + timedelta(hours=item["duration_hours"])
-        await db.add_buff(user_id, item_key, expires_at=expires, channel_id=channel_id)
+    economy.burn("shop", cost * EXCHANGE_RATES[currency])
+    slot = result["slot"]
 
     currency_emoji = CURRENCIES.get(currency, "🌰")
+    if slot["charges_left"] is not None:
+        stacked = f"{slot['charges_left']} charges"
+    else:
+        stacked = f"active until <t:{int(slot['expires_at'].timestamp())}:t>"
     embed = discord.Embed(
         title=f"{item['emoji']} Purchased {item['name']}!",
-        description=f"{item['description']}\nCost: {cost:,} {currency_emoji}",
+        description=f"{item['description']}\nCost: {cost:,} {currency_emoji}\nNow: {stacked}",
         color=0x2ECC71,
     )
     if from_button:
         await ctx_or_interaction.response.send_message(embed=embed, ephemeral=True)
-        # Refresh the shop view on the original message with updated balance
-        refreshed_player = await db.get_player(user_id)
-        # Determine which category and page the purchased item belongs to
+        # Refresh the shop view on the original message from the post-purchase balances,
+        # on the category and page the purchased item belongs to
         cat = _item_category(item_key)
-        cat_keys = _SHOP_CATEGORIES[cat]["keys"]
+        cat_keys = CATALOG.shop_categories[cat]["keys"]
         item_idx = cat_keys.index(item_key) if item_key in cat_keys else 0
-        page = item_idx // _SHOP_PAGE_SIZE
-        shop_embed = _build_shop_embed(refreshed_player, category=cat, page=page)
-        await ctx_or_interaction.message.edit(embed=shop_embed, view=ShopItemsView(player=refreshed_player, category=cat, page=page))
+        page = item_idx // SHOP_PAGE_SIZE
+        shop_embed = _build_shop_embed(player, category=cat, page=page)
+        await ctx_or_interaction.message.edit(embed=shop_embed, view=_shop_items_view(player, category=cat, page=page))
     else:
         await _send(ctx_or_interaction, embed)
 
@@ -1517,9 +1635,9 @@ async def do_buy(ctx_or_interaction, item_key: str):
 async def do_buffs(ctx_or_interaction):
     is_interaction = isinstance(ctx_or_interaction, discord.Interaction)
     user = ctx_or_interaction.user if is_interaction else ctx_or_interaction.author
-    user_id = str(user.id)
-    player = await db.get_player(user_id)
-    active_buffs = await db.get_active_buffs(user_id)
+    snapshot = await db.get_profile_snapshot(str(user.id))
+    player = snapshot["player"]
+    active_buffs = snapshot["buffs"]
 
     embed = discord.Embed(title=f"⚡ {user.display_name}'s Active Buffs", color=0x9B59B6)
 
@@ -1569,15 +1687,22 @@ async def do_buffs(ctx_or_interaction):
 @tasks.loop(minutes=1)
 async def auto_catch_tick():
     """Process auto-catch buffs every minute."""
+    db.reset_stale_reads()
     try:
-        auto_buffs = await db.get_auto_catch_buffs()
-    except Exception:
-        return
+        await _run_auto_catches()
+    except StorageUnavailable as e:
+        print(f"Auto-catch skipped, database unavailable: {e}")
+    except Exception as e:
+        print(f"Auto-catch tick failed: {e}")
+
 
+async def _run_auto_catches():
+    auto_buffs = await db.get_auto_catch_buffs()
     now = datetime.now(timezone.utc)
+    catalog = CATALOG
 
     for buff in auto_buffs:
-        item = SHOP_ITEMS.get(buff["buff_type"])
+        item = catalog.shop_items.get(buff["buff_type"])
         if not item:
             continue
 
@@ -1591,13 +1716,13 @@ async def auto_catch_tick():
         user_id = buff["user_id"]
         player = await db.get_player(user_id)
 
-        result = roll_catch(player["level"], player.get("junk_resist_tier", 0), 0, 0, 0, 0)
+        seed, rng = new_catch_rng()
+        result = roll_catch(player["level"], player.get("junk_resist_tier", 0), 0, 0, 0, 0, rng, catalog)
 
         if result[0] == "junk":
             _, (junk_name, junk_emoji, junk_acorns) = result
-            player["junk_catches"] += 1
-            player["acorns"] += junk_acorns
-            player["xp"] += 1
+            species = None
+            event = dict(outcome="junk", catch_name=junk_name, rarity=None, acorns=junk_acorns, xp=1)
             embed = discord.Embed(
                 title=f"{junk_emoji} Auto-Catch: {junk_name}",
                 description=f"<@{user_id}>" + (f" +{junk_acorns} 🌰" if junk_acorns else ""),
@@ -1606,26 +1731,28 @@ async def auto_catch_tick():
         else:
             _, squirrel, acorns = result
             sq_name, sq_emoji, sq_rarity, _, _, _, _ = squirrel
-            magnet_bonus = ACORN_MAGNET_BONUSES[player.get("acorn_magnet_tier", 0)]
+            magnet_bonus = catalog.upgrade_effect("acorn_magnet_tier", player.get("acorn_magnet_tier", 0))
             acorns = int(acorns * (1 + magnet_bonus / 100))
-            player["acorns"] += acorns
-            player["total_catches"] += 1
-            player["catches"][sq_name] = player["catches"].get(sq_name, 0) + 1
+            species = sq_name
             xp_gain = {"Common": 5, "Uncommon": 10, "Rare": 20, "Epic": 40, "Legendary": 80, "Mythic": 200}
-            player["xp"] += xp_gain.get(sq_rarity, 5)
+            event = dict(outcome="squirrel", catch_name=sq_name, rarity=sq_rarity, acorns=acorns,
+                         xp=xp_gain.get(sq_rarity, 5))
             embed = discord.Embed(
                 title=f"{sq_emoji} Auto-Catch: {sq_name}!",
                 description=f"<@{user_id}> {sq_rarity} — +{acorns} 🌰",
                 color=RARITY_COLORS.get(sq_rarity, 0x808080),
             )
 
-        leveled = check_level_up(player)
-        if leveled:
-            embed.add_field(name="🎉 LEVEL UP!", value=f"Now **Level {player['level']}**!", inline=False)
+        caught = await db.record_catch(user_id, event["acorns"], event["xp"], player["level"],
+                                       xp_for_level(player["level"]), species=species)
+        if caught["leveled"]:
+            embed.add_field(name="🎉 LEVEL UP!", value=f"Now **Level {caught['player']['level']}**!", inline=False)
         embed.set_footer(text=item.get("name", "Auto-Catch"))
 
-        await db.update_player(user_id, player)
+        log_catch(user_id, buff["buff_type"], seed, [], event)
         await db.update_buff_last_triggered(buff["id"])
+        if result[0] == "squirrel":
+            await db.record_species_catch(sq_name, user_id, caught["new_species"])
 
         try:
             channel = bot.get_channel(int(buff["channel_id"]))
@@ -1634,40 +1761,28 @@ async def auto_catch_tick():
         except Exception:
             pass
 
-    # Clean up expired buffs and send summary messages
-    await _check_expired_auto_catch()
-    await db.cleanup_expired_buffs()
+    # Expire timed buffs that are due and send summaries for finished hunters
+    await _announce_expired_auto_catch(await db.expire_buffs())
 
 
-async def _check_expired_auto_catch():
-    """Check for auto-catch buffs that just expired and send summary."""
-    try:
-        async with db.pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT * FROM player_buffs
-                WHERE buff_type IN ('squirrel_hunter', 'elite_hunter', 'scout_squirrel', 'master_hunter')
-                  AND expires_at IS NOT NULL AND expires_at <= NOW()
-                  AND channel_id IS NOT NULL
-                """
-            )
-        for row in rows:
-            channel_id = row["channel_id"]
-            user_id = row["user_id"]
-            try:
-                channel = bot.get_channel(int(channel_id))
-                if channel:
-                    item = SHOP_ITEMS.get(row["buff_type"], {})
-                    embed = discord.Embed(
-                        title=f"{item.get('emoji', '🏹')} Auto-Catch Complete!",
-                        description=f"<@{user_id}>'s **{item.get('name', 'Auto-Catch')}** has expired. Check your bag for the results!",
-                        color=0xE67E22,
-                    )
-                    await channel.send(embed=embed)
-            except Exception:
-                pass
-    except Exception:
-        pass
+async def _announce_expired_auto_catch(expired: list[dict]):
+    """Send a summary to the channel of each auto-catch buff that just expired."""
+    for row in expired:
+        item = SHOP_ITEMS.get(row["buff_type"], {})
+        if item.get("type") != "auto_catch" or not row["channel_id"]:
+            continue
+        user_id = row["user_id"]
+        try:
+            channel = bot.get_channel(int(row["channel_id"]))
+            if channel:
+                embed = discord.Embed(
+                    title=f"{item.get('emoji', '🏹')} Auto-Catch Complete!",
+                    description=f"<@{user_id}>'s **{item.get('name', 'Auto-Catch')}** has expired. Check your bag for the results!",
+                    color=0xE67E22,
+                )
+                await channel.send(embed=embed)
+        except Exception:
+            pass
 
 
 @auto_catch_tick.before_loop
@@ -1675,6 +1790,67 @@ async def before_auto_catch():
     await bot.wait_until_ready()
 
 
+# ─── CATCH EVENT LOG ─────────────────────────────────────────────────────────
+
+@tasks.loop(seconds=0.25)
+async def flush_catch_events():
+    """Drain buffered catch events to the catch_events table with COPY."""
+    await catch_log.flush(db)
+
+
+@flush_catch_events.before_loop
+async def before_flush_catch_events():
+    await bot.wait_until_ready()
+
+
+@tasks.loop(seconds=5)
+async def flush_economy_rollups():
+    """Fold pending economy counters into the hourly and daily rollups."""
+    await economy.flush(db)
+
+
+@flush_economy_rollups.before_loop
+async def before_flush_economy_rollups():
+    await bot.wait_until_ready()
+
+
+# ─── COLD PLAYER ARCHIVAL ────────────────────────────────────────────────────
+
+@tasks.loop(hours=6)
+async def archive_tick():
+    """Move long-inactive players out of the hot players table."""
+    try:
+        archived = await db.archive_inactive_players(ARCHIVE_AFTER_DAYS)
+    except Exception as e:
+        print(f"Archival failed: {e}")
+        return
+    if archived:
+        print(f"Archived {archived} players inactive for {ARCHIVE_AFTER_DAYS}+ days")
+
+
+@archive_tick.before_loop
+async def before_archive():
+    await bot.wait_until_ready()
+
+
+# ─── ASSET URL REFRESH ───────────────────────────────────────────────────────
+
+@tasks.loop(hours=12)
+async def refresh_asset_urls():
+    """Keep CDN URLs for species images fresh (signed Discord links expire)."""
+    try:
+        await _publish_assets()
+    except Exception as e:
+        # Fall back to attachments until the next refresh
+        print(f"Asset upload failed: {e}")
+        _asset_urls.clear()
+
+
+@refresh_asset_urls.before_loop
+async def before_refresh_asset_urls():
+    await bot.wait_until_ready()
+
+
 # ─── BOT EVENTS ───────────────────────────────────────────────────────────────
 
 @bot.event
@@ -1682,9 +1858,17 @@ async def on_ready():
     await db.init_db(DATABASE_URL)
     # Register persistent views for each page
     for page in MENU_PAGES:
-        bot.add_view(MenuView(page=page))
+        bot.add_view(_menu_view(page))
     if not auto_catch_tick.is_running():
         auto_catch_tick.start()
+    if not archive_tick.is_running():
+        archive_tick.start()
+    if not flush_catch_events.is_running():
+        flush_catch_events.start()
+    if not flush_economy_rollups.is_running():
+        flush_economy_rollups.start()
+    if ASSET_CHANNEL_ID and not refresh_asset_urls.is_running():
+        refresh_asset_urls.start()
     print(f"🐿️ Squirrel Catcher is online as {bot.user}!")
     print(f"   Prefix: {PREFIX}")
     print(f"   Servers: {len(bot.guilds)}")
@@ -1728,7 +1912,25 @@ async def on_guild_join(guild: discord.Guild):
         inline=False,
     )
     embed.set_footer(text=f"Type {PREFIX}help for all commands")
-    await channel.send(embed=embed, view=MenuView())
+    await channel.send(embed=embed, view=_menu_view())
+
+@bot.before_invoke
+async def record_guild_member(ctx):
+    """Track guild membership for per-server leaderboards."""
+    if ctx.guild:
+        try:
+            await db.touch_guild_player(str(ctx.guild.id), str(ctx.author.id))
+        except StorageUnavailable:
+            pass  # best effort; don't block read-only commands while the database is down
+
+
+@bot.listen("on_interaction")
+async def record_guild_interaction(interaction: discord.Interaction):
+    if interaction.guild_id:
+        try:
+            await db.touch_guild_player(str(interaction.guild_id), str(interaction.user.id))
+        except StorageUnavailable:
+            pass
 
 # ─── COMMANDS ─────────────────────────────────────────────────────────────────
 
@@ -1757,6 +1959,24 @@ async def profile_cmd(ctx):
     await do_profile(ctx)
 
 
+async def _exchange_tier(ctx, tier: int, amount: int):
+    """Exchange `amount` of a tier's source currency (rounded down to whole units)."""
+    from_cur, to_cur, cost, _, emoji_from, emoji_to = _EXCHANGE_TIERS[tier]
+    units = amount // cost
+    if units < 1:
+        await ctx.send(f"❌ You need at least **{cost}** {emoji_from} to exchange!")
+        return
+
+    result = await db.exchange_currency(str(ctx.author.id), from_cur, to_cur, cost, units)
+    if result is None:
+        player = await db.get_player(str(ctx.author.id))
+        await ctx.send(f"❌ You only have **{player[from_cur]:,}** {emoji_from}!")
+        return
+
+    nice_name = to_cur.replace("_", " ").title()
+    await ctx.send(f"🔄 Exchanged **{units * cost:,}** {emoji_from} → **{units:,}** {emoji_to} {nice_name}!")
+
+
 @bot.command(name="exchange", aliases=["ex"])
 async def exchange_cmd(ctx, amount: int = 0):
     """Exchange acorns up the currency chain: 100 acorns = 1 silver, 10 silver = 1 emerald, 10 emerald = 1 golden"""
@@ -1766,83 +1986,41 @@ async def exchange_cmd(ctx, amount: int = 0):
             "• 100 🌰 Acorns → 1 🥈🌰 Silver Acorn\n"
             "• 10 🥈🌰 Silver Acorns → 1 💚🌰 Emerald Acorn\n"
             "• 10 💚🌰 Emerald Acorns → 1 ✨🌰 Golden Acorn\n\n"
-            f"Usage: `{PREFIX}exchange <acorns to convert>`"
+            f"Usage: `{PREFIX}exchange <acorns to convert>` or `{PREFIX}exchange_all`"
         )
         return
-
-    user_id = str(ctx.author.id)
-    player = await db.get_player(user_id)
-
-    if player["acorns"] < amount:
-        await ctx.send(f"❌ You only have **{player['acorns']:,}** 🌰 acorns!")
-        return
-
-    silver_gained = amount // 100
-    if silver_gained < 1:
-        await ctx.send("❌ You need at least **100** 🌰 to exchange!")
-        return
-
-    spent = silver_gained * 100
-    player["acorns"] -= spent
-    player["silver_acorns"] += silver_gained
-    await db.update_player(user_id, player)
-
-    await ctx.send(f"🔄 Exchanged **{spent:,}** 🌰 → **{silver_gained:,}** 🥈🌰 Silver Acorns!")
+    await _exchange_tier(ctx, 0, amount)
 
 
 @bot.command(name="exchange_silver", aliases=["exs"])
 async def exchange_silver_cmd(ctx, amount: int = 0):
-    user_id = str(ctx.author.id)
-    player = await db.get_player(user_id)
-
     if amount <= 0:
         await ctx.send(f"Usage: `{PREFIX}exchange_silver <amount>` (10 🥈🌰 = 1 💚🌰)")
         return
-    if player["silver_acorns"] < amount:
-        await ctx.send(f"❌ You only have **{player['silver_acorns']:,}** 🥈🌰!")
-        return
-
-    emerald_gained = amount // 10
-    if emerald_gained < 1:
-        await ctx.send("❌ You need at least **10** 🥈🌰 to exchange!")
-        return
-
-    spent = emerald_gained * 10
-    player["silver_acorns"] -= spent
-    player["emerald_acorns"] += emerald_gained
-    await db.update_player(user_id, player)
-
-    await ctx.send(f"🔄 Exchanged **{spent:,}** 🥈🌰 → **{emerald_gained:,}** 💚🌰 Emerald Acorns!")
+    await _exchange_tier(ctx, 1, amount)
 
 
 @bot.command(name="exchange_emerald", aliases=["exe"])
 async def exchange_emerald_cmd(ctx, amount: int = 0):
-    user_id = str(ctx.author.id)
-    player = await db.get_player(user_id)
-
     if amount <= 0:
         await ctx.send(f"Usage: `{PREFIX}exchange_emerald <amount>` (10 💚🌰 = 1 ✨🌰)")
         return
-    if player["emerald_acorns"] < amount:
-        await ctx.send(f"❌ You only have **{player['emerald_acorns']:,}** 💚🌰!")
-        return
+    await _exchange_tier(ctx, 2, amount)
 
-    golden_gained = amount // 10
-    if golden_gained < 1:
-        await ctx.send("❌ You need at least **10** 💚🌰 to exchange!")
-        return
-
-    spent = golden_gained * 10
-    player["emerald_acorns"] -= spent
-    player["golden_acorns"] += golden_gained
-    await db.update_player(user_id, player)
 
-    await ctx.send(f"🔄 Exchanged **{spent:,}** 💚🌰 → **{golden_gained:,}** ✨🌰 Golden Acorns!")
+@bot.command(name="exchange_all", aliases=["exa"])
+async def exchange_all_cmd(ctx):
+    """Exchange everything up the chain: acorns → silver → emerald → golden."""
+    result = await db.exchange_all(str(ctx.author.id), _EXCHANGE_CHAIN)
+    if result is None:
+        await ctx.send("❌ You don't have enough to exchange anything!")
+        return
+    await ctx.send(embed=_exchange_all_embed(result))
 
 
 @bot.command(name="leaderboard", aliases=["lb", "top"])
-async def leaderboard_cmd(ctx):
-    await do_leaderboard(ctx)
+async def leaderboard_cmd(ctx, scope: str = ""):
+    await do_leaderboard(ctx, server=scope.lower() in ("server", "guild", "here"))
 
 
 @bot.command(name="bestiary", aliases=["dex"])
@@ -1850,48 +2028,92 @@ async def bestiary_cmd(ctx):
     await do_bestiary(ctx)
 
 
+def _plan_sale(catches: dict, query: str) -> tuple[dict[str, int] | None, str | None]:
+    """Work out which squirrels a sell query refers to.
+
+    Supports "<name>", "<N> <name>", "all <name>", "all <rarity>" and
+    "all duplicates". Returns ({name: count}, None) or (None, error message).
+    """
+    words = query.lower().split()
+    if words[0] == "all" and len(words) > 1:
+        target = " ".join(words[1:])
+        if target in ("duplicates", "dupes", "duplicate"):
+            sale = {name: n - 1 for name, n in catches.items() if n > 1 and name in SELL_VALUES}
+            return (sale, None) if sale else (None, "❌ You don't have any duplicates to sell!")
+        rarity = next((r for r in RARITY_COLORS if r.lower() == target), None)
+        if rarity:
+            sale = {name: n for name, n in catches.items()
+                    if n > 0 and name.lower() in CATALOG.squirrels_by_name
+                    and CATALOG.squirrels_by_name[name.lower()][2] == rarity}
+            return (sale, None) if sale else (None, f"❌ You don't have any **{rarity}** squirrels to sell!")
+        count = None
+    elif words[0].isdigit() and len(words) > 1:
+        count = int(words[0])
+        target = " ".join(words[1:])
+    else:
+        count = 1
+        target = " ".join(words)
+
+    match = CATALOG.squirrels_by_name.get(target)
+    if not match:
+        return None, f"❌ Unknown squirrel: **{target}**. Check `{PREFIX}bestiary` for names."
+    sq_name = match[0]
+    owned = catches.get(sq_name, 0)
+    if owned < 1:
+        return None, f"❌ You don't have any **{sq_name}** to sell!"
+    count = owned if count is None else count
+    if count < 1 or count > owned:
+        return None, f"❌ You only have **{owned}** {sq_name}!"
+    return {sq_name: count}, None
+
+
 @bot.command(name="sell")
 async def sell_cmd(ctx, *, squirrel_name: str = ""):
     if not squirrel_name:
-        await ctx.send(f"Usage: `{PREFIX}sell <squirrel name>` — Sell one squirrel for acorns.")
+        await ctx.send(
+            f"Usage: `{PREFIX}sell <squirrel name>` — Sell one squirrel for acorns.\n"
+            f"Bulk: `{PREFIX}sell 5 <name>`, `{PREFIX}sell all <name>`, "
+            f"`{PREFIX}sell all common`, `{PREFIX}sell all duplicates`"
+        )
         return
 
     user_id = str(ctx.author.id)
-    player = await db.get_player(user_id)
-
-    # Find matching squirrel (case-insensitive)
-    match = None
-    for sq in SQUIRRELS:
-        if sq[0].lower() == squirrel_name.lower():
-            match = sq
-            break
-
-    if not match:
-        await ctx.send(f"❌ Unknown squirrel: **{squirrel_name}**. Check `{PREFIX}bestiary` for names.")
-        return
-
-    sq_name = match[0]
-    if sq_name not in player["catches"] or player["catches"][sq_name] < 1:
-        await ctx.send(f"❌ You don't have any **{sq_name}** to sell!")
+    snapshot = await db.get_profile_snapshot(user_id)
+    sale, error = _plan_sale(snapshot["player"]["catches"], squirrel_name)
+    if error:
+        await ctx.send(error)
         return
 
-    # Sell value = average of min/max acorn range
-    sell_value = (match[3] + match[4]) // 2
-
     # Check for treasure map buff (+50% sell value)
-    active_buffs = await db.get_active_buffs(user_id)
-    has_treasure_map = any(b["buff_type"] == "treasure_map" for b in active_buffs)
-    if has_treasure_map:
-        sell_value = int(sell_value * 1.5)
+    has_treasure_map = any(b["buff_type"] == "treasure_map" for b in snapshot["buffs"])
+    multiplier = TREASURE_MAP_SELL_MULTIPLIER if has_treasure_map else 1
+    payout = sum(int(SELL_VALUES[name] * multiplier) * n for name, n in sale.items())
 
-    player["catches"][sq_name] -= 1
-    if player["catches"][sq_name] == 0:
-        del player["catches"][sq_name]
-    player["acorns"] += sell_value
-    await db.update_player(user_id, player)
+    if await db.sell_catches(user_id, sale, payout) is None:
+        await ctx.send("❌ Your bag changed while selling — try again!")
+        return
+    economy.mint("sell", payout)
 
     bonus = " (🗺️ +50% Treasure Map!)" if has_treasure_map else ""
-    await ctx.send(f"💰 Sold **{sq_name}** for **{sell_value}** 🌰 acorns!{bonus}")
+    total = sum(sale.values())
+    if total == 1:
+        await ctx.send(f"💰 Sold **{next(iter(sale))}** for **{payout}** 🌰 acorns!{bonus}")
+        return
+
+    lines = [
+        f"{CATALOG.squirrels_by_name[name.lower()][1]} **{name}** x{n}"
+        for name, n in sorted(sale.items(), key=lambda x: x[1], reverse=True)
+    ]
+    if len(lines) > 15:
+        lines = lines[:15] + [f"…and {len(lines) - 15} more species"]
+    embed = discord.Embed(
+        title=f"💰 Sold {total:,} squirrels for {payout:,} 🌰!",
+        description="\n".join(lines),
+        color=0x2ECC71,
+    )
+    if bonus:
+        embed.set_footer(text="🗺️ +50% Treasure Map!")
+    await ctx.send(embed=embed)
 
 
 @bot.command(name="daily")
@@ -1943,14 +2165,81 @@ async def donate_cmd(ctx):
     await ctx.send(embed=embed)
 
 
+@bot.command(name="stats")
+@commands.is_owner()
+async def stats_cmd(ctx):
+    """Owner-only: report in-process cache sizes and hit rates, and catch log throughput."""
+    lines = []
+    for name, stats in cache_stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        lines.append(f"**{name}:** {stats['size']:,} entries | {hit_rate} hits ({lookups:,} lookups)")
+    lines.append(f"**catch events:** {catch_log.written:,} written | {len(catch_log):,} buffered "
+                 f"| {catch_log.dropped:,} dropped")
+    lines.append(f"**database breaker:** {db.breaker.state} | {db.breaker.trips:,} trips")
+    embed = discord.Embed(title="📊 Bot Stats", description="\n".join(lines), color=0x3498DB)
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="economy")
+@commands.is_owner()
+async def economy_cmd(ctx, granularity: str = "hour"):
+    """Owner-only: acorns minted/burned and catches by rarity over the last 24 hours or 7 days."""
+    granularity = "day" if granularity.lower().startswith("d") else "hour"
+    buckets = 7 if granularity == "day" else 24
+    totals = {}
+    for row in await db.get_economy_rollups(granularity, buckets):
+        totals[(row["kind"], row["source"])] = totals.get((row["kind"], row["source"]), 0) + row["amount"]
+
+    window = "Last 7 days" if granularity == "day" else "Last 24 hours"
+    embed = discord.Embed(title=f"📈 Economy — {window}", color=0x3498DB)
+    net = 0
+    for kind, sources in ECONOMY_SOURCES.items():
+        amounts = {source: totals.get((kind, source), 0) for source in sources}
+        net += sum(amounts.values()) * (1 if kind == "minted" else -1)
+        lines = [f"**{source.title()}:** {amount:,} 🌰" for source, amount in amounts.items()]
+        embed.add_field(name=f"{kind.title()} ({sum(amounts.values()):,} 🌰)", value="\n".join(lines))
+    catches = [f"**{rarity}:** {totals[('catches', rarity)]:,}"
+               for rarity in (*RARITY_COLORS, "Junk") if ("catches", rarity) in totals]
+    embed.add_field(name="Catches", value="\n".join(catches) or "None yet")
+    embed.set_footer(text=f"Net supply change: {net:+,} 🌰 (all currencies in base acorns)")
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="reload_catalog")
+@commands.is_owner()
+async def reload_catalog_cmd(ctx):
+    """Owner-only: load catalog.json again and swap it in without restarting.
+
+    Catches already in progress finish on the previous version.
+    """
+    try:
+        catalog = await asyncio.to_thread(load_catalog)
+    except CatalogError as e:
+        await ctx.send(f"❌ Catalog not reloaded: {e}")
+        return
+    # Images for new species must be in memory before anyone can catch them
+    _asset_bytes.update(await asyncio.to_thread(_load_assets, catalog.squirrels))
+    previous = CATALOG
+    _publish_catalog(catalog)
+    if ASSET_CHANNEL_ID:
+        await _publish_assets()
+    await ctx.send(
+        f"✅ Catalog v{previous.version} → v{catalog.version}: {len(catalog.squirrels)} species, "
+        f"{len(catalog.shop_items)} shop items, {len(catalog.upgrade_tiers)} upgrades"
+    )
+
+
 # ─── ERROR HANDLING ───────────────────────────────────────────────────────────
 
 @bot.event
 async def on_command_error(ctx, error):
-    if isinstance(error, commands.CommandNotFound):
+    if isinstance(error, (commands.CommandNotFound, commands.NotOwner)):
         return  # Silently ignore
     if isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(f"❌ Missing argument! Try `{PREFIX}help` for usage info.")
+    elif isinstance(getattr(error, "original", error), StorageUnavailable):
+        await ctx.send(DB_UNAVAILABLE_MSG)
     else:
         print(f"Error: {error}")
         await ctx.send("❌ Something went wrong! Try again.")
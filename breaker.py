@@ -0,0 +1,174 @@
+"""
+Circuit breaker around the storage backend.
+
+Every storage call gets a timeout. Reads are retried with jittered backoff
+and their last good results are kept, so while the breaker is open (after
+repeated failures) reads are answered from that cache and writes fail
+immediately with StorageUnavailable instead of piling up on a sick
+database. After a cool-down a single half-open probe decides whether to
+close the breaker again.
+"""
+
+import asyncio
+import contextvars
+import copy
+import os
+import random
+import time
+
+from cache import TTLCache
+
+DB_CALL_TIMEOUT = float(os.getenv("DB_CALL_TIMEOUT", 2.0))  # seconds per attempt
+# Overall budget for a read including retries and backoff, inside Discord's 3s interaction window
+READ_DEADLINE = float(os.getenv("DB_READ_DEADLINE", 2.5))
+READ_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.05  # seconds; doubled per attempt, full jitter
+FAILURE_THRESHOLD = 5  # consecutive failures before opening
+OPEN_SECONDS = 10  # cool-down before a half-open probe
+STALE_READ_TTL = 300  # seconds a last-good read may be served while open
+
+# Idempotent calls: safe to retry and to answer from the last good result
+READ_METHODS = frozenset({
+    "get_player", "get_profile_snapshot", "get_species_stats", "get_top_players",
+    "get_guild_top_players", "get_rank", "get_active_buffs", "get_auto_catch_buffs",
+    "get_referral_count", "get_referred_by", "get_top_referrers", "get_economy_rollups",
+})
+# Lifecycle calls pass straight through
+UNGUARDED_METHODS = frozenset({"init_db", "close_db", "ping"})
+
+# Set in a task once it has been handed a cached read, so that task can't
+# write state derived from it back after the breaker closes again
+_served_stale = contextvars.ContextVar("served_stale", default=False)
+
+
+class StorageUnavailable(Exception):
+    """The database is unreachable or the breaker is open; the caller should ask the user to retry."""
+
+
+class CircuitBreaker:
+    """Closed → open after FAILURE_THRESHOLD consecutive failures → half-open after OPEN_SECONDS."""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to the database now. Grants at most one half-open probe at a time."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        """Give back a half-open probe whose call ended without an outcome, e.g. when cancelled."""
+        self._probing = False
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                print(f"⚠️ Database circuit breaker opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class GuardedStorage:
+    """Wraps a storage backend with timeouts, read retries and a circuit breaker.
+
+    Exposes the same methods as the wrapped backend. A task that was served
+    a cached read can't write afterwards. Errors listed in the
+    backend's TRANSIENT_ERRORS (plus timeouts and OSError) count against the
+    breaker and surface as StorageUnavailable; any other error is a bug or
+    a constraint violation and propagates unchanged.
+    """
+
+    def __init__(self, backend, timeout: float = DB_CALL_TIMEOUT):
+        self.backend = backend
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+        self.transient = (asyncio.TimeoutError, OSError, *getattr(backend, "TRANSIENT_ERRORS", ()))
+        self._last_good = TTLCache("stale_reads", ttl=STALE_READ_TTL, maxsize=20_000)
+
+    def reset_stale_reads(self):
+        """Start a fresh unit of work in a long-lived task, such as a tasks.loop iteration."""
+        _served_stale.set(False)
+
+    def __getattr__(self, name):
+        target = getattr(self.backend, name)
+        if name in UNGUARDED_METHODS or not callable(target):
+            return target
+        if name in READ_METHODS:
+            async def guarded(*args, **kwargs):
+                return await self._read(name, target, args, kwargs)
+        else:
+            async def guarded(*args, **kwargs):
+                return await self._write(target, args, kwargs)
+        guarded.__name__ = name
+        setattr(self, name, guarded)
+        return guarded
+
+    async def _call(self, target, args, kwargs, timeout=None):
+        if self.breaker.state == "half_open":
+            # This call holds the probe. Backends answer some reads from their own
+            # caches, so prove the database is back with a real round trip first.
+            await self._attempt(self.backend.ping, (), {}, timeout)
+        return await self._attempt(target, args, kwargs, timeout)
+
+    async def _attempt(self, target, args, kwargs, timeout=None):
+        try:
+            result = await asyncio.wait_for(target(*args, **kwargs), timeout or self.timeout)
+        except self.transient as e:
+            self.breaker.record_failure()
+            raise StorageUnavailable(str(e) or type(e).__name__) from e
+        except Exception:
+            # The database answered; the error is the caller's business
+            self.breaker.record_success()
+            raise
+        finally:
+            # A cancelled call records nothing; don't leave the breaker waiting on its probe
+            self.breaker.release_probe()
+        self.breaker.record_success()
+        return result
+
+    async def _read(self, name, target, args, kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        deadline = time.monotonic() + READ_DEADLINE
+        for attempt in range(READ_ATTEMPTS):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.breaker.allow():
+                break
+            try:
+                result = await self._call(target, args, kwargs, min(self.timeout, remaining))
+            except StorageUnavailable:
+                if attempt + 1 < READ_ATTEMPTS:
+                    delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+                    await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+                continue
+            self._last_good.set(key, copy.deepcopy(result))
+            return result
+        stale = self._last_good.get(key)
+        if stale is None:
+            raise StorageUnavailable(f"{name} unavailable")
+        _served_stale.set(True)
+        return copy.deepcopy(stale)
+
+    async def _write(self, target, args, kwargs):
+        if _served_stale.get() or not self.breaker.allow():
+            raise StorageUnavailable("circuit open")
+        return await self._call(target, args, kwargs)
@@ -0,0 +1,82 @@
+"""
+Small in-process caches for the Squirrel Catcher bot.
+TTLCache is a bounded map whose entries expire, used in place of ad-hoc module-level dicts.
+"""
+
+import time
+from collections import OrderedDict
+
+# name -> cache, so sizes and hit rates can be reported by the stats command
+_registry: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire ttl seconds after they were set.
+
+    Every entry lives for the same ttl, so insertion order is also expiry
+    order: expired entries are purged from the front and the oldest entry
+    is evicted once maxsize is reached, both O(1) per insert. Lookups treat
+    an expired entry as missing.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 10_000):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        _registry[name] = self
+
+    def set(self, key, value):
+        """Store value under key, expiring after the cache ttl."""
+        now = time.monotonic()
+        self._data.pop(key, None)
+        self._data[key] = (now + self.ttl, value)
+        self._purge(now)
+
+    def get(self, key, default=None):
+        """Return the live value for key, or default if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[1]
+
+    def pop(self, key, default=None):
+        """Remove key and return its live value, or default."""
+        entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _purge(self, now: float):
+        data = self._data
+        while data:
+            key, (expires_at, _) = next(iter(data.items()))
+            if expires_at > now and len(data) <= self.maxsize:
+                break
+            data.popitem(last=False)
+
+
+def cache_stats() -> dict[str, dict]:
+    """Size and hit/miss counters of every registered cache."""
+    return {
+        name: {"size": len(c), "hits": c.hits, "misses": c.misses}
+        for name, c in _registry.items()
+    }
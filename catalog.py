@@ -0,0 +1,234 @@
+"""
+Game catalog for the Squirrel Catcher bot: species, junk, shop items and upgrades.
+
+The data lives in catalog.json (override with CATALOG_PATH) so balance
+changes don't need a redeploy. load_catalog() validates the file and
+compiles one immutable Catalog with every derived table the bot reads on
+hot paths: sampling tables, bait effects, shop category indexes and
+pages, sell values. The bot swaps in a new Catalog with a single
+assignment, so a catch that started on the old version finishes on it.
+"""
+
+import json
+import os
+from itertools import accumulate
+from types import MappingProxyType
+
+from storage import AUTO_CATCH_BUFFS, UPGRADE_COLUMNS
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json"))
+
+RARITIES = ("Common", "Uncommon", "Rare", "Epic", "Legendary", "Mythic")
+# Bait effects that raise the drop weight of each rarity (level luck applies wherever one does)
+RARITY_BOOSTS = {
+    "Common": (),
+    "Uncommon": (),
+    "Rare": ("rare",),
+    "Epic": ("rare", "epic"),
+    "Legendary": ("rare", "epic"),
+    "Mythic": ("rare", "epic", "mythic"),
+}
+BAIT_EFFECTS = ("junk", "rare", "epic", "mythic")
+CURRENCIES = ("acorns", "silver_acorns", "emerald_acorns", "golden_acorns")
+# Fields each shop item type needs beyond name/emoji/cost/currency/description
+ITEM_TYPE_FIELDS = {
+    "upgrade": ("upgrade_key",),
+    "consumable": ("charges",),
+    "timed": ("duration_minutes",),
+    "auto_catch": ("interval_minutes", "duration_hours"),
+}
+# Upgrades (UPGRADE_COLUMNS) have an effect per tier, from base (tier 0) up:
+# trap_tier = catch cooldown in seconds, junk_resist_tier = junk % removed,
+# acorn_magnet_tier = bonus % acorns
+MAX_TRAP_COOLDOWN = 60  # seconds; bot.cooldowns keeps each entry this long
+SHOP_PAGE_SIZE = 5  # items per page in shop
+
+
+def xp_for_level(level: int) -> int:
+    """XP needed to go from level to level + 1."""
+    return int(50 * (level ** 1.5))
+
+
+class CatalogError(ValueError):
+    """The catalog file is missing, malformed or inconsistent."""
+
+
+def _require(condition, message):
+    if not condition:
+        raise CatalogError(message)
+
+
+def _positive_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _effect(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def _validate(data: dict):
+    """Check the raw catalog, raising CatalogError on the first problem found."""
+    _require(isinstance(data, dict), "catalog must be a JSON object")
+    _require(_positive_int(data.get("version")), "version must be a positive integer")
+
+    squirrels = data.get("squirrels")
+    _require(isinstance(squirrels, list) and squirrels, "squirrels must be a non-empty list")
+    names = set()
+    for i, sq in enumerate(squirrels):
+        where = f"squirrels[{i}]"
+        _require(isinstance(sq, dict), f"{where} must be an object")
+        name = sq.get("name")
+        _require(isinstance(name, str) and name, f"{where}.name must be a non-empty string")
+        where = f"squirrel {name!r}"
+        _require(name.lower() not in names, f"{where} is listed twice")
+        names.add(name.lower())
+        _require(sq.get("rarity") in RARITIES, f"{where}: rarity must be one of {', '.join(RARITIES)}")
+        _require(isinstance(sq.get("emoji"), str), f"{where}: emoji must be a string")
+        _require(isinstance(sq.get("image"), str) and sq["image"], f"{where}: image must be a filename")
+        low, high = sq.get("min_acorns"), sq.get("max_acorns")
+        _require(isinstance(low, int) and isinstance(high, int) and 0 <= low <= high,
+                 f"{where}: need integers 0 <= min_acorns <= max_acorns")
+        weight = sq.get("weight")
+        _require(isinstance(weight, (int, float)) and not isinstance(weight, bool) and weight > 0,
+                 f"{where}: weight must be a positive number")
+
+    junk = data.get("junk")
+    _require(isinstance(junk, list) and junk, "junk must be a non-empty list")
+    for i, j in enumerate(junk):
+        _require(isinstance(j, dict) and isinstance(j.get("name"), str) and isinstance(j.get("emoji"), str)
+                 and isinstance(j.get("acorns"), int) and j["acorns"] >= 0,
+                 f"junk[{i}] needs a name, an emoji and acorns >= 0")
+
+    upgrades = data.get("upgrade_tiers")
+    _require(isinstance(upgrades, dict), "upgrade_tiers must be an object")
+    _require(set(upgrades) == set(UPGRADE_COLUMNS), f"upgrade_tiers must define exactly {', '.join(UPGRADE_COLUMNS)}")
+    for key, upgrade in upgrades.items():
+        where = f"upgrade {key!r}"
+        _require(isinstance(upgrade, dict) and isinstance(upgrade.get("name"), str), f"{where} needs a name")
+        _require(_effect(upgrade.get("base")), f"{where}: base must be a number >= 0")
+        tiers = upgrade.get("tiers")
+        _require(isinstance(tiers, list) and tiers, f"{where}: tiers must be a non-empty list")
+        _require(upgrade.get("max") == len(tiers), f"{where}: max must equal the number of tiers")
+        for tier in tiers:
+            _require(isinstance(tier, dict) and _positive_int(tier.get("cost")) and isinstance(tier.get("label"), str)
+                     and _effect(tier.get("effect")),
+                     f"{where}: every tier needs a positive cost, an effect >= 0 and a label")
+    trap = upgrades["trap_tier"]
+    _require(all(0 < cd <= MAX_TRAP_COOLDOWN for cd in (trap["base"], *(t["effect"] for t in trap["tiers"]))),
+             f"upgrade 'trap_tier': cooldowns must be between 0 and {MAX_TRAP_COOLDOWN} seconds")
+
+    categories = data.get("shop_categories")
+    _require(isinstance(categories, dict) and categories, "shop_categories must be a non-empty object")
+    for key, cat in categories.items():
+        _require(isinstance(cat, dict) and isinstance(cat.get("label"), str) and isinstance(cat.get("emoji"), str),
+                 f"shop category {key!r} needs a label and an emoji")
+
+    items = data.get("shop_items")
+    _require(isinstance(items, dict) and items, "shop_items must be a non-empty object")
+    for key, item in items.items():
+        where = f"shop item {key!r}"
+        _require(isinstance(item, dict), f"{where} must be an object")
+        for field in ("name", "emoji", "description"):
+            _require(isinstance(item.get(field), str), f"{where}: {field} must be a string")
+        _require(_positive_int(item.get("cost")), f"{where}: cost must be a positive integer")
+        _require(item.get("currency") in CURRENCIES, f"{where}: currency must be one of {', '.join(CURRENCIES)}")
+        item_type = item.get("type")
+        _require(item_type in ITEM_TYPE_FIELDS, f"{where}: type must be one of {', '.join(ITEM_TYPE_FIELDS)}")
+        if item_type == "upgrade":
+            _require(item.get("upgrade_key") in upgrades, f"{where}: upgrade_key must name an entry in upgrade_tiers")
+            continue
+        _require(item_type != "auto_catch" or key in AUTO_CATCH_BUFFS,
+                 f"{where}: auto-catch helpers must be one of {', '.join(AUTO_CATCH_BUFFS)}")
+        for field in ITEM_TYPE_FIELDS[item_type]:
+            _require(_positive_int(item.get(field)), f"{where}: {field} must be a positive integer")
+        _require(item.get("category") in categories, f"{where}: category must be one of {', '.join(categories)}")
+        effects = item.get("effects", {})
+        _require(isinstance(effects, dict), f"{where}: effects must be an object")
+        for effect, amount in effects.items():
+            _require(effect in BAIT_EFFECTS, f"{where}: unknown effect {effect!r}")
+            _require(isinstance(amount, int) and amount > 0, f"{where}: effect {effect!r} must be a positive integer")
+        _require(not effects or item_type == "consumable", f"{where}: only consumables can carry bait effects")
+
+
+class Catalog:
+    """One validated version of the game data and the tables compiled from it.
+
+    Instances are never mutated after construction; reloading builds a new one.
+    The tuple layouts match what the bot has always used:
+    squirrels are (name, emoji, rarity, min_acorns, max_acorns, weight, image)
+    and junk is (name, emoji, acorns).
+    """
+
+    def __init__(self, data: dict):
+        _validate(data)
+        self.version = data["version"]
+
+        self.squirrels = tuple(
+            (sq["name"], sq["emoji"], sq["rarity"], sq["min_acorns"], sq["max_acorns"], sq["weight"], sq["image"])
+            for sq in data["squirrels"]
+        )
+        self.junk = tuple((j["name"], j["emoji"], j["acorns"]) for j in data["junk"])
+        self.shop_items = MappingProxyType({key: MappingProxyType(item) for key, item in data["shop_items"].items()})
+        self.upgrade_tiers = MappingProxyType({key: MappingProxyType(u) for key, u in data["upgrade_tiers"].items()})
+        # Upgrade key -> effect per tier, index = the player's tier column
+        self.upgrade_effects = MappingProxyType({
+            key: (u["base"], *(tier["effect"] for tier in u["tiers"])) for key, u in data["upgrade_tiers"].items()
+        })
+
+        # Lookups for selling: lowercase name -> squirrel, name -> sell value (average of min/max acorns)
+        self.squirrels_by_name = MappingProxyType({sq[0].lower(): sq for sq in self.squirrels})
+        self.sell_values = MappingProxyType({sq[0]: (sq[3] + sq[4]) // 2 for sq in self.squirrels})
+
+        # Sampling table: squirrels grouped by the bait effects that boost them.
+        # A roll scales each group's total weight, picks a group, then bisects
+        # the group's cumulative weights, instead of reweighting every species.
+        groups = {}
+        for sq in self.squirrels:
+            groups.setdefault(RARITY_BOOSTS[sq[2]], []).append(sq)
+        self.sampling = tuple(
+            (boosts, tuple(members), tuple(accumulate(sq[5] for sq in members)))
+            for boosts, members in groups.items()
+        )
+        self.sampling_totals = tuple(cum[-1] for _, _, cum in self.sampling)
+
+        # Effect table: bait key -> {effect: amount}
+        self.bait_effects = MappingProxyType({
+            key: MappingProxyType(item["effects"]) for key, item in self.shop_items.items() if "effects" in item
+        })
+
+        # Shop category indexes and pages, in file order
+        self.shop_categories = MappingProxyType({
+            cat_key: MappingProxyType({
+                **cat,
+                "keys": tuple(k for k, item in self.shop_items.items() if item.get("category") == cat_key),
+            })
+            for cat_key, cat in data["shop_categories"].items()
+        })
+        self.item_categories = MappingProxyType({
+            key: cat_key for cat_key, cat in self.shop_categories.items() for key in cat["keys"]
+        })
+        self.shop_pages = MappingProxyType({
+            cat_key: tuple(cat["keys"][i:i + SHOP_PAGE_SIZE] for i in range(0, len(cat["keys"]), SHOP_PAGE_SIZE)) or ((),)
+            for cat_key, cat in self.shop_categories.items()
+        })
+        self.consumable_keys = tuple(k for k, v in self.shop_items.items() if v["type"] != "upgrade")
+
+    def upgrade_effect(self, key: str, tier: int):
+        """The effect of upgrade key at tier, capped at its top tier (a reload may have removed tiers)."""
+        effects = self.upgrade_effects[key]
+        return effects[min(tier, len(effects) - 1)]
+
+    def __repr__(self):
+        return f"<Catalog v{self.version}: {len(self.squirrels)} species, {len(self.shop_items)} items>"
+
+
+def load_catalog(path: str = CATALOG_PATH) -> Catalog:
+    """Read, validate and compile the catalog at path. Raises CatalogError if it is unusable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise CatalogError(f"can't read {path}: {e.strerror}") from e
+    except json.JSONDecodeError as e:
+        raise CatalogError(f"{path} is not valid JSON: {e}") from e
+    return Catalog(data)
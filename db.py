@@ -1,29 +1,57 @@
 """
 Database module for Squirrel Catcher bot.
 Uses asyncpg with PostgreSQL for persistent player data storage.
+This is the default backend of the storage interface (see storage.py).
 """
 
+import asyncio
+import heapq
 import json
+import random
 import asyncpg
 from datetime import datetime, timezone, timedelta
 
+from cache import TTLCache
+from storage import CATCH_EVENT_COLUMNS, DEFAULT_PLAYER, UPGRADE_COLUMNS, ReferralOutcome
+
 pool: asyncpg.Pool | None = None
+# Errors that mean the database is unreachable or overloaded (see breaker.GuardedStorage)
+TRANSIENT_ERRORS = (
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.CannotConnectNowError,
+    asyncpg.exceptions.TooManyConnectionsError,
+    asyncpg.exceptions.QueryCanceledError,
+)
 
-DEFAULT_PLAYER = {
-    "acorns": 0,
-    "silver_acorns": 0,
-    "emerald_acorns": 0,
-    "golden_acorns": 0,
-    "catches": {},
-    "total_catches": 0,
-    "junk_catches": 0,
-    "level": 1,
-    "xp": 0,
-    "last_daily": None,
-    "trap_tier": 0,
-    "junk_resist_tier": 0,
-    "acorn_magnet_tier": 0,
-}
+# Read-through caches of player data. Entries are private snapshots: callers
+# always get copies, and every write path below refreshes or drops them.
+PLAYER_CACHE_TTL = 30  # seconds
+SNAPSHOT_CACHE_TTL = 10  # seconds; shorter since timed buffs expire on their own
+_player_cache = TTLCache("players", ttl=PLAYER_CACHE_TTL, maxsize=50_000)
+_snapshot_cache = TTLCache("profile_snapshots", ttl=SNAPSHOT_CACHE_TTL, maxsize=20_000)
+RANK_CACHE_TTL = 30  # seconds
+_rank_cache = TTLCache("ranks", ttl=RANK_CACHE_TTL, maxsize=20_000)
+GUILD_TOUCH_INTERVAL = 3600  # seconds between last_seen writes per (guild, user)
+_guild_touches = TTLCache("guild_touches", ttl=GUILD_TOUCH_INTERVAL, maxsize=100_000)
+SPECIES_STATS_TTL = 60  # seconds
+_species_stats_cache = TTLCache("species_stats", ttl=SPECIES_STATS_TTL, maxsize=1)
+SPECIES_STAT_SHARDS = 16
+NET_WORTH_BUCKET_SHARDS = 16
+# pg_advisory_xact_lock key held by one-time migrations, since the bot and
+# server.py both run init_db and start together on a deploy
+MIGRATION_LOCK_KEY = 0x5371_C47C
+# Species known to have a first discoverer, so their catches skip the discovery insert
+_discovered_species: set[str] = set()
+GUILD_LEADERBOARD_TTL = 60  # seconds
+_guild_leaderboards = TTLCache("guild_leaderboards", ttl=GUILD_LEADERBOARD_TTL, maxsize=5_000)
+# Each user's buff rows, loaded on first use and kept current by every buff write below
+# (the ttl only bounds staleness from writes made outside this process)
+BUFF_CACHE_TTL = 3600  # seconds
+_buff_cache = TTLCache("buffs", ttl=BUFF_CACHE_TTL, maxsize=50_000)
+# Min-heap of (expires_at, buff_id) for every running timed buff, loaded at
+# startup; expire_buffs() pops what is due instead of scanning player_buffs
+_buff_expiry: list[tuple[datetime, int]] = []
 
 
 async def init_db(database_url: str):
@@ -51,6 +79,38 @@ async def init_db(database_url: str):
             await conn.execute(f"""
                 ALTER TABLE players ADD COLUMN IF NOT EXISTS {col} INTEGER DEFAULT 0
             """)
+        # Activity tracking and cold storage for long-inactive players
+        await conn.execute(
+            "ALTER TABLE players ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMPTZ DEFAULT NOW()"
+        )
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_last_active ON players (last_active_at)"
+        )
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS players_archive (
+                user_id TEXT PRIMARY KEY,
+                data JSONB NOT NULL,
+                archived_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        # Net worth in base acorns (must match EXCHANGE_RATES in bot.py), indexed for rankings
+        await conn.execute("""
+            ALTER TABLE players ADD COLUMN IF NOT EXISTS net_worth BIGINT
+                GENERATED ALWAYS AS (
+                    acorns::bigint + silver_acorns::bigint * 100
+                    + emerald_acorns::bigint * 1000 + golden_acorns::bigint * 10000
+                ) STORED
+        """)
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_net_worth ON players (net_worth DESC)"
+        )
+        # Players per net-worth bucket (3 significant digits), kept by triggers so
+        # get_rank sums a few bucket rows instead of counting every richer player.
+        # Sharded like species_stats so the busy low buckets don't contend on one row.
+        if await conn.fetchval("SELECT to_regclass('net_worth_buckets') IS NULL"):
+            async with conn.transaction():
+                if await _needs_migration(conn, "net_worth_buckets"):
+                    await _create_net_worth_buckets(conn)
         # Create player_buffs table
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS player_buffs (
@@ -64,6 +124,89 @@ async def init_db(database_url: str):
                 created_at TIMESTAMPTZ DEFAULT NOW()
             )
         """)
+        # One slot per (user, buff type): purchases stack into it and used-up
+        # slots stay for the next purchase, so rows per user stay bounded.
+        # Older tables can hold several rows per slot; fold them together first.
+        if await conn.fetchval("SELECT to_regclass('idx_player_buffs_slot') IS NULL"):
+            async with conn.transaction():
+                if await _needs_migration(conn, "idx_player_buffs_slot"):
+                    await conn.execute("""
+                        UPDATE player_buffs b SET charges_left = d.charges_left, expires_at = d.expires_at
+                        FROM (
+                            SELECT MIN(id) AS id, SUM(charges_left) AS charges_left, MAX(expires_at) AS expires_at
+                            FROM player_buffs
+                            GROUP BY user_id, buff_type
+                            HAVING COUNT(*) > 1
+                        ) d
+                        WHERE b.id = d.id
+                    """)
+                    await conn.execute("""
+                        DELETE FROM player_buffs b USING player_buffs keep
+                        WHERE keep.user_id = b.user_id AND keep.buff_type = b.buff_type AND keep.id < b.id
+                    """)
+                    await conn.execute("CREATE UNIQUE INDEX idx_player_buffs_slot ON player_buffs (user_id, buff_type)")
+        # Guild membership, recorded as users interact; the primary key serves
+        # both the per-guild member scan and membership probes for leaderboards
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS guild_players (
+                guild_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                last_seen TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+        # Global species counters, sharded so hot Common species don't contend on one row
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS species_stats (
+                species TEXT NOT NULL,
+                shard SMALLINT NOT NULL,
+                caught BIGINT NOT NULL DEFAULT 0,
+                owners BIGINT NOT NULL DEFAULT 0,
+                last_seen TIMESTAMPTZ,
+                PRIMARY KEY (species, shard)
+            )
+        """)
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS species_discoveries (
+                species TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                discovered_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        # One-time backfill from existing bags when the counters are first created
+        async with conn.transaction():
+            await _lock_migrations(conn)
+            await _backfill_species_stats(conn)
+        # Append-only catch log, one partition per UTC day (created on demand by insert_catch_events)
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS catch_events (
+                created_at TIMESTAMPTZ NOT NULL,
+                user_id TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                catch_name TEXT NOT NULL,
+                rarity TEXT,
+                acorns INTEGER NOT NULL,
+                silver_acorns INTEGER NOT NULL DEFAULT 0,
+                xp INTEGER NOT NULL,
+                buffs TEXT[] NOT NULL DEFAULT '{}',
+                source TEXT NOT NULL,
+                rng_seed BIGINT NOT NULL
+            ) PARTITION BY RANGE (created_at)
+        """)
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_catch_events_user ON catch_events (user_id, created_at)"
+        )
+        # Hourly and daily economy counters, maintained incrementally by events.py
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS economy_rollups (
+                granularity TEXT NOT NULL,
+                bucket TIMESTAMPTZ NOT NULL,
+                kind TEXT NOT NULL,
+                source TEXT NOT NULL,
+                amount BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket, kind, source)
+            )
+        """)
         # Create referrals table
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS referrals (
@@ -73,6 +216,179 @@ async def init_db(database_url: str):
                 created_at TIMESTAMPTZ DEFAULT NOW()
             )
         """)
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_referrals_referrer ON referrals (referrer_id)")
+        # Referrals per referrer, kept on the player row by add_referral so
+        # profiles don't count the referrals table. Backfilled once, including
+        # archived rows so a restored player keeps their count.
+        if await conn.fetchval("SELECT to_regclass('idx_players_referral_count') IS NULL"):
+            async with conn.transaction():
+                if await _needs_migration(conn, "idx_players_referral_count"):
+                    await conn.execute(
+                        "ALTER TABLE players ADD COLUMN IF NOT EXISTS referral_count INTEGER NOT NULL DEFAULT 0"
+                    )
+                    await conn.execute("""
+                        UPDATE players p SET referral_count = r.n
+                        FROM (SELECT referrer_id, COUNT(*) AS n FROM referrals GROUP BY referrer_id) r
+                        WHERE p.user_id = r.referrer_id
+                    """)
+                    await conn.execute("""
+                        UPDATE players_archive a SET data = a.data || jsonb_build_object(
+                            'referral_count',
+                            (SELECT COUNT(*) FROM referrals r WHERE r.referrer_id = a.user_id)
+                        )
+                    """)
+                    await conn.execute("""
+                        CREATE INDEX idx_players_referral_count ON players (referral_count DESC)
+                        WHERE referral_count > 0
+                    """)
+        rows = await conn.fetch(
+            "SELECT expires_at, id FROM player_buffs "
+            "WHERE expires_at > NOW() OR (expires_at IS NOT NULL AND channel_id IS NOT NULL)"
+        )
+    _buff_expiry[:] = [tuple(r) for r in rows]
+    heapq.heapify(_buff_expiry)
+
+
+async def _backfill_species_stats(conn: asyncpg.Connection):
+    """Compute species counters from every bag, if the counters are empty.
+
+    Who found pre-existing species first is unknown, recorded as an empty user_id.
+    """
+    await conn.execute("""
+        INSERT INTO species_discoveries (species, user_id, discovered_at)
+        SELECT DISTINCT c.key, '', NULL::timestamptz
+        FROM players, jsonb_each_text(players.catches) c
+        WHERE NOT EXISTS (SELECT 1 FROM species_stats)
+        ON CONFLICT (species) DO NOTHING
+    """)
+    await conn.execute("""
+        INSERT INTO species_stats (species, shard, caught, owners)
+        SELECT c.key, 0, SUM(c.value::bigint), COUNT(*) FILTER (WHERE c.value::int > 0)
+        FROM players, jsonb_each_text(players.catches) c
+        WHERE NOT EXISTS (SELECT 1 FROM species_stats)
+        GROUP BY c.key
+    """)
+
+
+async def _lock_migrations(conn: asyncpg.Connection):
+    """Wait for other processes' migrations; held until the current transaction ends."""
+    await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_KEY)
+
+
+async def _needs_migration(conn: asyncpg.Connection, relation: str) -> bool:
+    """Take the migration lock, then check whether relation still needs creating.
+
+    Another process may have run the migration between the caller's unlocked
+    check and the lock, in which case this returns False.
+    """
+    await _lock_migrations(conn)
+    return await conn.fetchval("SELECT to_regclass($1) IS NULL", relation)
+
+
+async def _create_net_worth_buckets(conn: asyncpg.Connection):
+    """Create the net-worth bucket counters and their triggers, and count the existing players."""
+    await conn.execute("""
+        CREATE OR REPLACE FUNCTION net_worth_bucket_width(worth BIGINT) RETURNS BIGINT
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT power(10, GREATEST(length(COALESCE(worth, 0)::text) - 3, 0))::bigint
+        $$
+    """)
+    await conn.execute("""
+        CREATE OR REPLACE FUNCTION net_worth_bucket(worth BIGINT) RETURNS BIGINT
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT COALESCE(worth, 0) - COALESCE(worth, 0) % net_worth_bucket_width(worth)
+        $$
+    """)
+    await conn.execute("""
+        CREATE TABLE net_worth_buckets (
+            bucket BIGINT NOT NULL,
+            shard SMALLINT NOT NULL,
+            players BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, shard)
+        )
+    """)
+    await conn.execute(f"""
+        CREATE OR REPLACE FUNCTION count_net_worth_bucket() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                INSERT INTO net_worth_buckets (bucket, shard, players)
+                VALUES (net_worth_bucket(OLD.net_worth), floor(random() * {NET_WORTH_BUCKET_SHARDS}), -1)
+                ON CONFLICT (bucket, shard) DO UPDATE SET players = net_worth_buckets.players - 1;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                INSERT INTO net_worth_buckets (bucket, shard, players)
+                VALUES (net_worth_bucket(NEW.net_worth), floor(random() * {NET_WORTH_BUCKET_SHARDS}), 1)
+                ON CONFLICT (bucket, shard) DO UPDATE SET players = net_worth_buckets.players + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    await conn.execute("""
+        CREATE TRIGGER players_net_worth_count AFTER INSERT OR DELETE ON players
+        FOR EACH ROW EXECUTE FUNCTION count_net_worth_bucket()
+    """)
+    # Most balance changes stay inside their bucket and skip the trigger entirely
+    await conn.execute("""
+        CREATE TRIGGER players_net_worth_move AFTER UPDATE ON players
+        FOR EACH ROW WHEN (net_worth_bucket(OLD.net_worth) <> net_worth_bucket(NEW.net_worth))
+        EXECUTE FUNCTION count_net_worth_bucket()
+    """)
+    await _backfill_net_worth_buckets(conn)
+
+
+async def _backfill_net_worth_buckets(conn: asyncpg.Connection):
+    """Count every player into their net-worth bucket."""
+    await conn.execute("""
+        INSERT INTO net_worth_buckets (bucket, shard, players)
+        SELECT net_worth_bucket(net_worth), 0, COUNT(*) FROM players GROUP BY 1
+    """)
+
+
+async def rebuild_net_worth_buckets():
+    """Recount the net-worth buckets from scratch, e.g. after a TRUNCATE skipped the triggers."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("LOCK TABLE players IN SHARE MODE")
+            await conn.execute("TRUNCATE net_worth_buckets")
+            await _backfill_net_worth_buckets(conn)
+    _rank_cache.clear()
+
+
+async def rebuild_referral_counts():
+    """Recompute every player's referral_count, e.g. after bulk-loading referrals."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                UPDATE players p SET referral_count = r.n
+                FROM (SELECT referrer_id, COUNT(*) AS n FROM referrals GROUP BY referrer_id) r
+                WHERE p.user_id = r.referrer_id AND p.referral_count <> r.n
+            """)
+            await conn.execute("""
+                UPDATE players p SET referral_count = 0
+                WHERE p.referral_count > 0
+                  AND NOT EXISTS (SELECT 1 FROM referrals r WHERE r.referrer_id = p.user_id)
+            """)
+    _snapshot_cache.clear()
+
+
+async def rebuild_species_stats():
+    """Recompute the species counters from scratch, e.g. after bulk-loading players."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("TRUNCATE species_stats, species_discoveries")
+            await _backfill_species_stats(conn)
+    _species_stats_cache.clear()
+    _discovered_species.clear()
+
+
+# Stored (non-generated) players columns, used to move rows to and from the archive
+_PLAYER_COLUMNS = (
+    "user_id", "acorns", "silver_acorns", "emerald_acorns", "golden_acorns",
+    "total_catches", "junk_catches", "level", "xp", "last_daily", "catches",
+    "trap_tier", "junk_resist_tier", "acorn_magnet_tier", "referral_count", "last_active_at",
+)
 
 
 def _row_to_dict(row: asyncpg.Record) -> dict:
@@ -97,14 +413,107 @@ def _row_to_dict(row: asyncpg.Record) -> dict:
     }
 
 
+def _copy_player(player: dict) -> dict:
+    """Copy a player dict deeply enough that callers can mutate it freely."""
+    return {**player, "catches": dict(player.get("catches", {}))}
+
+
+def invalidate_player(user_id: str):
+    """Drop cached data for a player after a write outside update_player."""
+    _player_cache.pop(user_id)
+    _snapshot_cache.pop(user_id)
+    _rank_cache.pop(user_id)
+
+
+def _cache_written_player(user_id: str, player: dict):
+    """Write-through after a write that leaves the row matching this player dict."""
+    _player_cache.set(user_id, _copy_player(player))
+    _snapshot_cache.pop(user_id)
+    _rank_cache.pop(user_id)
+
+
+async def _restore_or_create_player(conn: asyncpg.Connection, user_id: str) -> asyncpg.Record | None:
+    """Bring an archived player back into the hot table, or create a default row.
+
+    Returns the restored row, or None if a fresh default player was created.
+    """
+    columns = ", ".join(c for c in _PLAYER_COLUMNS if c != "last_active_at")
+    restored = await conn.fetchrow(
+        f"""
+        WITH archived AS (
+            DELETE FROM players_archive WHERE user_id = $1 RETURNING data
+        )
+        INSERT INTO players ({columns}, last_active_at)
+        SELECT {", ".join(f"r.{c}" for c in _PLAYER_COLUMNS if c != "last_active_at")}, NOW()
+        FROM archived, jsonb_populate_record(NULL::players, archived.data) r
+        ON CONFLICT (user_id) DO NOTHING
+        RETURNING *
+        """,
+        user_id,
+    )
+    if restored is None:
+        await conn.execute("INSERT INTO players (user_id) VALUES ($1) ON CONFLICT DO NOTHING", user_id)
+    return restored
+
+
 async def get_player(user_id: str) -> dict:
-    """Fetch a player by user_id. Creates a default row if not found."""
+    """Fetch a player by user_id. Restores archived players and creates a default row if not found."""
+    cached = _player_cache.get(user_id)
+    if cached is not None:
+        return _copy_player(cached)
     async with pool.acquire() as conn:
         row = await conn.fetchrow("SELECT * FROM players WHERE user_id = $1", user_id)
         if row is None:
-            await conn.execute("INSERT INTO players (user_id) VALUES ($1)", user_id)
-            return dict(DEFAULT_PLAYER)
-        return _row_to_dict(row)
+            row = await _restore_or_create_player(conn, user_id)
+        if row is None:
+            player = _copy_player(DEFAULT_PLAYER)
+        else:
+            player = _row_to_dict(row)
+    _player_cache.set(user_id, player)
+    return _copy_player(player)
+
+
+_PROFILE_SNAPSHOT_SQL = """
+            SELECT p.*,
+                   ARRAY(
+                       SELECT b FROM player_buffs b
+                       WHERE b.user_id = p.user_id
+                         AND (b.charges_left IS NULL OR b.charges_left > 0)
+                         AND (b.expires_at IS NULL OR b.expires_at > NOW())
+                       ORDER BY b.created_at
+                   ) AS active_buffs
+            FROM players p
+            WHERE p.user_id = $1
+"""
+
+
+async def get_profile_snapshot(user_id: str) -> dict:
+    """Fetch a player, their active buffs and referral count in a single query.
+
+    Returns {"player": dict, "buffs": list[dict], "referral_count": int}.
+    Restores archived players and creates a default row if not found. The
+    buff list is shared with the cache and must be treated as read-only.
+    """
+    cached = _snapshot_cache.get(user_id)
+    if cached is not None:
+        return {**cached, "player": _copy_player(cached["player"])}
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_PROFILE_SNAPSHOT_SQL, user_id)
+        if row is None and await _restore_or_create_player(conn, user_id) is not None:
+            row = await conn.fetchrow(_PROFILE_SNAPSHOT_SQL, user_id)
+        if row is None:
+            snapshot = {"player": _copy_player(DEFAULT_PLAYER), "buffs": [], "referral_count": 0}
+        else:
+            snapshot = {
+                "player": _row_to_dict(row),
+                "buffs": [dict(b) for b in row["active_buffs"]],
+                "referral_count": row["referral_count"],
+            }
+    _snapshot_cache.set(user_id, snapshot)
+    _player_cache.set(user_id, snapshot["player"])
+    if user_id not in _buff_cache:
+        _buff_cache.set(user_id, [dict(b) for b in snapshot["buffs"]])
+    return {**snapshot, "player": _copy_player(snapshot["player"])}
 
 
 async def update_player(user_id: str, player: dict):
@@ -127,8 +536,8 @@ async def update_player(user_id: str, player: dict):
             """
             INSERT INTO players (user_id, acorns, silver_acorns, emerald_acorns, golden_acorns,
                                  total_catches, junk_catches, level, xp, last_daily, catches,
-                                 trap_tier, junk_resist_tier, acorn_magnet_tier)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11::jsonb, $12, $13, $14)
+                                 trap_tier, junk_resist_tier, acorn_magnet_tier, last_active_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11::jsonb, $12, $13, $14, NOW())
             ON CONFLICT (user_id) DO UPDATE SET
                 acorns = EXCLUDED.acorns,
                 silver_acorns = EXCLUDED.silver_acorns,
@@ -142,7 +551,8 @@ async def update_player(user_id: str, player: dict):
                 catches = EXCLUDED.catches,
                 trap_tier = EXCLUDED.trap_tier,
                 junk_resist_tier = EXCLUDED.junk_resist_tier,
-                acorn_magnet_tier = EXCLUDED.acorn_magnet_tier
+                acorn_magnet_tier = EXCLUDED.acorn_magnet_tier,
+                last_active_at = EXCLUDED.last_active_at
             """,
             user_id,
             player.get("acorns", 0),
@@ -159,6 +569,352 @@ async def update_player(user_id: str, player: dict):
             player.get("junk_resist_tier", 0),
             player.get("acorn_magnet_tier", 0),
         )
+    _cache_written_player(user_id, player)
+
+
+_CURRENCY_COLUMNS = ("acorns", "silver_acorns", "emerald_acorns", "golden_acorns")
+
+
+def _balances(row: asyncpg.Record, prefix: str = "") -> dict:
+    return {c: row[prefix + c] for c in _CURRENCY_COLUMNS}
+
+
+_CLAIM_DAILY_SQL = """
+            WITH cur AS (
+                SELECT user_id, level, last_daily FROM players WHERE user_id = $1 FOR UPDATE
+            ),
+            claimed AS (
+                UPDATE players p SET
+                    acorns = p.acorns + $2 + cur.level * $3,
+                    last_daily = NOW(),
+                    last_active_at = NOW()
+                FROM cur
+                WHERE p.user_id = cur.user_id
+                  AND (cur.last_daily IS NULL OR cur.last_daily <= NOW() - $4::interval)
+                RETURNING $2 + cur.level * $3 AS reward
+            )
+            SELECT cur.level, (SELECT reward FROM claimed) AS reward,
+                   cur.last_daily + $4::interval - NOW() AS remaining
+            FROM cur
+"""
+
+
+async def claim_daily(user_id: str, base_reward: int, level_bonus: int, cooldown: timedelta) -> dict:
+    """Pay the daily bonus (base_reward + level * level_bonus) if cooldown has passed since the last claim.
+
+    The window check and the credit are one conditional UPDATE, so two
+    fast claims can't both pay. Returns {"level": int, "reward": int}
+    when paid, or {"level": int, "reward": None, "remaining": timedelta}
+    when the bonus isn't due yet.
+    """
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_CLAIM_DAILY_SQL, user_id, base_reward, level_bonus, cooldown)
+        if row is None:
+            await _restore_or_create_player(conn, user_id)
+            row = await conn.fetchrow(_CLAIM_DAILY_SQL, user_id, base_reward, level_bonus, cooldown)
+    if row["reward"] is None:
+        return {"level": row["level"], "reward": None, "remaining": row["remaining"]}
+    invalidate_player(user_id)
+    return {"level": row["level"], "reward": row["reward"]}
+
+
+async def exchange_currency(user_id: str, from_currency: str, to_currency: str,
+                            rate: int, units: int | None = None) -> dict | None:
+    """Convert units of from_currency into to_currency (rate to 1) in one conditional UPDATE.
+
+    units=None converts as many units as the player can afford. Returns
+    {"units": n, "before": balances, "after": balances}, or None if the
+    player can't afford the exchange. Balances can never go negative, even
+    with concurrent exchanges, because the row is locked and re-checked.
+    """
+    if from_currency not in _CURRENCY_COLUMNS or to_currency not in _CURRENCY_COLUMNS:
+        raise ValueError(f"Unknown currency: {from_currency} -> {to_currency}")
+    units_expr = f"cur.{from_currency} / $2" if units is None else "$3::int"
+    args = [user_id, rate] if units is None else [user_id, rate, units]
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            f"""
+            WITH cur AS (
+                SELECT user_id, {", ".join(_CURRENCY_COLUMNS)}, {units_expr} AS units
+                FROM players WHERE user_id = $1
+                FOR UPDATE
+            )
+            UPDATE players p SET
+                {from_currency} = cur.{from_currency} - cur.units * $2,
+                {to_currency} = cur.{to_currency} + cur.units,
+                last_active_at = NOW()
+            FROM cur
+            WHERE p.user_id = cur.user_id
+              AND cur.units > 0
+              AND cur.{from_currency} >= cur.units * $2
+            RETURNING cur.units, {", ".join(f"cur.{c} AS old_{c}" for c in _CURRENCY_COLUMNS)},
+                      {", ".join(f"p.{c}" for c in _CURRENCY_COLUMNS)}
+            """,
+            *args,
+        )
+    if row is None:
+        return None
+    invalidate_player(user_id)
+    return {"units": row["units"], "before": _balances(row, "old_"), "after": _balances(row)}
+
+
+def _cascade_sql(chain: list[tuple[str, str, int]]) -> tuple[str, str]:
+    """Build SET assignments and a WHERE condition that exchange up a currency chain.
+
+    chain is [(from, to, rate), ...] with each tier's `to` feeding the next tier's `from`.
+    Every tier converts its own balance plus what the tier below produced.
+    """
+    assignments = []
+    conditions = []
+    carry = None
+    for i, (from_cur, to_cur, rate) in enumerate(chain):
+        if from_cur not in _CURRENCY_COLUMNS or to_cur not in _CURRENCY_COLUMNS:
+            raise ValueError(f"Unknown currency: {from_cur} -> {to_cur}")
+        if i and chain[i - 1][1] != from_cur:
+            raise ValueError("Exchange chain tiers must be contiguous")
+        rate = int(rate)
+        total = f"cur.{from_cur}" if carry is None else f"(cur.{from_cur} + {carry})"
+        assignments.append(f"{from_cur} = {total} % {rate}")
+        conditions.append(f"{total} >= {rate}")
+        carry = f"{total} / {rate}"
+    top = chain[-1][1]
+    assignments.append(f"{top} = cur.{top} + {carry}")
+    return ",\n                ".join(assignments), " OR ".join(conditions)
+
+
+async def exchange_all(user_id: str, chain: list[tuple[str, str, int]]) -> dict | None:
+    """Exchange everything up the currency chain in one conditional UPDATE.
+
+    Returns {"before": balances, "after": balances}, or None if no tier had
+    enough to convert.
+    """
+    assignments, condition = _cascade_sql(chain)
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            f"""
+            WITH cur AS (
+                SELECT user_id, {", ".join(_CURRENCY_COLUMNS)}
+                FROM players WHERE user_id = $1
+                FOR UPDATE
+            )
+            UPDATE players p SET
+                {assignments},
+                last_active_at = NOW()
+            FROM cur
+            WHERE p.user_id = cur.user_id AND ({condition})
+            RETURNING {", ".join(f"cur.{c} AS old_{c}" for c in _CURRENCY_COLUMNS)},
+                      {", ".join(f"p.{c}" for c in _CURRENCY_COLUMNS)}
+            """,
+            user_id,
+        )
+    if row is None:
+        return None
+    invalidate_player(user_id)
+    return {"before": _balances(row, "old_"), "after": _balances(row)}
+
+
+async def sell_catches(user_id: str, quantities: dict[str, int], payout: int) -> dict | None:
+    """Remove the given squirrel counts from a player's bag and credit payout, atomically.
+
+    A single conditional UPDATE: it only applies if the player still owns at
+    least the requested count of every species. Returns the updated player,
+    or None if the bag no longer has enough.
+    """
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            UPDATE players SET
+                catches = (
+                    SELECT COALESCE(jsonb_object_agg(c.key, c.value::int - COALESCE(s.value::int, 0)), '{}'::jsonb)
+                    FROM jsonb_each_text(catches) c
+                    LEFT JOIN jsonb_each_text($2::jsonb) s ON s.key = c.key
+                    WHERE c.value::int - COALESCE(s.value::int, 0) > 0
+                ),
+                acorns = acorns + $3,
+                last_active_at = NOW()
+            WHERE user_id = $1
+              AND NOT EXISTS (
+                  SELECT 1 FROM jsonb_each_text($2::jsonb) s
+                  WHERE COALESCE((catches->>s.key)::int, 0) < s.value::int
+              )
+            RETURNING *
+            """,
+            user_id, json.dumps(quantities), payout,
+        )
+        if row is None:
+            return None
+        player = _row_to_dict(row)
+        await _release_species(conn, [name for name in quantities if name not in player["catches"]])
+    _cache_written_player(user_id, player)
+    return player
+
+
+_RECORD_CATCH_SQL = """
+            WITH cur AS (
+                SELECT user_id, level, xp, catches FROM players WHERE user_id = $1 FOR UPDATE
+            ),
+            leveling AS (
+                SELECT cur.*, cur.level = $4 AND cur.xp + $3 >= $5 AS levels_up FROM cur
+            )
+            UPDATE players p SET
+                acorns = p.acorns + $2,
+                silver_acorns = p.silver_acorns + $7,
+                total_catches = p.total_catches + ($6::text IS NOT NULL)::int,
+                junk_catches = p.junk_catches + ($6::text IS NULL)::int,
+                catches = CASE WHEN $6::text IS NULL THEN p.catches
+                               ELSE jsonb_set(p.catches, ARRAY[$6::text],
+                                              to_jsonb(COALESCE((p.catches->>$6::text)::int, 0) + 1))
+                          END,
+                level = p.level + leveling.levels_up::int,
+                xp = p.xp + $3 - CASE WHEN leveling.levels_up THEN $5 ELSE 0 END,
+                last_active_at = NOW()
+            FROM leveling
+            WHERE p.user_id = leveling.user_id
+            RETURNING p.*, leveling.levels_up AS leveled,
+                      $6::text IS NOT NULL AND COALESCE((leveling.catches->>$6::text)::int, 0) = 0 AS new_species
+"""
+
+
+async def record_catch(user_id: str, acorns: int, xp: int, level: int, xp_needed: int,
+                       species: str | None = None, silver_acorns: int = 0) -> dict:
+    """Add one catch's rewards to a player with a single incremental UPDATE.
+
+    species=None records a junk catch. The player levels up if they are
+    still at `level` and the new xp reaches xp_needed, so a stale read
+    can't level them twice. Nothing else on the row is touched, so daily
+    claims, purchases and exchanges that commit while the catch animation
+    runs are kept. Returns {"player": dict, "leveled": bool, "new_species": bool}.
+    """
+    args = (user_id, acorns, xp, level, xp_needed, species, silver_acorns)
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_RECORD_CATCH_SQL, *args)
+        if row is None:
+            await _restore_or_create_player(conn, user_id)
+            row = await conn.fetchrow(_RECORD_CATCH_SQL, *args)
+    player = _row_to_dict(row)
+    _cache_written_player(user_id, player)
+    return {"player": _copy_player(player), "leveled": row["leveled"], "new_species": row["new_species"]}
+
+
+async def record_species_catch(species: str, user_id: str, new_owner: bool) -> bool:
+    """Count a catch in the global species stats.
+
+    new_owner marks the player's first of this species. Returns True if this
+    was the first catch of the species ever (the player is its discoverer).
+    """
+    discovered = False
+    async with pool.acquire() as conn:
+        if species not in _discovered_species:
+            discovered = await conn.fetchval(
+                """
+                INSERT INTO species_discoveries (species, user_id) VALUES ($1, $2)
+                ON CONFLICT (species) DO NOTHING
+                RETURNING TRUE
+                """,
+                species, user_id,
+            ) or False
+            _discovered_species.add(species)
+        await conn.execute(
+            """
+            INSERT INTO species_stats (species, shard, caught, owners, last_seen)
+            VALUES ($1, $2, 1, $3, NOW())
+            ON CONFLICT (species, shard) DO UPDATE SET
+                caught = species_stats.caught + 1,
+                owners = species_stats.owners + EXCLUDED.owners,
+                last_seen = NOW()
+            """,
+            species, random.randrange(SPECIES_STAT_SHARDS), int(new_owner),
+        )
+    return discovered
+
+
+async def _release_species(conn: asyncpg.Connection, species: list[str]):
+    """Decrement owner counts for species a player no longer has any of."""
+    if not species:
+        return
+    await conn.execute(
+        """
+        INSERT INTO species_stats (species, shard, owners)
+        SELECT s, $2, -1 FROM unnest($1::text[]) AS s
+        ON CONFLICT (species, shard) DO UPDATE SET owners = species_stats.owners - 1
+        """,
+        species, random.randrange(SPECIES_STAT_SHARDS),
+    )
+
+
+async def get_species_stats() -> dict[str, dict]:
+    """Global stats per species: caught, owners, last_seen, discoverer, discovered_at.
+
+    Sums a handful of shard rows per species (no scan of player bags); cached briefly.
+    """
+    cached = _species_stats_cache.get("all")
+    if cached is not None:
+        return cached
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT s.species, SUM(s.caught) AS caught, SUM(s.owners) AS owners,
+                   MAX(s.last_seen) AS last_seen,
+                   d.user_id AS discoverer, d.discovered_at
+            FROM species_stats s
+            LEFT JOIN species_discoveries d ON d.species = s.species
+            GROUP BY s.species, d.user_id, d.discovered_at
+            """
+        )
+    stats = {r["species"]: dict(r) for r in rows}
+    _discovered_species.update(name for name, st in stats.items() if st["discoverer"])
+    _species_stats_cache.set("all", stats)
+    return stats
+
+
+async def archive_inactive_players(inactive_days: int, batch_size: int = 1000) -> int:
+    """Move players inactive for inactive_days into players_archive, in batches.
+
+    Players with an active buff are left alone; the empty buff slots of
+    archived players are dropped. Each batch is one statement that deletes
+    from players and inserts into the archive, skipping rows locked by live
+    requests. get_player restores archived players on their
+    next interaction. Returns the number of players archived.
+    """
+    total = 0
+    while True:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                WITH moved AS (
+                    DELETE FROM players
+                    WHERE user_id IN (
+                        SELECT p.user_id FROM players p
+                        WHERE p.last_active_at < NOW() - make_interval(days => $1)
+                          AND NOT EXISTS (
+                              SELECT 1 FROM player_buffs b
+                              WHERE b.user_id = p.user_id
+                                AND (b.charges_left IS NULL OR b.charges_left > 0)
+                                AND (b.expires_at IS NULL OR b.expires_at > NOW())
+                          )
+                        ORDER BY p.last_active_at
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING *
+                ),
+                dropped_slots AS (
+                    DELETE FROM player_buffs WHERE user_id IN (SELECT user_id FROM moved)
+                )
+                INSERT INTO players_archive (user_id, data)
+                SELECT user_id, to_jsonb(moved) - 'net_worth' FROM moved
+                ON CONFLICT (user_id) DO UPDATE SET data = EXCLUDED.data, archived_at = NOW()
+                RETURNING user_id
+                """,
+                inactive_days, batch_size,
+            )
+        for row in rows:
+            invalidate_player(row["user_id"])
+            _buff_cache.pop(row["user_id"])
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+        await asyncio.sleep(0.1)  # let live traffic through between batches
 
 
 async def load_all_players() -> dict:
@@ -168,54 +924,332 @@ async def load_all_players() -> dict:
     return {row["user_id"]: _row_to_dict(row) for row in rows}
 
 
-async def add_buff(user_id: str, buff_type: str, charges: int | None = None,
-                   expires_at: datetime | None = None, channel_id: str | None = None) -> int:
-    """Add a buff to a player. Returns the buff id."""
+async def get_top_players(limit: int = 10) -> list[dict]:
+    """Top players by net worth, read straight off the net-worth index."""
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
+        rows = await conn.fetch(
             """
-            INSERT INTO player_buffs (user_id, buff_type, charges_left, expires_at, channel_id)
-            VALUES ($1, $2, $3, $4, $5)
-            RETURNING id
+            SELECT user_id, net_worth, total_catches, level
+            FROM players
+            ORDER BY net_worth DESC
+            LIMIT $1
+            """,
+            limit,
+        )
+    return [dict(r) for r in rows]
+
+
+async def touch_guild_player(guild_id: str, user_id: str):
+    """Record that a user played in a guild. Writes at most once per GUILD_TOUCH_INTERVAL."""
+    key = (guild_id, user_id)
+    if key in _guild_touches:
+        return
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO guild_players (guild_id, user_id) VALUES ($1, $2)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET last_seen = NOW()
             """,
-            user_id, buff_type, charges, expires_at, channel_id,
+            guild_id, user_id,
         )
-        return row["id"]
+    _guild_touches.set(key, True)
 
 
-async def get_active_buffs(user_id: str) -> list[dict]:
-    """Get all active buffs for a player (charges > 0 or not yet expired)."""
+async def get_guild_top_players(guild_id: str, limit: int = 10) -> list[dict]:
+    """Top players by net worth among users seen in a guild (cached briefly).
+
+    Members come off the guild_players primary key and their net worth from
+    players, so balance writes never touch guild_players. The sort runs at
+    most once per guild per GUILD_LEADERBOARD_TTL.
+    """
+    key = (guild_id, limit)
+    cached = _guild_leaderboards.get(key)
+    if cached is not None:
+        return cached
     async with pool.acquire() as conn:
         rows = await conn.fetch(
             """
-            SELECT * FROM player_buffs
-            WHERE user_id = $1
-              AND (charges_left IS NULL OR charges_left > 0)
-              AND (expires_at IS NULL OR expires_at > NOW())
-            ORDER BY created_at
+            SELECT p.user_id, p.net_worth, p.total_catches, p.level
+            FROM guild_players g
+            JOIN players p ON p.user_id = g.user_id
+            WHERE g.guild_id = $1
+            ORDER BY p.net_worth DESC
+            LIMIT $2
+            """,
+            guild_id, limit,
+        )
+    top = [dict(r) for r in rows]
+    _guild_leaderboards.set(key, top)
+    return top
+
+
+async def get_rank(user_id: str) -> dict | None:
+    """A player's leaderboard rank plus their neighbours just above and below.
+
+    Returns {"rank", "net_worth", "total", "above", "below"} where above/below
+    are {"user_id", "net_worth"} or None. Neighbour lookups are single index
+    probes. The rank sums net_worth_buckets above the player's bucket and
+    counts richer players inside it, so it costs the same near the top and
+    the bottom. total is the planner's row estimate. Results are cached
+    briefly. Returns None if the player doesn't exist.
+    """
+    cached = _rank_cache.get(user_id)
+    if cached is not None:
+        return cached
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT me.net_worth, r.rank,
+                   (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'players'::regclass) AS total,
+                   a.user_id AS above_id, a.net_worth AS above_worth,
+                   b.user_id AS below_id, b.net_worth AS below_worth
+            FROM players me
+            CROSS JOIN LATERAL (
+                SELECT 1
+                       + (SELECT COALESCE(SUM(players), 0) FROM net_worth_buckets
+                          WHERE bucket > net_worth_bucket(me.net_worth))
+                       + (SELECT COUNT(*) FROM players p
+                          WHERE p.net_worth > me.net_worth
+                            AND p.net_worth < net_worth_bucket(me.net_worth) + net_worth_bucket_width(me.net_worth))
+                       AS rank
+            ) r
+            LEFT JOIN LATERAL (
+                SELECT user_id, net_worth FROM players p
+                WHERE p.net_worth > me.net_worth ORDER BY p.net_worth ASC LIMIT 1
+            ) a ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT user_id, net_worth FROM players p
+                WHERE p.net_worth < me.net_worth ORDER BY p.net_worth DESC LIMIT 1
+            ) b ON TRUE
+            WHERE me.user_id = $1
             """,
             user_id,
         )
-    return [dict(r) for r in rows]
+    if row is None:
+        return None
+    rank = {
+        "rank": row["rank"],
+        "net_worth": row["net_worth"],
+        "total": max(row["total"], row["rank"]),
+        "above": {"user_id": row["above_id"], "net_worth": row["above_worth"]} if row["above_id"] else None,
+        "below": {"user_id": row["below_id"], "net_worth": row["below_worth"]} if row["below_id"] else None,
+    }
+    _rank_cache.set(user_id, rank)
+    return rank
 
 
-async def consume_buff_charge(buff_id: int):
-    """Decrement charges_left for a buff. Delete if it hits 0."""
+def _cached_buffs(user_id: str) -> list[dict] | None:
+    """The user's cached buff rows, or None if they haven't been loaded."""
+    return _buff_cache.get(user_id)
+
+
+def _patch_cached_buff(user_id: str, buff_id: int, **changes):
+    """Apply changes to one cached buff row."""
+    for buff in _cached_buffs(user_id) or ():
+        if buff["id"] == buff_id:
+            buff.update(changes)
+
+
+def _forget_cached_buffs(rows: list[asyncpg.Record]):
+    """Remove deleted buff rows from their users' cached lists."""
+    for row in rows:
+        buffs = _cached_buffs(row["user_id"])
+        if buffs is not None:
+            buffs[:] = [b for b in buffs if b["id"] != row["id"]]
+        _snapshot_cache.pop(row["user_id"])
+
+
+def _active(buffs: list[dict], now: datetime) -> list[dict]:
+    return [dict(b) for b in buffs
+            if (b["charges_left"] is None or b["charges_left"] > 0)
+            and (b["expires_at"] is None or b["expires_at"] > now)]
+
+
+_STACK_BUFF_SQL = """
+            INSERT INTO player_buffs (user_id, buff_type, charges_left, expires_at, channel_id)
+            VALUES ($1, $2, $3, NOW() + $4::interval, $5)
+            ON CONFLICT (user_id, buff_type) DO UPDATE SET
+                charges_left = GREATEST(player_buffs.charges_left, 0) + EXCLUDED.charges_left,
+                expires_at = GREATEST(player_buffs.expires_at, NOW()) + $4::interval,
+                channel_id = COALESCE(EXCLUDED.channel_id, player_buffs.channel_id)
+            RETURNING *
+"""
+
+
+def _cache_stacked_buff(user_id: str, row: asyncpg.Record) -> dict:
+    """Put a slot returned by _STACK_BUFF_SQL into the buff cache and expiry heap; returns a copy."""
+    slot = dict(row)
+    buffs = _cached_buffs(user_id)
+    if buffs is not None:
+        buffs[:] = [b for b in buffs if b["id"] != slot["id"]] + [slot]
+    if slot["expires_at"] is not None:
+        heapq.heappush(_buff_expiry, (slot["expires_at"], slot["id"]))
+    _snapshot_cache.pop(user_id)
+    return dict(slot)
+
+
+async def add_buff(user_id: str, buff_type: str, charges: int | None = None,
+                   duration: timedelta | None = None, channel_id: str | None = None) -> dict:
+    """Stack a buff into the player's slot for buff_type. Returns the updated slot.
+
+    Charges add to whatever is left and duration extends the current expiry
+    (or starts from now if it has passed), all in one upsert.
+    """
     async with pool.acquire() as conn:
+        row = await conn.fetchrow(_STACK_BUFF_SQL, user_id, buff_type, charges, duration, channel_id)
+    return _cache_stacked_buff(user_id, row)
+
+
+# Player columns the shop views render from
+_SHOP_COLUMNS = (*_CURRENCY_COLUMNS, *UPGRADE_COLUMNS)
+
+
+async def _charge(conn: asyncpg.Connection, user_id: str, assignments: str, condition: str,
+                  *args) -> tuple[bool, dict]:
+    """Apply a conditional debit to a player row: (charged, balances and upgrade tiers afterwards).
+
+    $1 is user_id; args fill $2 onwards. If the condition fails nothing is
+    written and the current values are returned. Archived players are restored.
+    """
+    columns = ", ".join(_SHOP_COLUMNS)
+    for _ in range(2):
         row = await conn.fetchrow(
-            "UPDATE player_buffs SET charges_left = charges_left - 1 WHERE id = $1 RETURNING charges_left",
-            buff_id,
+            f"""
+            UPDATE players SET {assignments}, last_active_at = NOW()
+            WHERE user_id = $1 AND {condition}
+            RETURNING {columns}
+            """,
+            user_id, *args,
         )
-        if row and row["charges_left"] <= 0:
-            await conn.execute("DELETE FROM player_buffs WHERE id = $1", buff_id)
+        if row is not None:
+            return True, dict(row)
+        row = await conn.fetchrow(f"SELECT {columns} FROM players WHERE user_id = $1", user_id)
+        if row is not None:
+            return False, dict(row)
+        await _restore_or_create_player(conn, user_id)
+    return False, {c: DEFAULT_PLAYER[c] for c in _SHOP_COLUMNS}
+
 
+async def buy_buff(user_id: str, buff_type: str, currency: str, cost: int, charges: int | None = None,
+                   duration: timedelta | None = None, channel_id: str | None = None) -> dict:
+    """Debit cost from currency and stack the buff (see add_buff) in one transaction.
 
-async def cleanup_expired_buffs():
-    """Delete expired time-based buffs."""
+    The debit only applies while the balance covers it, so concurrent buys
+    can't overdraw. Returns {"purchased": bool, "player": balances and
+    upgrade tiers afterwards} plus "slot" (the stacked buff) when purchased.
+    """
+    if currency not in _CURRENCY_COLUMNS:
+        raise ValueError(f"Unknown currency: {currency}")
     async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM player_buffs WHERE expires_at IS NOT NULL AND expires_at <= NOW()"
+        async with conn.transaction():
+            charged, state = await _charge(conn, user_id, f"{currency} = {currency} - $2", f"{currency} >= $2", cost)
+            if not charged:
+                return {"purchased": False, "player": state}
+            row = await conn.fetchrow(_STACK_BUFF_SQL, user_id, buff_type, charges, duration, channel_id)
+    invalidate_player(user_id)
+    return {"purchased": True, "player": state, "slot": _cache_stacked_buff(user_id, row)}
+
+
+async def buy_upgrade(user_id: str, upgrade_key: str, tier_costs: list[int]) -> dict:
+    """Buy the next tier of an upgrade for acorns; tier_costs[n] is the price of tier n + 1.
+
+    One conditional UPDATE checks the tier cap and the balance, debits and
+    bumps the tier. Returns {"purchased": bool, "player": balances and
+    upgrade tiers afterwards}.
+    """
+    if upgrade_key not in UPGRADE_COLUMNS:
+        raise ValueError(f"Unknown upgrade: {upgrade_key}")
+    async with pool.acquire() as conn:
+        charged, state = await _charge(
+            conn, user_id,
+            f"acorns = acorns - ($2::int[])[{upgrade_key} + 1], {upgrade_key} = {upgrade_key} + 1",
+            f"{upgrade_key} < cardinality($2::int[]) AND acorns >= ($2::int[])[{upgrade_key} + 1]",
+            list(tier_costs),
+        )
+    if charged:
+        invalidate_player(user_id)
+    return {"purchased": charged, "player": state}
+
+
+async def get_active_buffs(user_id: str) -> list[dict]:
+    """Get all active buffs for a player (charges > 0 or not yet expired).
+
+    Served from the per-user buff cache; only the first call for a user queries.
+    """
+    buffs = _cached_buffs(user_id)
+    if buffs is None:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT * FROM player_buffs
+                WHERE user_id = $1
+                  AND (charges_left IS NULL OR charges_left > 0)
+                  AND (expires_at IS NULL OR expires_at > NOW())
+                ORDER BY created_at
+                """,
+                user_id,
+            )
+        buffs = [dict(r) for r in rows]
+        _buff_cache.set(user_id, buffs)
+    return _active(buffs, datetime.now(timezone.utc))
+
+
+async def consume_buff_charge(buff_id: int):
+    """Decrement charges_left for a buff. An empty slot stays for the next purchase."""
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            UPDATE player_buffs SET charges_left = charges_left - 1
+            WHERE id = $1 AND charges_left > 0
+            RETURNING user_id, charges_left
+            """,
+            buff_id,
         )
+    if row:
+        _patch_cached_buff(row["user_id"], buff_id, charges_left=row["charges_left"])
+        _snapshot_cache.pop(row["user_id"])
+
+
+async def expire_buffs() -> list[dict]:
+    """Return the timed buffs whose expiry has passed since the last call.
+
+    Pops due entries off the expiry heap, so the cost follows the number of
+    buffs expiring, not the table size. Expired slots stay in place for the
+    next purchase; only auto-catch slots are written, to clear their channel
+    so each run is reported once (even across restarts).
+    """
+    now = datetime.now(timezone.utc)
+    due = []
+    while _buff_expiry and _buff_expiry[0][0] <= now:
+        due.append(heapq.heappop(_buff_expiry))
+    if not due:
+        return []
+    try:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                WITH due AS (
+                    SELECT * FROM player_buffs
+                    WHERE id = ANY($1::int[]) AND expires_at <= $2
+                    FOR UPDATE
+                ),
+                finished AS (
+                    UPDATE player_buffs b SET channel_id = NULL
+                    FROM due WHERE b.id = due.id AND due.channel_id IS NOT NULL
+                )
+                SELECT * FROM due
+                """,
+                [bid for _, bid in due], now,
+            )
+    except Exception:
+        for entry in due:
+            heapq.heappush(_buff_expiry, entry)
+        raise
+    for row in rows:
+        if row["channel_id"] is not None:
+            _patch_cached_buff(row["user_id"], row["id"], channel_id=None)
+            _snapshot_cache.pop(row["user_id"])
+    return [dict(r) for r in rows]
 
 
 async def get_auto_catch_buffs() -> list[dict]:
@@ -235,34 +1269,126 @@ async def get_auto_catch_buffs() -> list[dict]:
 async def update_buff_last_triggered(buff_id: int):
     """Update the last_triggered timestamp for an auto-catch buff."""
     async with pool.acquire() as conn:
-        await conn.execute(
-            "UPDATE player_buffs SET last_triggered = NOW() WHERE id = $1",
+        row = await conn.fetchrow(
+            "UPDATE player_buffs SET last_triggered = NOW() WHERE id = $1 RETURNING user_id, last_triggered",
             buff_id,
         )
+    if row:
+        _patch_cached_buff(row["user_id"], buff_id, last_triggered=row["last_triggered"])
 
 
 async def delete_buff(buff_id: int):
     """Delete a buff by id."""
     async with pool.acquire() as conn:
-        await conn.execute("DELETE FROM player_buffs WHERE id = $1", buff_id)
+        row = await conn.fetchrow("DELETE FROM player_buffs WHERE id = $1 RETURNING id, user_id", buff_id)
+    if row:
+        _forget_cached_buffs([row])
+
 
+_REFER_SQL = """
+            WITH referred AS (
+                SELECT user_id, total_catches FROM players WHERE user_id = $1 FOR UPDATE
+            ),
+            referrer AS (
+                SELECT user_id FROM players
+                WHERE user_id = $2 AND (total_catches > 0 OR acorns > 0)
+                FOR UPDATE
+            ),
+            previous AS (
+                SELECT 1 FROM referrals WHERE referred_id = $1
+            ),
+            inserted AS (
+                INSERT INTO referrals (referrer_id, referred_id)
+                SELECT referrer.user_id, referred.user_id FROM referred, referrer
+                WHERE referred.total_catches <= $3 AND NOT EXISTS (SELECT 1 FROM previous)
+                ON CONFLICT (referred_id) DO NOTHING
+                RETURNING referrer_id
+            ),
+            credited AS (
+                UPDATE players p SET
+                    acorns = p.acorns + CASE WHEN p.user_id = $1 THEN $4 ELSE $5 END,
+                    referral_count = p.referral_count + (p.user_id = $2)::int,
+                    last_active_at = NOW()
+                FROM inserted
+                WHERE p.user_id IN ($1, $2)
+            )
+            SELECT (SELECT total_catches FROM referred) AS total_catches,
+                   EXISTS (SELECT 1 FROM previous) AS previously_referred,
+                   EXISTS (SELECT 1 FROM referrer) AS referrer_playing,
+                   EXISTS (SELECT 1 FROM players_archive WHERE user_id = $2) AS referrer_archived,
+                   EXISTS (SELECT 1 FROM inserted) AS referred
+"""
 
-async def add_referral(referrer_id: str, referred_id: str):
-    """Record a referral. referred_id is UNIQUE so one referral per new player."""
+
+async def refer_player(referrer_id: str, referred_id: str, max_catches: int,
+                       referred_reward: int, referrer_reward: int) -> dict:
+    """Record that referrer_id invited referred_id and credit both players, atomically.
+
+    Validation, the referrals insert and both credits are one statement; a
+    missing or archived player costs one restore and a retry. Returns
+    {"outcome": ReferralOutcome, "total_catches": int | None} with the
+    referred player's catches (None for a self-referral). A repeated request loses the race on the
+    UNIQUE referred_id and reports ALREADY_REFERRED instead of raising.
+    """
+    if referrer_id == referred_id:
+        return {"outcome": ReferralOutcome.SELF_REFERRAL, "total_catches": None}
     async with pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO referrals (referrer_id, referred_id) VALUES ($1, $2)",
-            referrer_id, referred_id,
-        )
+        async with conn.transaction():
+            for _ in range(3):
+                row = await conn.fetchrow(
+                    _REFER_SQL, referred_id, referrer_id, max_catches, referred_reward, referrer_reward,
+                )
+                if row["total_catches"] is None:
+                    await _restore_or_create_player(conn, referred_id)
+                elif not row["referrer_playing"] and row["referrer_archived"]:
+                    await _restore_or_create_player(conn, referrer_id)
+                else:
+                    break
+    catches = row["total_catches"] or 0
+    if catches > max_catches:
+        outcome = ReferralOutcome.TOO_MANY_CATCHES
+    elif row["previously_referred"]:
+        outcome = ReferralOutcome.ALREADY_REFERRED
+    elif not row["referrer_playing"]:
+        outcome = ReferralOutcome.UNKNOWN_REFERRER
+    elif not row["referred"]:
+        outcome = ReferralOutcome.ALREADY_REFERRED
+    else:
+        outcome = ReferralOutcome.OK
+        invalidate_player(referred_id)
+        invalidate_player(referrer_id)
+    return {"outcome": outcome, "total_catches": catches}
 
 
 async def get_referral_count(user_id: str) -> int:
-    """Count how many people a user has referred."""
+    """How many people a user has referred (archived players included)."""
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT COUNT(*) AS cnt FROM referrals WHERE referrer_id = $1", user_id,
+        return await conn.fetchval(
+            """
+            SELECT COALESCE(
+                (SELECT referral_count FROM players WHERE user_id = $1),
+                (SELECT (data->>'referral_count')::int FROM players_archive WHERE user_id = $1),
+                0
+            )
+            """,
+            user_id,
         )
-        return row["cnt"]
+
+
+async def get_top_referrers(limit: int = 10) -> list[dict]:
+    """Players who referred the most others, read off the partial referral_count index."""
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT user_id, referral_count
+            FROM players
+            WHERE referral_count > 0
+            ORDER BY referral_count DESC
+            LIMIT $1
+            """,
+            limit,
+        )
+    return [dict(r) for r in rows]
 
 
 async def get_referred_by(user_id: str) -> str | None:
@@ -274,6 +1400,80 @@ async def get_referred_by(user_id: str) -> str | None:
         return row["referrer_id"] if row else None
 
 
+# ─── CATCH EVENTS ────────────────────────────────────────────────────────────
+
+# Days whose catch_events partition is known to exist
+_catch_event_partitions: set = set()
+
+
+async def _ensure_catch_event_partitions(conn: asyncpg.Connection, days: set):
+    for day in sorted(days - _catch_event_partitions):
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS catch_events_{day:%Y%m%d} PARTITION OF catch_events
+            FOR VALUES FROM ('{day.isoformat()} 00:00+00') TO ('{(day + timedelta(days=1)).isoformat()} 00:00+00')
+            """
+        )
+        _catch_event_partitions.add(day)
+
+
+async def insert_catch_events(records: list[tuple]):
+    """COPY catch event records (CATCH_EVENT_COLUMNS order) into catch_events."""
+    async with pool.acquire() as conn:
+        # Create today's and tomorrow's partitions ahead of the first event in them
+        today = datetime.now(timezone.utc).date()
+        days = {record[0].date() for record in records} | {today, today + timedelta(days=1)}
+        await _ensure_catch_event_partitions(conn, days)
+        await conn.copy_records_to_table("catch_events", records=records, columns=CATCH_EVENT_COLUMNS)
+
+
+# ─── ECONOMY ROLLUPS ─────────────────────────────────────────────────────────
+
+async def add_economy_rollups(hours: list, kinds: list[str], sources: list[str], amounts: list[int]):
+    """Add per-hour counter deltas to both the hourly and the daily rollup rows."""
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO economy_rollups (granularity, bucket, kind, source, amount)
+            SELECT g.granularity,
+                   date_trunc(g.granularity, d.hour AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                   d.kind, d.source, SUM(d.amount)
+            FROM unnest($1::timestamptz[], $2::text[], $3::text[], $4::bigint[])
+                 AS d(hour, kind, source, amount)
+            CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (granularity, bucket, kind, source)
+            DO UPDATE SET amount = economy_rollups.amount + EXCLUDED.amount
+            """,
+            hours, kinds, sources, amounts,
+        )
+
+
+async def get_economy_rollups(granularity: str, buckets: int) -> list[dict]:
+    """Rollup rows for the last `buckets` hours or days, oldest first.
+
+    Returns [{"bucket": datetime, "kind": str, "source": str, "amount": int}].
+    """
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    since = datetime.now(timezone.utc) - step * buckets
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT bucket, kind, source, amount FROM economy_rollups
+            WHERE granularity = $1 AND bucket > $2
+            ORDER BY bucket, kind, source
+            """,
+            granularity, since,
+        )
+    return [dict(r) for r in rows]
+
+
+async def ping():
+    """One round trip to the server, bypassing every cache (the breaker's half-open probe)."""
+    async with pool.acquire() as conn:
+        await conn.fetchval("SELECT 1")
+
+
 async def close_db():
     """Close the connection pool."""
     global pool
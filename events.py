@@ -0,0 +1,115 @@
+"""
+Append-only catch event log and economy rollups for the Squirrel Catcher bot.
+Catches are buffered in memory and handed to the storage backend in
+batches by a periodic flush (COPY into the day-partitioned catch_events
+table on Postgres), so logging a catch never waits on the database. Economy counters are summed in memory the
+same way and upserted into hourly and daily rollup rows.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from storage import Storage
+
+# Upper bound on events held while the database is unreachable; oldest are dropped first
+MAX_BUFFERED_EVENTS = 100_000
+
+
+class CatchEventLog:
+    """In-memory buffer of catch events, drained to storage by flush().
+
+    record() is synchronous and O(1). Events still buffered when the
+    process exits are lost, which bounds the loss to one flush interval.
+    """
+
+    def __init__(self):
+        self._buffer: list[tuple] = []
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, user_id: str, outcome: str, catch_name: str, rarity: str | None,
+               acorns: int, xp: int, buffs: list[str], source: str, rng_seed: int,
+               silver_acorns: int = 0):
+        """Queue one catch. outcome is "squirrel" or "junk"; source is "manual" or a hunter's buff_type."""
+        self._buffer.append((
+            datetime.now(timezone.utc), user_id, outcome, catch_name, rarity,
+            acorns, silver_acorns, xp, buffs, source, rng_seed,
+        ))
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def flush(self, store: Storage) -> int:
+        """Write every buffered event to store. Returns the number written.
+
+        On failure the batch is put back (up to MAX_BUFFERED_EVENTS) to be
+        retried on the next flush.
+        """
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            await store.insert_catch_events(batch)
+        except Exception as e:
+            pending = batch + self._buffer
+            overflow = len(pending) - MAX_BUFFERED_EVENTS
+            if overflow > 0:
+                self.dropped += overflow
+                pending = pending[overflow:]
+            self._buffer = pending
+            print(f"Catch event flush failed ({len(batch)} events requeued): {e}")
+            return 0
+        self.written += len(batch)
+        return len(batch)
+
+
+# Rollup kinds and the sources recorded under each (amounts are in base acorns)
+ECONOMY_SOURCES = {
+    "minted": ("catch", "daily", "referral", "sell"),
+    "burned": ("shop", "upgrade"),
+}
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+
+class EconomyRollups:
+    """Per-hour counters of acorns minted/burned by source and catches by rarity.
+
+    add() is O(1): it bumps an in-memory counter for the current UTC hour.
+    flush() folds the pending counters into both the hourly and the daily
+    rollup rows with one upsert, so dashboards read a handful of rows
+    however large the player base grows.
+    """
+
+    def __init__(self):
+        self._pending: defaultdict[tuple, int] = defaultdict(int)
+
+    def add(self, kind: str, source: str, amount: int = 1):
+        """Count amount under (kind, source), e.g. ("minted", "daily") or ("catches", "Rare")."""
+        if amount:
+            hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            self._pending[(hour, kind, source)] += amount
+
+    def mint(self, source: str, amount: int):
+        self.add("minted", source, amount)
+
+    def burn(self, source: str, amount: int):
+        self.add("burned", source, amount)
+
+    async def flush(self, store: Storage) -> int:
+        """Add pending counters to the rollups in store. Returns the number of counters written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, defaultdict(int)
+        hours, kinds, sources, amounts = zip(*((h, k, s, n) for (h, k, s), n in pending.items()))
+        try:
+            await store.add_economy_rollups(list(hours), list(kinds), list(sources), list(amounts))
+        except Exception as e:
+            for key, amount in pending.items():
+                self._pending[key] += amount
+            print(f"Economy rollup flush failed ({len(pending)} counters requeued): {e}")
+            return 0
+        return len(pending)
+
+
+catch_log = CatchEventLog()
+economy = EconomyRollups()
@@ -0,0 +1,136 @@
+"""
+Streaming export of game state for analytics extracts and backups.
+Run with: python export.py [--format ndjson|csv] [--out exports] [table ...]
+
+Rows are streamed straight from Postgres to disk, so memory stays flat no
+matter how large the tables are: CSV goes through COPY, NDJSON through a
+server-side cursor. Tables default to players, players_archive (inactive
+players moved out of players), player_buffs and referrals.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXPORT_TABLES = ("players", "players_archive", "player_buffs", "referrals")
+CURSOR_PREFETCH = 5_000
+PROGRESS_EVERY = 1.0  # seconds between progress lines
+
+
+class _Progress:
+    """Prints a throttled progress line for one table."""
+
+    def __init__(self, table: str, estimate: int):
+        self.table = table
+        self.estimate = estimate
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def update(self, rows: int, nbytes: int):
+        self.rows += rows
+        self.bytes += nbytes
+        now = time.monotonic()
+        if now - self._last >= PROGRESS_EVERY:
+            self._last = now
+            self._print("\r")
+
+    def done(self):
+        self._print("\r")
+        print()
+
+    def _print(self, prefix: str):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        if self.rows:
+            count = f"{self.rows:,}"
+            if self.estimate > 0:
+                count += f"/~{self.estimate:,} rows ({min(self.rows / self.estimate, 1):.0%})"
+            else:
+                count += " rows"
+        else:
+            count = f"~{self.estimate:,} rows"
+        sys.stdout.write(
+            f"{prefix}{self.table}: {count}, {self.bytes / 1_048_576:.1f} MB "
+            f"in {elapsed:.1f}s"
+        )
+        sys.stdout.flush()
+
+
+async def _estimate_rows(conn: asyncpg.Connection, table: str) -> int:
+    """Planner row estimate for a table (cheap; exact counts would scan it)."""
+    estimate = await conn.fetchval(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)", table,
+    )
+    return max(estimate or 0, 0)
+
+
+async def export_csv(conn: asyncpg.Connection, table: str, path: str, progress: _Progress):
+    """Stream a table to CSV (with header) through COPY TO STDOUT."""
+    with open(path, "wb") as f:
+        async def write(chunk: bytes):
+            f.write(chunk)
+            progress.update(0, len(chunk))
+
+        await conn.copy_from_table(table, output=write, format="csv", header=True)
+
+
+async def export_ndjson(conn: asyncpg.Connection, table: str, path: str, progress: _Progress):
+    """Stream a table to newline-delimited JSON through a server-side cursor."""
+    query = f"SELECT row_to_json(t)::text FROM {table} t"
+    with open(path, "w", encoding="utf-8") as f:
+        # Cursors only live inside a transaction; REPEATABLE READ gives a consistent snapshot
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            async for (line,) in conn.cursor(query, prefetch=CURSOR_PREFETCH):
+                f.write(line)
+                f.write("\n")
+                progress.update(1, len(line) + 1)
+
+
+EXPORTERS = {
+    "csv": export_csv,
+    "ndjson": export_ndjson,
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Stream game tables to NDJSON or CSV files.")
+    parser.add_argument("tables", nargs="*", default=list(EXPORT_TABLES),
+                        help=f"tables to export (default: {' '.join(EXPORT_TABLES)})")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="ndjson")
+    parser.add_argument("--out", default="exports", help="output directory")
+    args = parser.parse_args()
+
+    unknown = [t for t in args.tables if t not in EXPORT_TABLES]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not set in .env")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    exporter = EXPORTERS[args.format]
+    conn = await asyncpg.connect(database_url)
+    try:
+        for table in args.tables:
+            path = os.path.join(args.out, f"{table}.{args.format}")
+            progress = _Progress(table, await _estimate_rows(conn, table))
+            await exporter(conn, table, path, progress)
+            progress.done()
+            print(f"  → {path}")
+    finally:
+        await conn.close()
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,303 @@
+"""
+Generate a large synthetic population for load testing and benchmarks.
+Run with: python generate_dataset.py --players 1000000 [--workers 4] [--seed 1]
+
+Players get catch histories drawn from the SQUIRRELS weights, balances,
+levels and upgrades consistent with those catches, active buffs of every
+SHOP_ITEMS type, guild memberships and a heavy-tailed referral graph.
+Rows are generated in worker processes and bulk-loaded with COPY over
+several connections at once.
+
+Generated user_ids start at ID_BASE so they never collide with real
+Discord ids; --reset deletes a previous generated population first.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+import db
+from catalog import load_catalog, xp_for_level
+from storage import NET_WORTH_RATES
+
+load_dotenv()
+
+MIN_PLAYERS = 10_000
+MAX_PLAYERS = 10_000_000
+# 19-digit ids far beyond any real Discord snowflake
+ID_BASE = 9_000_000_000_000_000_000
+GUILD_ID_BASE = 8_000_000_000_000_000_000
+
+PLAYER_COLUMNS = (
+    "user_id", "acorns", "silver_acorns", "emerald_acorns", "golden_acorns",
+    "total_catches", "junk_catches", "level", "xp", "last_daily", "catches",
+    "trap_tier", "junk_resist_tier", "acorn_magnet_tier", "last_active_at",
+)
+BUFF_COLUMNS = ("user_id", "buff_type", "charges_left", "expires_at", "channel_id", "last_triggered")
+REFERRAL_COLUMNS = ("referrer_id", "referred_id")
+GUILD_COLUMNS = ("guild_id", "user_id")
+
+CATALOG = load_catalog()
+SQUIRRELS, JUNK_CATCHES = CATALOG.squirrels, CATALOG.junk
+SHOP_ITEMS, UPGRADE_TIERS = CATALOG.shop_items, CATALOG.upgrade_tiers
+
+# Catch draws: exact sampling for small histories, a normal approximation above this
+EXACT_DRAW_LIMIT = 500
+SPECIES_NAMES = [sq[0] for sq in SQUIRRELS]
+SPECIES_WEIGHTS = [sq[5] for sq in SQUIRRELS]
+_total_weight = sum(SPECIES_WEIGHTS)
+SPECIES_PROBS = [w / _total_weight for w in SPECIES_WEIGHTS]
+AVG_ACORNS = [(sq[3] + sq[4]) / 2 for sq in SQUIRRELS]
+XP_BY_RARITY = {"Common": 5, "Uncommon": 10, "Rare": 20, "Epic": 40, "Legendary": 80, "Mythic": 200}
+SPECIES_XP = [XP_BY_RARITY.get(sq[2], 5) for sq in SQUIRRELS]
+AVG_JUNK_ACORNS = sum(j[2] for j in JUNK_CATCHES) / len(JUNK_CATCHES)
+SPECIES_INDEX = {name: k for k, name in enumerate(SPECIES_NAMES)}
+
+# Everything buyable except permanent upgrades lands in player_buffs
+BUFF_ITEMS = [key for key, item in SHOP_ITEMS.items() if item["type"] != "upgrade"]
+
+
+def _draw_catches(rng: random.Random, n: int) -> dict[str, int]:
+    """Split n squirrel catches across species according to their weights."""
+    if n <= EXACT_DRAW_LIMIT:
+        return dict(Counter(rng.choices(SPECIES_NAMES, weights=SPECIES_WEIGHTS, k=n)))
+    counts = {}
+    for name, p in zip(SPECIES_NAMES, SPECIES_PROBS):
+        mean = n * p
+        if mean < 30:
+            # Rare species: Poisson via exponential gaps keeps small counts realistic
+            count, t = 0, rng.expovariate(1.0)
+            while t < mean:
+                count += 1
+                t += rng.expovariate(1.0)
+        else:
+            count = max(0, round(rng.gauss(mean, math.sqrt(mean * (1 - p)))))
+        if count:
+            counts[name] = count
+    return counts
+
+
+def _level_for_xp(xp: int) -> tuple[int, int]:
+    """Replay level-ups for a lifetime XP total, returning (level, leftover xp)."""
+    level = 1
+    while xp >= xp_for_level(level):
+        xp -= xp_for_level(level)
+        level += 1
+    return level, xp
+
+
+def _upgrade_tier(rng: random.Random, key: str, earned: float) -> int:
+    """Highest upgrade tier a player plausibly bought with their lifetime earnings."""
+    tier = 0
+    spent = 0
+    for t in UPGRADE_TIERS[key]["tiers"]:
+        spent += t["cost"]
+        if earned < spent * rng.uniform(1.5, 6):
+            break
+        tier += 1
+    return tier
+
+
+def _split_balance(rng: random.Random, acorns: int) -> tuple[int, int, int, int]:
+    """Spread a balance over the currency tiers, as if some of it was exchanged up."""
+    balances = []
+    for currency in ("golden_acorns", "emerald_acorns", "silver_acorns"):
+        rate = NET_WORTH_RATES[currency]
+        units = int(acorns // rate * rng.random() ** 2)
+        acorns -= units * rate
+        balances.append(units)
+    golden, emerald, silver = balances
+    return acorns, silver, emerald, golden
+
+
+def _make_buff(rng: random.Random, user_id: str, key: str, now: datetime) -> tuple:
+    item = SHOP_ITEMS[key]
+    if item["type"] == "consumable":
+        return (user_id, key, rng.randint(1, item["charges"]), None, None, None)
+    if item["type"] == "timed":
+        expires = now + timedelta(minutes=rng.uniform(0.5, item["duration_minutes"]))
+        return (user_id, key, None, expires, None, None)
+    # auto_catch hunters fire into a channel on an interval
+    expires = now + timedelta(hours=rng.uniform(0.1, item["duration_hours"]))
+    last = now - timedelta(minutes=rng.uniform(0, item["interval_minutes"]))
+    channel = str(GUILD_ID_BASE + 1_000_000 + rng.randrange(10_000))
+    return (user_id, key, None, expires, channel, last)
+
+
+def generate_batch(start: int, count: int, seed: int, buff_rate: float,
+                   referral_rate: float, guilds: int) -> dict[str, list[tuple]]:
+    """Generate rows for players start..start+count-1 (runs in a worker process).
+
+    Seeding per batch makes the output deterministic for a given seed,
+    whatever the number of workers.
+    """
+    rng = random.Random(seed * 1_000_003 + start)
+    now = datetime.now(timezone.utc)
+    players, buffs, referrals, members = [], [], [], []
+
+    for i in range(start, start + count):
+        user_id = str(ID_BASE + i)
+
+        # Activity is heavy-tailed: most players try a few catches, a few grind thousands
+        total = min(int(rng.paretovariate(1.1) * 15) - 10, 200_000)
+        total = max(total, 0)
+        junk_share = rng.uniform(0.05, 0.3)
+        junk = int(total * junk_share)
+        catches = _draw_catches(rng, total - junk)
+
+        earned = junk * AVG_JUNK_ACORNS + sum(AVG_ACORNS[SPECIES_INDEX[n]] * c for n, c in catches.items())
+        lifetime_xp = junk + sum(SPECIES_XP[SPECIES_INDEX[n]] * c for n, c in catches.items())
+        level, xp = _level_for_xp(lifetime_xp)
+        tiers = [_upgrade_tier(rng, key, earned) for key in ("trap_tier", "junk_resist_tier", "acorn_magnet_tier")]
+        acorns, silver, emerald, golden = _split_balance(rng, int(earned * rng.uniform(0.05, 0.7)))
+
+        last_active = now - timedelta(days=rng.expovariate(1 / 45))
+        last_daily = last_active - timedelta(hours=rng.uniform(0, 48)) if rng.random() < 0.6 else None
+
+        players.append((
+            user_id, acorns, silver, emerald, golden, total, junk, level, xp,
+            last_daily, json.dumps(catches), *tiers, last_active,
+        ))
+
+        if rng.random() < buff_rate:
+            # Cycle through item types so every kind of buff is represented
+            keys = {
+                BUFF_ITEMS[(i + k) % len(BUFF_ITEMS)] if rng.random() < 0.5 else rng.choice(BUFF_ITEMS)
+                for k in range(rng.choice((1, 1, 1, 2, 3)))
+            }
+            buffs.extend(_make_buff(rng, user_id, key, now) for key in sorted(keys))
+
+        if i > 0 and rng.random() < referral_rate:
+            # Skew towards earlier (older) players so a few referrers bring in many
+            referrer = int(i * rng.random() ** 3)
+            referrals.append((str(ID_BASE + referrer), user_id))
+
+        for _ in range(rng.choice((1, 1, 1, 2, 3))):
+            # Zipf-ish guild sizes: a few huge servers and a long tail of small ones
+            guild = min(int(rng.paretovariate(1.0)) - 1, guilds - 1)
+            members.append((str(GUILD_ID_BASE + guild), user_id))
+
+    return {
+        "players": players,
+        "player_buffs": buffs,
+        "referrals": referrals,
+        "guild_players": list(dict.fromkeys(members)),
+    }
+
+
+# Per-row counter trigger on players (see db._create_net_worth_buckets)
+BUCKET_TRIGGER = "players_net_worth_count"
+
+TABLE_COLUMNS = {
+    "players": PLAYER_COLUMNS,
+    "player_buffs": BUFF_COLUMNS,
+    "referrals": REFERRAL_COLUMNS,
+    "guild_players": GUILD_COLUMNS,
+}
+
+
+async def _reset(conn):
+    """Delete a previously generated population (user_ids from ID_BASE up)."""
+    generated = f"length({{column}}) = {len(str(ID_BASE))} AND {{column}} >= '{ID_BASE}'"
+    async with conn.transaction():
+        await conn.execute(f"DELETE FROM referrals WHERE {generated.format(column='referred_id')}")
+        for table in ("player_buffs", "guild_players", "players"):
+            await conn.execute(f"DELETE FROM {table} WHERE {generated.format(column='user_id')}")
+
+
+async def _load_population(args) -> tuple[Counter, float]:
+    """Optionally reset, then COPY the generated population in parallel batches."""
+    if args.reset:
+        async with db.pool.acquire() as conn:
+            await _reset(conn)
+        print("Removed previous generated population.")
+
+    batches = [(start, min(args.batch, args.players - start))
+               for start in range(0, args.players, args.batch)]
+    loop = asyncio.get_running_loop()
+    # Bounds batches in flight, so generated rows never pile up waiting for COPY
+    slots = asyncio.Semaphore(args.workers)
+    totals = Counter()
+    started = time.monotonic()
+
+    async def load(executor, start, count):
+        async with slots:
+            rows = await loop.run_in_executor(
+                executor, generate_batch, start, count, args.seed,
+                args.buff_rate, args.referral_rate, args.guilds,
+            )
+            async with db.pool.acquire() as conn:
+                async with conn.transaction():
+                    for table, columns in TABLE_COLUMNS.items():
+                        if rows[table]:
+                            await conn.copy_records_to_table(table, records=rows[table], columns=columns)
+        for table, table_rows in rows.items():
+            totals[table] += len(table_rows)
+        elapsed = time.monotonic() - started
+        print(f"\r{totals['players']:,}/{args.players:,} players "
+              f"({totals['players'] / elapsed:,.0f}/s)", end="", flush=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        await asyncio.gather(*(load(executor, start, count) for start, count in batches))
+    print()
+    return totals, started
+
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic player population.")
+    parser.add_argument("--players", type=int, default=100_000,
+                        help=f"population size ({MIN_PLAYERS:,}-{MAX_PLAYERS:,})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="generator processes and concurrent COPY connections")
+    parser.add_argument("--batch", type=int, default=20_000, help="players per COPY batch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--buff-rate", type=float, default=0.15, help="share of players with active buffs")
+    parser.add_argument("--referral-rate", type=float, default=0.2, help="share of players who were referred")
+    parser.add_argument("--guilds", type=int, default=5_000, help="number of distinct guilds")
+    parser.add_argument("--reset", action="store_true", help="delete a previously generated population first")
+    args = parser.parse_args()
+
+    if not MIN_PLAYERS <= args.players <= MAX_PLAYERS:
+        parser.error(f"--players must be between {MIN_PLAYERS:,} and {MAX_PLAYERS:,}")
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not set in .env")
+        return
+
+    await db.init_db(database_url)
+    # Parallel COPY batches would all contend (and deadlock) on the same
+    # net-worth bucket counters; they're recounted once the load is done
+    async with db.pool.acquire() as conn:
+        await conn.execute(f"ALTER TABLE players DISABLE TRIGGER {BUCKET_TRIGGER}")
+    try:
+        totals, started = await _load_population(args)
+    finally:
+        async with db.pool.acquire() as conn:
+            await conn.execute(f"ALTER TABLE players ENABLE TRIGGER {BUCKET_TRIGGER}")
+
+    print("Rebuilding species, referral and net-worth counters and statistics...")
+    await db.rebuild_species_stats()
+    await db.rebuild_referral_counts()
+    await db.rebuild_net_worth_buckets()
+    async with db.pool.acquire() as conn:
+        for table in TABLE_COLUMNS:
+            await conn.execute(f"ANALYZE {table}")
+    await db.close_db()
+
+    print(f"\nDone in {time.monotonic() - started:.0f}s: "
+          + ", ".join(f"{totals[t]:,} {t}" for t in TABLE_COLUMNS))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Build step that produces small, recompressed variants of the bot's images.
+Run with: python optimize_assets.py [--webp] [--size 320] [--quality 80]
+
+Requires Pillow (pip install Pillow). Writes the variants to assets/optimized/
+together with a manifest.json that bot.py and server.py read at startup.
+Without a manifest both fall back to the original images.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+ASSET_DIR = "assets"
+OUTPUT_DIR = os.path.join(ASSET_DIR, "optimized")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
+# Landing-page images outside assets/, with the longest edge they are shown at
+EXTRA_IMAGES = {
+    "avatar.jpg": 128,
+    "cover.jpg": 1344,
+}
+
+
+def optimize_image(src: str, dest_stem: str, max_size: int, quality: int, webp: bool) -> dict:
+    """Resize src to fit max_size and write a JPEG (and optionally WebP) variant."""
+    from PIL import Image
+
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        entry = {"width": img.width, "height": img.height}
+
+        jpeg_path = f"{dest_stem}.jpg"
+        img.save(jpeg_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        entry["jpeg"] = jpeg_path.replace(os.sep, "/")
+
+        if webp:
+            webp_path = f"{dest_stem}.webp"
+            img.save(webp_path, "WEBP", quality=quality, method=6)
+            entry["webp"] = webp_path.replace(os.sep, "/")
+    return entry
+
+
+def build(size: int, quality: int, webp: bool) -> dict:
+    """Optimize every species image plus the landing-page images and return the manifest."""
+    from catalog import load_catalog
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = {"version": 1, "files": {}, "species": {}}
+
+    catalog = load_catalog()
+    sources = {f"{ASSET_DIR}/{sq[6]}": size for sq in catalog.squirrels}
+    sources.update(EXTRA_IMAGES)
+
+    total_before = total_after = 0
+    for src, max_size in sources.items():
+        if not os.path.exists(src):
+            print(f"⚠️ Skipping missing image: {src}")
+            continue
+        stem = os.path.splitext(os.path.basename(src))[0]
+        entry = optimize_image(src, os.path.join(OUTPUT_DIR, stem), max_size, quality, webp)
+        before = os.path.getsize(src)
+        after = os.path.getsize(entry["jpeg"])
+        entry["bytes"] = after
+        manifest["files"][src] = entry
+        total_before += before
+        total_after += after
+        print(f"{src}: {before // 1024} KB → {after // 1024} KB")
+
+    for sq in catalog.squirrels:
+        src = f"{ASSET_DIR}/{sq[6]}"
+        if src in manifest["files"]:
+            manifest["species"][sq[0]] = src
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    if total_after:
+        print(f"\nDone! {total_before // 1024} KB → {total_after // 1024} KB "
+              f"({total_before / total_after:.1f}x smaller). Manifest: {MANIFEST_PATH}")
+    return manifest
+
+
+def load_manifest() -> dict:
+    """Load the optimized-asset manifest, or an empty one if the build step hasn't run."""
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 1, "files": {}, "species": {}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build optimized image variants for the bot and landing page.")
+    parser.add_argument("--size", type=int, default=320, help="longest edge of species thumbnails (px)")
+    parser.add_argument("--quality", type=int, default=80, help="JPEG/WebP quality (1-95)")
+    parser.add_argument("--webp", action="store_true", help="also write WebP variants")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("PIL") is None:
+        print("ERROR: Pillow is required. Install it with: pip install Pillow")
+        sys.exit(1)
+
+    build(args.size, args.quality, args.webp)
+
+
+if __name__ == "__main__":
+    main()
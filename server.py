@@ -1,17 +1,94 @@
 """Simple web server to serve the landing page."""
 
+import functools
+import hmac
 import os
 from aiohttp import web
+from dotenv import load_dotenv
+
+from optimize_assets import load_manifest
+from storage import open_storage
+
+load_dotenv()
 
 PORT = int(os.getenv("PORT", 8080))
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Bearer token for /api/economy; the endpoint is disabled when unset
+ECONOMY_API_TOKEN = os.getenv("ECONOMY_API_TOKEN")
+# Rollups live in the bot process's storage. Postgres is shared; a SQLite file
+# is read directly on each request (a loaded copy would freeze at startup);
+# memory:// has nothing this process can see, so the endpoint stays off.
+_scheme = (DATABASE_URL or "").split(":", 1)[0].lower()
+db = None
+if _scheme == "sqlite":
+    from sqlite_storage import read_economy_rollups
+    get_economy_rollups = functools.partial(read_economy_rollups, DATABASE_URL)
+elif DATABASE_URL and _scheme != "memory":
+    db = open_storage(DATABASE_URL)
+    get_economy_rollups = db.get_economy_rollups
+else:
+    get_economy_rollups = None
+
+# Original image path -> optimized variants, from `python optimize_assets.py`
+OPTIMIZED = load_manifest()["files"]
 
 
 async def index(_request):
     return web.FileResponse("index.html")
 
 
-app = web.Application()
+async def economy(request):
+    """JSON economy rollups: ?granularity=hour|day&buckets=N (owner token required)."""
+    if not ECONOMY_API_TOKEN or get_economy_rollups is None:
+        raise web.HTTPNotFound()
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied, ECONOMY_API_TOKEN):
+        raise web.HTTPUnauthorized()
+    granularity = request.query.get("granularity", "hour")
+    if granularity not in ("hour", "day"):
+        raise web.HTTPBadRequest(text="granularity must be hour or day")
+    try:
+        buckets = min(max(int(request.query.get("buckets", 24 if granularity == "hour" else 30)), 1), 24 * 31)
+    except ValueError:
+        raise web.HTTPBadRequest(text="buckets must be an integer")
+    rows = await get_economy_rollups(granularity, buckets)
+    series = {}
+    for row in rows:
+        bucket = series.setdefault(row["bucket"].isoformat(), {})
+        bucket.setdefault(row["kind"], {})[row["source"]] = row["amount"]
+    return web.json_response({"granularity": granularity, "buckets": series})
+
+
+async def connect_db(_app):
+    if db is not None and ECONOMY_API_TOKEN:
+        await db.init_db(DATABASE_URL)
+
+
+async def disconnect_db(_app):
+    if db is not None:
+        await db.close_db()
+
+
+@web.middleware
+async def optimized_images(request, handler):
+    """Serve the optimized variant of an image when one exists, preferring WebP if accepted."""
+    entry = OPTIMIZED.get(request.path.lstrip("/"))
+    if entry is None:
+        return await handler(request)
+    if "webp" in entry and "image/webp" in request.headers.get("Accept", ""):
+        response = web.FileResponse(entry["webp"])
+    else:
+        response = web.FileResponse(entry["jpeg"])
+    response.headers["Vary"] = "Accept"
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return response
+
+
+app = web.Application(middlewares=[optimized_images])
 app.router.add_get("/", index)
+app.router.add_get("/api/economy", economy)
+app.on_startup.append(connect_db)
+app.on_cleanup.append(disconnect_db)
 app.router.add_static("/", ".", show_index=False)
 
 if __name__ == "__main__":
@@ -0,0 +1,290 @@
+"""
+SQLite storage backend for small self-hosted deployments.
+Requires aiosqlite (pip install aiosqlite). Enable with DATABASE_URL=sqlite:///squirrels.db
+
+State is loaded into a MemoryStorage at startup and served from memory;
+every change is written through to the SQLite file before the call returns.
+"""
+
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from storage import CATCH_EVENT_COLUMNS, MemoryStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    last_active_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players_archive (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    last_active_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_buffs (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    buff_type TEXT NOT NULL,
+    charges_left INTEGER,
+    expires_at TEXT,
+    channel_id TEXT,
+    last_triggered TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS referrals (
+    referred_id TEXT PRIMARY KEY,
+    referrer_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guild_players (
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS species_stats (
+    species TEXT PRIMARY KEY,
+    caught INTEGER NOT NULL,
+    owners INTEGER NOT NULL,
+    last_seen TEXT,
+    discoverer TEXT,
+    discovered_at TEXT
+);
+CREATE TABLE IF NOT EXISTS catch_events (
+    created_at TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    catch_name TEXT NOT NULL,
+    rarity TEXT,
+    acorns INTEGER NOT NULL,
+    silver_acorns INTEGER NOT NULL,
+    xp INTEGER NOT NULL,
+    buffs TEXT NOT NULL,
+    source TEXT NOT NULL,
+    rng_seed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS economy_rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, kind, source)
+);
+"""
+
+
+def _ts(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _dt(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _sqlite_path(database_url: str) -> str:
+    path = database_url.split("://", 1)[1].lstrip("/") if "://" in database_url else database_url
+    if database_url.startswith("sqlite:////"):
+        path = "/" + path  # sqlite:////abs/path.db
+    return path
+
+
+async def read_economy_rollups(database_url: str, granularity: str, buckets: int) -> list[dict]:
+    """Rollup rows straight from the SQLite file, for processes other than the bot (server.py).
+
+    A SQLiteStorage only sees the file as it was when it loaded, so a
+    reader in another process queries the file itself. Same result shape
+    as Storage.get_economy_rollups.
+    """
+    import aiosqlite
+
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    since = datetime.now(timezone.utc) - step * buckets
+    async with aiosqlite.connect(f"file:{_sqlite_path(database_url)}?mode=ro", uri=True) as conn:
+        async with conn.execute(
+            "SELECT bucket, kind, source, amount FROM economy_rollups "
+            "WHERE granularity = ? AND bucket > ? ORDER BY bucket, kind, source",
+            (granularity, _ts(since)),
+        ) as cur:
+            return [{"bucket": _dt(bucket), "kind": kind, "source": source, "amount": amount}
+                    async for bucket, kind, source, amount in cur]
+
+
+class SQLiteStorage(MemoryStorage):
+    """MemoryStorage whose state lives in a SQLite file."""
+
+    def __init__(self):
+        super().__init__()
+        self.conn = None
+
+    async def init_db(self, database_url: str):
+        import aiosqlite
+
+        if self.conn is not None:
+            return  # already loaded; on_ready calls init_db again after every reconnect
+        self.conn = await aiosqlite.connect(_sqlite_path(database_url) or ":memory:")
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self.conn.executescript(SCHEMA)
+        await self._load()
+        # One slot per (user, buff type); _load folded any older duplicate rows together
+        await self.conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_player_buffs_slot ON player_buffs (user_id, buff_type)"
+        )
+
+    async def close_db(self):
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def ping(self):
+        async with self.conn.execute("SELECT 1") as cur:
+            await cur.fetchone()
+
+    async def _load(self):
+        async with self.conn.execute("SELECT user_id, data, last_active_at FROM players") as cur:
+            async for user_id, data, last_active in cur:
+                self.players[user_id] = json.loads(data)
+                self.last_active[user_id] = _dt(last_active)
+        async with self.conn.execute("SELECT user_id, data FROM players_archive") as cur:
+            async for user_id, data in cur:
+                self.archive[user_id] = json.loads(data)
+        duplicates, merged = [], set()
+        async with self.conn.execute(
+            "SELECT id, user_id, buff_type, charges_left, expires_at, channel_id, last_triggered, created_at "
+            "FROM player_buffs ORDER BY id"
+        ) as cur:
+            async for bid, user_id, bt, charges, expires, channel, triggered, created in cur:
+                self._next_buff_id = bid + 1
+                slot = self.user_buffs.get(user_id, {}).get(bt)
+                if slot is not None and slot["id"] != bid:
+                    # Files from before buff slots can hold several rows per (user, type)
+                    if charges is not None:
+                        slot["charges_left"] = (slot["charges_left"] or 0) + charges
+                    if expires is not None:
+                        slot["expires_at"] = max(filter(None, (slot["expires_at"], _dt(expires))))
+                    duplicates.append(bid)
+                    merged.add(slot["id"])
+                    continue
+                self._index_buff({
+                    "id": bid, "user_id": user_id, "buff_type": bt, "charges_left": charges,
+                    "expires_at": _dt(expires), "channel_id": channel,
+                    "last_triggered": _dt(triggered), "created_at": _dt(created),
+                })
+        for bid in merged:
+            self._queue_expiry(self.buffs[bid])
+            await self._save_buff(bid)
+        await self._drop_buffs(duplicates)
+        async with self.conn.execute("SELECT referred_id, referrer_id, created_at FROM referrals") as cur:
+            async for referred, referrer, created in cur:
+                self.referrals[referred] = {"referrer_id": referrer, "created_at": _dt(created)}
+        self.referral_counts = Counter(r["referrer_id"] for r in self.referrals.values())
+        async with self.conn.execute("SELECT guild_id, user_id, last_seen FROM guild_players") as cur:
+            async for guild_id, user_id, seen in cur:
+                self.guild_players.setdefault(guild_id, {})[user_id] = _dt(seen)
+        async with self.conn.execute(
+            "SELECT species, caught, owners, last_seen, discoverer, discovered_at FROM species_stats"
+        ) as cur:
+            async for species, caught, owners, seen, discoverer, discovered_at in cur:
+                self.species_stats[species] = {"caught": caught, "owners": owners, "last_seen": _dt(seen)}
+                if discoverer is not None:
+                    self.species_discoveries[species] = {
+                        "user_id": discoverer, "discovered_at": _dt(discovered_at),
+                    }
+        async with self.conn.execute(
+            "SELECT granularity, bucket, kind, source, amount FROM economy_rollups"
+        ) as cur:
+            async for granularity, bucket, kind, source, amount in cur:
+                self.economy_rollups[(granularity, _dt(bucket), kind, source)] = amount
+
+    # ── Write-through hooks ──
+
+    async def _save_player(self, user_id: str):
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO players (user_id, data, last_active_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(self.players[user_id]), _ts(self.last_active[user_id])),
+        )
+        await self.conn.execute("DELETE FROM players_archive WHERE user_id = ?", (user_id,))
+        await self.conn.commit()
+
+    async def _drop_player(self, user_id: str):
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO players_archive (user_id, data, last_active_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(self.archive[user_id]), _ts(self.last_active.get(user_id))),
+        )
+        await self.conn.execute("DELETE FROM players WHERE user_id = ?", (user_id,))
+        await self.conn.commit()
+
+    async def _save_buff(self, buff_id: int):
+        b = self.buffs[buff_id]
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO player_buffs "
+            "(id, user_id, buff_type, charges_left, expires_at, channel_id, last_triggered, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (buff_id, b["user_id"], b["buff_type"], b["charges_left"], _ts(b["expires_at"]),
+             b["channel_id"], _ts(b["last_triggered"]), _ts(b["created_at"])),
+        )
+        await self.conn.commit()
+
+    async def _drop_buffs(self, buff_ids: list[int]):
+        if buff_ids:
+            await self.conn.executemany("DELETE FROM player_buffs WHERE id = ?", [(bid,) for bid in buff_ids])
+            await self.conn.commit()
+
+    async def _save_referral(self, referred_id: str):
+        r = self.referrals[referred_id]
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO referrals (referred_id, referrer_id, created_at) VALUES (?, ?, ?)",
+            (referred_id, r["referrer_id"], _ts(r["created_at"])),
+        )
+        await self.conn.commit()
+
+    async def _save_guild_player(self, guild_id: str, user_id: str):
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO guild_players (guild_id, user_id, last_seen) VALUES (?, ?, ?)",
+            (guild_id, user_id, _ts(self.guild_players[guild_id][user_id])),
+        )
+        await self.conn.commit()
+
+    async def _save_species(self, species: list[str]):
+        if not species:
+            return
+        rows = []
+        for name in species:
+            st = self.species_stats[name]
+            found = self.species_discoveries.get(name, {})
+            rows.append((name, st["caught"], st["owners"], _ts(st["last_seen"]),
+                         found.get("user_id"), _ts(found.get("discovered_at"))))
+        await self.conn.executemany(
+            "INSERT OR REPLACE INTO species_stats "
+            "(species, caught, owners, last_seen, discoverer, discovered_at) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        await self.conn.commit()
+
+    async def _save_catch_events(self, records: list[tuple]):
+        buffs = CATCH_EVENT_COLUMNS.index("buffs")
+        created = CATCH_EVENT_COLUMNS.index("created_at")
+        rows = []
+        for record in records:
+            row = list(record)
+            row[buffs] = json.dumps(row[buffs])
+            row[created] = _ts(row[created])
+            rows.append(row)
+        await self.conn.executemany(
+            f"INSERT INTO catch_events ({', '.join(CATCH_EVENT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in CATCH_EVENT_COLUMNS)})",
+            rows,
+        )
+        await self.conn.commit()
+
+    async def _save_rollups(self, keys: list[tuple]):
+        await self.conn.executemany(
+            "INSERT OR REPLACE INTO economy_rollups (granularity, bucket, kind, source, amount) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(g, _ts(bucket), kind, source, self.economy_rollups[(g, bucket, kind, source)])
+             for g, bucket, kind, source in set(keys)],
+        )
+        await self.conn.commit()
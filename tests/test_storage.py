@@ -0,0 +1,294 @@
+"""
+Conformance tests for the storage backends.
+
+Every test runs the same Storage calls against MemoryStorage and
+SQLiteStorage (skipped without aiosqlite). Reload tests reopen the SQLite
+file, or call init_db again, and check that nothing was lost or counted
+twice. The Postgres backend (db.py) needs a server and isn't covered here.
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from storage import ReferralOutcome, open_storage
+
+ALICE, BOB, CAROL = "1001", "1002", "1003"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend_url(request, tmp_path):
+    if request.param == "sqlite":
+        pytest.importorskip("aiosqlite")
+        return f"sqlite:///{tmp_path / 'squirrels.db'}"
+    return "memory://"
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    pytest.importorskip("aiosqlite")
+    return f"sqlite:///{tmp_path / 'squirrels.db'}"
+
+
+async def _open(url):
+    store = open_storage(url)
+    await store.init_db(url)
+    return store
+
+
+def run(url, scenario):
+    """Open a backend at url, run scenario(store) and close it again."""
+    async def main():
+        store = await _open(url)
+        try:
+            await scenario(store)
+        finally:
+            await store.close_db()
+    asyncio.run(main())
+
+
+# ── Players ──
+
+def test_new_player_defaults_and_update(backend_url):
+    async def scenario(store):
+        player = await store.get_player(ALICE)
+        assert player["acorns"] == 0 and player["level"] == 1 and player["catches"] == {}
+        player["acorns"] = 250
+        player["catches"] = {"Grey Squirrel": 2}
+        await store.update_player(ALICE, player)
+        again = await store.get_player(ALICE)
+        assert again["acorns"] == 250
+        assert again["catches"] == {"Grey Squirrel": 2}
+    run(backend_url, scenario)
+
+
+def test_claim_daily_pays_once_per_cooldown(backend_url):
+    async def scenario(store):
+        first = await store.claim_daily(ALICE, 50, 10, timedelta(days=1))
+        assert first["reward"] == 60
+        second = await store.claim_daily(ALICE, 50, 10, timedelta(days=1))
+        assert second["reward"] is None
+        assert timedelta(hours=23) < second["remaining"] <= timedelta(days=1)
+        assert (await store.get_player(ALICE))["acorns"] == 60
+    run(backend_url, scenario)
+
+
+def test_exchange_currency_and_exchange_all(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"acorns": 1_250})
+        assert await store.exchange_currency(ALICE, "acorns", "silver_acorns", 100, 20) is None
+        result = await store.exchange_currency(ALICE, "acorns", "silver_acorns", 100, 2)
+        assert result["units"] == 2
+        assert result["after"]["acorns"] == 1_050 and result["after"]["silver_acorns"] == 2
+        chain = [("acorns", "silver_acorns", 100), ("silver_acorns", "emerald_acorns", 10)]
+        result = await store.exchange_all(ALICE, chain)
+        assert result["after"] == {"acorns": 50, "silver_acorns": 2, "emerald_acorns": 1, "golden_acorns": 0}
+    run(backend_url, scenario)
+
+
+def test_sell_catches_refuses_what_the_player_lacks(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"catches": {"Grey Squirrel": 2}})
+        assert await store.sell_catches(ALICE, {"Grey Squirrel": 3}, 30) is None
+        player = await store.sell_catches(ALICE, {"Grey Squirrel": 2}, 20)
+        assert player["acorns"] == 20 and player["catches"] == {}
+    run(backend_url, scenario)
+
+
+def test_record_catch_only_adds_rewards(backend_url):
+    async def scenario(store):
+        stale = await store.get_player(ALICE)
+        await store.claim_daily(ALICE, 50, 0, timedelta(days=1))  # commits while the catch animation runs
+        first = await store.record_catch(ALICE, 30, 40, stale["level"], 50, species="Red Squirrel", silver_acorns=1)
+        assert first["new_species"] and not first["leveled"]
+        assert first["player"]["acorns"] == 80 and first["player"]["silver_acorns"] == 1
+        assert first["player"]["last_daily"] is not None
+        second = await store.record_catch(ALICE, 10, 20, stale["level"], 50, species="Red Squirrel")
+        assert not second["new_species"] and second["leveled"]
+        assert (second["player"]["level"], second["player"]["xp"]) == (2, 10)
+        # A catch that read level 1 can't level the player again
+        junk = await store.record_catch(ALICE, 0, 500, stale["level"], 50)
+        assert not junk["leveled"] and not junk["new_species"]
+        player = await store.get_player(ALICE)
+        assert (player["level"], player["xp"]) == (2, 510)
+        assert player["catches"] == {"Red Squirrel": 2}
+        assert (player["total_catches"], player["junk_catches"], player["acorns"]) == (2, 1, 90)
+    run(backend_url, scenario)
+
+
+def test_archived_players_are_restored(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"acorns": 300, "catches": {"Red Squirrel": 1}})
+        assert await store.archive_inactive_players(-1) == 1
+        result = await store.exchange_currency(ALICE, "acorns", "silver_acorns", 100)
+        assert result["units"] == 3
+        assert await store.archive_inactive_players(-1) == 1
+        assert (await store.sell_catches(ALICE, {"Red Squirrel": 1}, 15))["acorns"] == 15
+        assert await store.archive_inactive_players(-1) == 1
+        assert (await store.get_player(ALICE))["silver_acorns"] == 3
+    run(backend_url, scenario)
+
+
+# ── Shop ──
+
+def test_buy_buff_debits_and_stacks(backend_url):
+    async def scenario(store):
+        refused = await store.buy_buff(ALICE, "peanut_butter", "acorns", 100, charges=5)
+        assert not refused["purchased"] and "slot" not in refused
+        assert refused["player"]["acorns"] == 0
+        await store.update_player(ALICE, {"acorns": 250})
+        first = await store.buy_buff(ALICE, "peanut_butter", "acorns", 100, charges=5)
+        second = await store.buy_buff(ALICE, "peanut_butter", "acorns", 100, charges=5)
+        assert first["purchased"] and second["purchased"]
+        assert second["player"]["acorns"] == 50
+        assert second["slot"]["id"] == first["slot"]["id"]
+        assert second["slot"]["charges_left"] == 10
+        assert not (await store.buy_buff(ALICE, "peanut_butter", "acorns", 100, charges=5))["purchased"]
+        assert [b["charges_left"] for b in await store.get_active_buffs(ALICE)] == [10]
+    run(backend_url, scenario)
+
+
+def test_buy_timed_buff_extends_expiry(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"silver_acorns": 10})
+        first = await store.buy_buff(ALICE, "lucky_acorn", "silver_acorns", 1, duration=timedelta(minutes=30))
+        second = await store.buy_buff(ALICE, "lucky_acorn", "silver_acorns", 1, duration=timedelta(minutes=30))
+        assert second["slot"]["expires_at"] - first["slot"]["expires_at"] == timedelta(minutes=30)
+        assert second["player"]["silver_acorns"] == 8
+    run(backend_url, scenario)
+
+
+def test_buy_upgrade_up_to_max_tier(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"acorns": 400})
+        costs = [100, 250]
+        assert (await store.buy_upgrade(ALICE, "trap_tier", costs))["player"]["trap_tier"] == 1
+        result = await store.buy_upgrade(ALICE, "trap_tier", costs)
+        assert result["purchased"]
+        assert result["player"]["trap_tier"] == 2 and result["player"]["acorns"] == 50
+        await store.update_player(ALICE, {**await store.get_player(ALICE), "acorns": 10_000})
+        assert not (await store.buy_upgrade(ALICE, "trap_tier", costs))["purchased"]
+        with pytest.raises(ValueError):
+            await store.buy_upgrade(ALICE, "acorns", costs)
+    run(backend_url, scenario)
+
+
+# ── Buffs ──
+
+def test_consume_and_expire_buffs(backend_url):
+    async def scenario(store):
+        slot = await store.add_buff(ALICE, "golden_acorn", charges=1)
+        await store.consume_buff_charge(slot["id"])
+        assert await store.get_active_buffs(ALICE) == []
+        again = await store.add_buff(ALICE, "golden_acorn", charges=2)
+        assert again["id"] == slot["id"] and again["charges_left"] == 2
+
+        hunter = await store.add_buff(BOB, "squirrel_hunter", duration=timedelta(milliseconds=1), channel_id="42")
+        await asyncio.sleep(0.01)
+        expired = await store.expire_buffs()
+        assert [(b["id"], b["channel_id"]) for b in expired] == [(hunter["id"], "42")]
+        assert await store.expire_buffs() == []
+    run(backend_url, scenario)
+
+
+# ── Referrals ──
+
+def test_refer_player_outcomes(backend_url):
+    async def scenario(store):
+        refer = lambda referrer, referred: store.refer_player(referrer, referred, 5, 200, 500)  # noqa: E731
+        assert (await refer(ALICE, ALICE))["outcome"] is ReferralOutcome.SELF_REFERRAL
+        assert (await refer(ALICE, BOB))["outcome"] is ReferralOutcome.UNKNOWN_REFERRER
+        await store.update_player(ALICE, {"acorns": 10})
+        assert (await refer(ALICE, BOB))["outcome"] is ReferralOutcome.OK
+        assert (await refer(ALICE, BOB))["outcome"] is ReferralOutcome.ALREADY_REFERRED
+        await store.update_player(CAROL, {"total_catches": 9})
+        result = await refer(ALICE, CAROL)
+        assert result == {"outcome": ReferralOutcome.TOO_MANY_CATCHES, "total_catches": 9}
+        assert (await store.get_player(ALICE))["acorns"] == 510
+        assert (await store.get_player(BOB))["acorns"] == 200
+        assert await store.get_referral_count(ALICE) == 1
+        assert await store.get_referred_by(BOB) == ALICE
+        assert await store.get_top_referrers() == [{"user_id": ALICE, "referral_count": 1}]
+    run(backend_url, scenario)
+
+
+# ── Rankings and rollups ──
+
+def test_rankings(backend_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"acorns": 300})
+        await store.update_player(BOB, {"silver_acorns": 5})
+        await store.touch_guild_player("g1", ALICE)
+        top = await store.get_top_players(10)
+        assert [p["user_id"] for p in top] == [BOB, ALICE]
+        assert [p["user_id"] for p in await store.get_guild_top_players("g1")] == [ALICE]
+        assert (await store.get_rank(ALICE))["rank"] == 2
+    run(backend_url, scenario)
+
+
+def test_economy_rollups(backend_url):
+    from events import EconomyRollups
+
+    async def scenario(store):
+        rollups = EconomyRollups()
+        rollups.mint("daily", 60)
+        rollups.mint("daily", 40)
+        assert await rollups.flush(store) == 1
+        for granularity in ("hour", "day"):
+            rows = await store.get_economy_rollups(granularity, 2)
+            assert [(r["kind"], r["source"], r["amount"]) for r in rows] == [("minted", "daily", 100)]
+    run(backend_url, scenario)
+
+
+# ── Restart and reload (SQLite) ──
+
+def test_sqlite_state_survives_restart(sqlite_url):
+    async def write(store):
+        await store.update_player(ALICE, {"acorns": 10})
+        assert (await store.refer_player(ALICE, BOB, 5, 200, 500))["outcome"] is ReferralOutcome.OK
+        await store.add_buff(ALICE, "peanut_butter", charges=5)
+        await store.add_buff(ALICE, "lucky_acorn", duration=timedelta(hours=1))
+
+    async def check(store):
+        assert (await store.get_player(ALICE))["acorns"] == 510
+        assert await store.get_referral_count(ALICE) == 1
+        buffs = {b["buff_type"]: b for b in await store.get_active_buffs(ALICE)}
+        assert buffs["peanut_butter"]["charges_left"] == 5
+        assert buffs["lucky_acorn"]["expires_at"] is not None
+        slot = await store.add_buff(ALICE, "peanut_butter", charges=1)
+        assert slot["id"] == buffs["peanut_butter"]["id"] and slot["charges_left"] == 6
+
+    run(sqlite_url, write)
+    run(sqlite_url, check)
+
+
+def test_sqlite_init_db_twice_changes_nothing(sqlite_url):
+    async def scenario(store):
+        await store.update_player(ALICE, {"acorns": 10})
+        await store.refer_player(ALICE, BOB, 5, 200, 500)
+        await store.add_buff(ALICE, "peanut_butter", charges=5)
+        await store.init_db(sqlite_url)  # on_ready runs again after a reconnect
+        assert await store.get_referral_count(ALICE) == 1
+        assert [b["charges_left"] for b in await store.get_active_buffs(ALICE)] == [5]
+
+    async def check(store):
+        assert await store.get_referral_count(ALICE) == 1
+        assert [b["charges_left"] for b in await store.get_active_buffs(ALICE)] == [5]
+
+    run(sqlite_url, scenario)
+    run(sqlite_url, check)
+
+
+def test_sqlite_read_economy_rollups_sees_new_writes(sqlite_url):
+    from sqlite_storage import read_economy_rollups
+
+    async def scenario(store):
+        assert await read_economy_rollups(sqlite_url, "hour", 2) == []
+        from events import EconomyRollups
+        rollups = EconomyRollups()
+        rollups.burn("shop", 75)
+        await rollups.flush(store)
+        rows = await read_economy_rollups(sqlite_url, "hour", 2)
+        assert [(r["kind"], r["source"], r["amount"]) for r in rows] == [("burned", "shop", 75)]
+    run(sqlite_url, scenario)